@@ -1,6 +1,20 @@
-import argparse
-from utils import cast_to_bool
-from core import Latte
+import argparse, importlib.util, os, sys
+
+# Load startup profiler before `core` and its dependencies, so their imports can be measured.
+# It is registered as `core.StartupProfiler`, so `core` package uses this module instead of loading it again.
+_startup_profiler_spec = importlib.util.spec_from_file_location(
+    "core.StartupProfiler", os.path.join(os.path.dirname(os.path.abspath(__file__)), "core", "StartupProfiler.py")
+)
+_startup_profiler_module = importlib.util.module_from_spec(_startup_profiler_spec)
+sys.modules["core.StartupProfiler"] = _startup_profiler_module
+_startup_profiler_spec.loader.exec_module(_startup_profiler_module)
+startup_profiler = _startup_profiler_module.startup_profiler
+if "--profile-startup" in sys.argv:
+    startup_profiler.enable()
+
+with startup_profiler.phase("import core"):
+    from utils import cast_to_bool
+    from core import Latte
 
 
 def main():
@@ -19,19 +33,60 @@ def main():
         required=True
     )
 
+    my_parser.add_argument(
+        "--profile-startup",
+        dest="profile_startup",
+        action="store_true",
+        help="Record time taken by each startup phase and module import, and write them as json report."
+    )
+
+    my_parser.add_argument(
+        "--startup-report",
+        dest="startup_report",
+        type=str,
+        default="./logs/startup-profile.json",
+        help="Path of startup profile report. (used with --profile-startup)"
+    )
+
+    my_parser.add_argument(
+        "--startup-budget",
+        dest="startup_budget",
+        type=float,
+        default=None,
+        help="Seconds allowed until gateway is ready. Exit with code 1 if exceeded. (used with --profile-startup)"
+    )
+
+    my_parser.add_argument(
+        "--exit-after-startup",
+        dest="exit_after_startup",
+        action="store_true",
+        help="Close the bot right after startup is finished, to benchmark startup. (used with --profile-startup)"
+    )
+
     args: argparse.Namespace = my_parser.parse_args()
     print(f"Caught CLI arguments : {args}")
 
-    bot = Latte(
-        test_mode=args.test,
-        description="카페라테를 좋아하는 개발자가 만든 디스코드 봇이에요!",
-        help_command=None
-    )
+    startup_profiler.report_path = args.startup_report
+    startup_profiler.budget = args.startup_budget
+    startup_profiler.exit_after_startup = args.exit_after_startup
+
+    with startup_profiler.phase("bot init"):
+        bot = Latte(
+            test_mode=args.test,
+            description="카페라테를 좋아하는 개발자가 만든 디스코드 봇이에요!",
+            help_command=None
+        )
 
-    bot.run()
+    try:
+        bot.run()
+    finally:
+        # Write report if the bot closed before gateway got ready.
+        startup_profiler.finish()
+    if startup_profiler.over_budget:
+        print(f"Startup took longer than budget ({args.startup_budget}s)! Report : {args.startup_report}")
+        sys.exit(1)
 
     if bot.check_reboot():
-        import sys, os
         excutable = sys.executable
         sys_args = sys.argv[:]
         print(f"System arguments : {sys_args}")
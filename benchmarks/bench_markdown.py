@@ -0,0 +1,69 @@
+"""
+benchmarks/bench_markdown.py
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+Measure MarkdownParser tokenizing and MarkdownEmbedRenderer pagination over a growing docs corpus,
+to show time per line stays flat (linear time), and every page stays within discord embed limits.
+`python -m benchmarks.bench_markdown`
+"""
+import os, time
+from typing import Dict, List
+from core.DocParser import MarkdownParser, MarkdownEmbedRenderer
+
+DOCS_ROOT: str = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "docs")
+
+
+def load_corpus() -> List[str]:
+    """
+    Every markdown documents in docs, with a long code block and list items appended.
+    """
+    lines: List[str] = []
+    for directory, _, files in os.walk(DOCS_ROOT):
+        for file in sorted(files):
+            if file.endswith(".md"):
+                with open(os.path.join(directory, file), mode="rt", encoding="utf-8") as document:
+                    lines += document.read().splitlines()
+    lines += ["```py"] + [f"code line {number} * ` **" for number in range(60)] + ["```"]
+    lines += ["- **item** *emphasis* `code`", "  - nested item"] * 20
+    return lines
+
+
+def within_limits(title: str, description: str, pages: List[List[Dict[str, str]]]) -> bool:
+    limits = MarkdownEmbedRenderer
+    if len(title) > limits.max_title or len(description) > limits.max_description:
+        return False
+    for number, fields in enumerate(pages):
+        if len(fields) > limits.max_fields_per_embed:
+            return False
+        if any(len(field["name"]) > limits.max_field_name or len(field["value"]) > limits.max_field_value
+               for field in fields):
+            return False
+        size: int = len(title) + (len(description) if number == 0 else 0) + limits.footer_reserve \
+            + sum(len(field["name"]) + len(field["value"]) for field in fields)
+        if size > limits.max_chars_per_embed:
+            return False
+    return True
+
+
+def main():
+    parser: MarkdownParser = MarkdownParser()
+    renderer: MarkdownEmbedRenderer = MarkdownEmbedRenderer(parser)
+    corpus: List[str] = load_corpus()
+    for copies in (50, 100, 200, 400, 800):
+        lines: List[str] = corpus * copies
+        began: float = time.perf_counter()
+        title, description, pages = renderer.paginate(parser.tokenize(lines), title="docs")
+        elapsed: float = time.perf_counter() - began
+        print(f"{len(lines):8d} lines {sum(map(len, lines)) / 1e6:6.2f}MB {elapsed * 1000:9.1f}ms "
+              f"{elapsed / len(lines) * 1e6:6.2f}us/line {len(pages):5d} pages "
+              f"limits {'ok' if within_limits(title, description, pages) else 'EXCEEDED'}")
+
+    # Unclosed emphasis and code markers must not make inline parsing quadratic.
+    for repeat in (10000, 40000, 160000):
+        line: str = "a * b ` c " * repeat
+        began = time.perf_counter()
+        parser.parse_inline(line)
+        print(f"unclosed markers {len(line):8d} chars {(time.perf_counter() - began) * 1000:9.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+benchmarks/bench_message_dispatch.py
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+Measure messages per second through `Latte.dispatch`, with and without the message pre-filter.
+Messages are random chat traffic, so most of them are dropped by the filter before command context is built.
+`python -m benchmarks.bench_message_dispatch [messages]`
+"""
+import asyncio, random, string, sys, time, types
+from typing import List
+from discord.ext import commands
+from core import Latte, MessageFilter
+
+PREFIX: str = "라떼야 "
+TRIGGERS: List[str] = ["라떼야", "라떼"]
+
+
+class TriggerCog(commands.Cog):
+    """
+    Listener which reacts on trigger phrases, like `AICog`.
+    """
+    @commands.Cog.listener()
+    async def on_message(self, msg):
+        if msg.content in TRIGGERS:
+            pass
+
+
+class BenchLatte(Latte):
+    """
+    Latte without config, database and gateway : only command parsing and dispatch are kept.
+    """
+    def __init__(self, message_filter: MessageFilter):
+        commands.Bot.__init__(self, command_prefix=PREFIX, help_command=None)
+        self.message_filter = message_filter
+        self._connection.user = types.SimpleNamespace(id=0)
+        self.add_cog(TriggerCog())
+
+        @self.command(name="ping")
+        async def ping(ctx):
+            pass
+
+
+def make_messages(bot: BenchLatte, count: int) -> List[types.SimpleNamespace]:
+    rng: random.Random = random.Random(1)
+    author = types.SimpleNamespace(bot=False, id=1)
+    messages: List[types.SimpleNamespace] = []
+    for index in range(count):
+        if index % 100 == 0:
+            content: str = PREFIX + "ping"
+        elif index % 100 == 1:
+            content = rng.choice(TRIGGERS)
+        else:
+            content = "".join(rng.choice(string.ascii_letters + " ") for _ in range(rng.randint(5, 80)))
+        messages.append(types.SimpleNamespace(content=content, author=author, guild=None, channel=None,
+                                              _state=bot._connection))
+    return messages
+
+
+async def run(count: int, filtered: bool) -> float:
+    message_filter: MessageFilter = MessageFilter()
+    message_filter.set_prefixes([PREFIX])
+    message_filter.add_triggers(TriggerCog.__module__, TRIGGERS)
+    if not filtered:
+        # Disables the filter, like a listener which needs every message.
+        message_filter.require_all_messages(owner="benchmark")
+    bot: BenchLatte = BenchLatte(message_filter=message_filter)
+    messages = make_messages(bot, count)
+
+    began: float = time.perf_counter()
+    for index, message in enumerate(messages):
+        bot.dispatch("message", message)
+        if index % 1000 == 0:
+            await asyncio.sleep(0)
+    # Wait until every dispatched listener and command processing finishes.
+    while len(asyncio.all_tasks()) > 1:
+        await asyncio.sleep(0)
+    return count / (time.perf_counter() - began)
+
+
+def main(count: int):
+    baseline: float = asyncio.run(run(count, filtered=False))
+    print(f"without filter : {baseline:12,.0f} messages/s")
+    filtered: float = asyncio.run(run(count, filtered=True))
+    print(f"with filter    : {filtered:12,.0f} messages/s ({filtered / baseline:.1f}x)")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50000)
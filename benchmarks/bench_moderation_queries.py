@@ -0,0 +1,81 @@
+"""
+benchmarks/bench_moderation_queries.py
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+Measure latency of indexed moderation history queries and keyset pagination on synthetic rows.
+Runs against a temporary SQLite database : `python -m benchmarks.bench_moderation_queries [rows]`
+"""
+import asyncio, random, statistics, sys, tempfile, time
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, List
+from sqlalchemy import insert
+from core.DB import DBWrapper, WarnRecord, MuteRecord
+
+GUILDS: int = 100
+USERS: int = 2000
+CHUNK: int = 20000
+
+
+async def populate(db: DBWrapper, rows: int):
+    rng: random.Random = random.Random(1)
+    origin: datetime = datetime(2026, 1, 1)
+    for table in (WarnRecord, MuteRecord):
+        for offset in range(0, rows, CHUNK):
+            batch = []
+            for _ in range(min(CHUNK, rows - offset)):
+                when: datetime = origin + timedelta(seconds=rng.randrange(86400 * 365))
+                row = {
+                    "guild_id": rng.randrange(GUILDS), "guild_name": "guild",
+                    "user_id": rng.randrange(USERS), "user_name": "user", "reason": "benchmark"
+                }
+                if table is WarnRecord:
+                    row["when"] = when
+                else:
+                    row.update(start=when, end=when + timedelta(minutes=rng.randrange(1, 1440)), active=rng.random() < 0.01)
+                batch.append(row)
+            async with db.session() as session:
+                await session.execute(insert(table), batch)
+
+
+async def measure(name: str, query: Callable[[], Awaitable], repeat: int = 50):
+    timings: List[float] = []
+    for _ in range(repeat):
+        began: float = time.perf_counter()
+        await query()
+        timings.append(time.perf_counter() - began)
+    print(f"{name:<40} median {statistics.median(timings) * 1000:8.3f}ms   max {max(timings) * 1000:8.3f}ms")
+
+
+async def main(rows: int):
+    with tempfile.TemporaryDirectory() as path:
+        db: DBWrapper = DBWrapper(driver="sqlite+aiosqlite", path=path)
+        db.create_engine()
+        await db.create_tables()
+        began: float = time.perf_counter()
+        await populate(db, rows)
+        print(f"Inserted {rows} warns and {rows} mutes in {time.perf_counter() - began:.1f}s")
+
+        before: datetime = datetime(2026, 7, 1)
+        await measure("get_warns (first page)", lambda: db.get_warns(guild_id=7, user_id=42))
+        await measure("count_warns", lambda: db.count_warns(guild_id=7, user_id=42))
+        await measure("get_mutes (first page)", lambda: db.get_mutes(guild_id=7, user_id=42))
+        await measure("get_mutes_ending_before (first page)", lambda: db.get_mutes_ending_before(7, before, limit=100))
+        await measure("get_active_mutes_ending_before", lambda: db.get_active_mutes_ending_before(before), repeat=10)
+
+        # Walk every page of a guild : keyset cursor keeps each page as cheap as the first one.
+        pages: List[float] = []
+        after = None
+        while True:
+            began = time.perf_counter()
+            page = await db.get_mutes_ending_before(7, before, after=after, limit=100)
+            pages.append(time.perf_counter() - began)
+            if len(page) == 0:
+                break
+            after = (page[-1].end, page[-1].id)
+        print(f"{'get_mutes_ending_before (every page)':<40} {len(pages)} pages, "
+              f"first {pages[0] * 1000:.3f}ms, last {pages[-2] * 1000 if len(pages) > 1 else 0.0:.3f}ms, "
+              f"median {statistics.median(pages) * 1000:.3f}ms")
+        await db.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000))
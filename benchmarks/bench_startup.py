@@ -0,0 +1,68 @@
+"""
+benchmarks/bench_startup.py
+~~~~~~~~~~~~~~~~~~~~~~~~~~~
+Measure import cost of latte in fresh interpreters, using the same StartupProfiler as `app.py --profile-startup`.
+Exits with code 1 if median import time exceeds the budget, so it can be used as a startup regression check.
+`python -m benchmarks.bench_startup [--runs N] [--budget SECONDS] [--top N]`
+
+Full startup (config load ~ gateway ready) needs a bot token, and is measured with
+`python app.py --test true --profile-startup --exit-after-startup --startup-budget SECONDS` instead.
+"""
+import argparse, json, os, statistics, subprocess, sys, tempfile
+from typing import Any, Dict, List
+
+ROOT: str = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Same bootstrap as app.py : the profiler is loaded before `core`, so imports of core and its dependencies are measured.
+SCRIPT: str = """
+import importlib.util, os, sys
+sys.path.insert(0, {root!r})
+spec = importlib.util.spec_from_file_location("core.StartupProfiler", os.path.join({root!r}, "core", "StartupProfiler.py"))
+module = importlib.util.module_from_spec(spec)
+sys.modules["core.StartupProfiler"] = module
+spec.loader.exec_module(module)
+profiler = module.startup_profiler
+profiler.enable()
+profiler.report_path = {report!r}
+with profiler.phase("import core"):
+    from utils import cast_to_bool
+    from core import Latte
+profiler.finish()
+"""
+
+
+def profile_once(report_path: str) -> Dict[str, Any]:
+    subprocess.run([sys.executable, "-c", SCRIPT.format(root=ROOT, report=report_path)], check=True, cwd=ROOT)
+    with open(report_path, mode="rt", encoding="utf-8") as report_file:
+        return json.load(report_file)
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="bench_startup")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget", type=float, default=None, help="Seconds allowed to import core.")
+    parser.add_argument("--top", type=int, default=10, help="Number of slowest modules to show.")
+    args: argparse.Namespace = parser.parse_args()
+
+    reports: List[Dict[str, Any]] = []
+    with tempfile.TemporaryDirectory() as path:
+        for run in range(args.runs):
+            reports.append(profile_once(os.path.join(path, f"startup-{run}.json")))
+
+    durations: List[float] = [
+        next(phase["duration"] for phase in report["phases"] if phase["name"] == "import core") for report in reports
+    ]
+    median: float = statistics.median(durations)
+    print(f"import core : median {median * 1000:.1f}ms, min {min(durations) * 1000:.1f}ms, "
+          f"max {max(durations) * 1000:.1f}ms ({args.runs} runs)")
+    print("Slowest modules (self time) of the last run :")
+    for item in reports[-1]["imports"][:args.top]:
+        print(f"  {item['module']:<50} self {item['self'] * 1000:8.2f}ms   cumulative {item['cumulative'] * 1000:8.2f}ms")
+
+    if args.budget is not None and median > args.budget:
+        print(f"Import time exceeded budget ({args.budget}s)!")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
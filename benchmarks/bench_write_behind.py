@@ -0,0 +1,50 @@
+"""
+benchmarks/bench_write_behind.py
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+Compare inserting moderation records one session per record against WriteBehindBuffer batches.
+Runs against a temporary SQLite database : `python -m benchmarks.bench_write_behind [records]`
+"""
+import asyncio, sys, tempfile, time
+from datetime import datetime, timedelta
+from core.DB import DBWrapper, MuteRecord, WriteBehindBuffer
+
+
+def make_records(count: int):
+    start: datetime = datetime(2026, 1, 1)
+    return [MuteRecord(1, "guild", user_id, "user", start, start + timedelta(minutes=10), "benchmark")
+            for user_id in range(count)]
+
+
+async def bench_each(db: DBWrapper, count: int) -> float:
+    began: float = time.perf_counter()
+    for record in make_records(count):
+        async with db.session() as session:
+            session.add(record)
+    return time.perf_counter() - began
+
+
+async def bench_buffer(db: DBWrapper, count: int, batch_size: int) -> float:
+    buffer: WriteBehindBuffer = WriteBehindBuffer(db=db, batch_size=batch_size)
+    began: float = time.perf_counter()
+    for record in make_records(count):
+        buffer.put(record)
+    await buffer.flush()
+    return time.perf_counter() - began
+
+
+async def main(count: int):
+    with tempfile.TemporaryDirectory() as path:
+        db: DBWrapper = DBWrapper(driver="sqlite+aiosqlite", path=path)
+        db.create_engine()
+        await db.create_tables()
+        elapsed: float = await bench_each(db, count)
+        print(f"session per record : {count} records in {elapsed * 1000:.1f}ms ({count / elapsed:.0f} records/s)")
+        for batch_size in (10, 100, 500):
+            elapsed = await bench_buffer(db, count, batch_size)
+            print(f"WriteBehindBuffer(batch_size={batch_size}) : {count} records in {elapsed * 1000:.1f}ms "
+                  f"({count / elapsed:.0f} records/s)")
+        await db.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000))
@@ -1,8 +1,14 @@
+import asyncio, logging
+from collections import deque
+from contextlib import asynccontextmanager
 from datetime import datetime
-from typing import Tuple, Any, Dict, Union
+from typing import Tuple, Any, Dict, Union, Optional, List, AsyncIterator, Type, Deque
 import sqlalchemy
-from sqlalchemy import Column, INTEGER, String, DATETIME
+from sqlalchemy import Column, INTEGER, BIGINT, BOOLEAN, String, DATETIME, Index, select, insert, update, func, or_, and_
+from sqlalchemy.exc import OperationalError, InterfaceError
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.orm import sessionmaker
 from utils import get_value_from_kwargs
 
 
@@ -24,16 +30,18 @@ class User(Base):
     __tablename__ = "users"
 
     # Basic Information
-    id = Column(INTEGER, primary_key=True, nullable=False)
-    name = Column(String, nullable=False)
+    id = Column(BIGINT, primary_key=True, nullable=False, autoincrement=False)
+    name = Column(String(100), nullable=False)
     level = Column(INTEGER, nullable=False)
 
     # Economy
     wallet = Column(INTEGER)
 
-    def __init__(self, name, level=0, wallet=0):
+    def __init__(self, id: int, name: str, level: int = 0, wallet: int = 0):
+        self.id = id
         self.name = name
         self.level = level
+        self.wallet = wallet
 
     def __repr__(self):
         return f"<User({self.name}, {self.level})>"
@@ -48,14 +56,16 @@ class Guild(Base):
     __tablename__ = "guilds"
 
     # Basic Information
-    id = Column(INTEGER, primary_key=True)
-    name = Column(String, nullable=False)
+    id = Column(BIGINT, primary_key=True, autoincrement=False)
+    name = Column(String(100), nullable=False)
 
     # Guild-specific latte configuration
-    prefix = Column(String, nullable=False)
+    prefix = Column(String(32), nullable=True)     # Use default prefix in config if null.
 
-    def __init__(self, name):
+    def __init__(self, id: int, name: str, prefix: Optional[str] = None):
+        self.id = id
         self.name = name
+        self.prefix = prefix
 
     def __repr__(self):
         return f"<Guild({self.id}{self.name})>"
@@ -63,20 +73,24 @@ class Guild(Base):
 
 class WarnRecord(Base):
     __tablename__ = "warns"
+    __table_args__ = (
+        # Warn history of the member in the guild.
+        Index("ix_warns_guild_user", "guild_id", "user_id"),
+    )
 
     # Basic Information
     id = Column(INTEGER, primary_key=True, nullable=False, autoincrement=True)
 
     # Guild Information
-    guild_id = Column(INTEGER, nullable=False)
-    guild_name = Column(String)
+    guild_id = Column(BIGINT, nullable=False)
+    guild_name = Column(String(100))
 
     # User Information
-    user_id = Column(INTEGER, nullable=False)
-    user_name = Column(String)
+    user_id = Column(BIGINT, nullable=False)
+    user_name = Column(String(100))
 
     # Warn information
-    reason = Column(String)
+    reason = Column(String(512))
     when = Column(DATETIME, nullable=False)
 
     def __init__(self, guild_id: int, guild_name: str, user_id: int, user_name: str, when: datetime, reason: str):
@@ -98,22 +112,31 @@ class WarnRecord(Base):
 
 class MuteRecord(Base):
     __tablename__ = "mutes"
+    __table_args__ = (
+        # Mute history of the member in the guild.
+        Index("ix_mutes_guild_user", "guild_id", "user_id"),
+        # Mutes of the guild ordered by their end time.
+        Index("ix_mutes_guild_end", "guild_id", "end"),
+        # Active mutes which should be expired, ordered by their end time.
+        Index("ix_mutes_active_end", "active", "end"),
+    )
 
     # Basic Information
     id = Column(INTEGER, primary_key=True, nullable=False, autoincrement=True)
 
     # Guild Information
-    guild_id = Column(INTEGER, nullable=False)
-    guild_name = Column(String)
+    guild_id = Column(BIGINT, nullable=False)
+    guild_name = Column(String(100))
 
     # User Information
-    user_id = Column(INTEGER, nullable=False)
-    user_name = Column(String)
+    user_id = Column(BIGINT, nullable=False)
+    user_name = Column(String(100))
 
     # Mute information
-    reason = Column(String, default="UNDEFINED")
+    reason = Column(String(512), default="UNDEFINED")
     start = Column(DATETIME, nullable=False)
     end = Column(DATETIME, nullable=False)
+    active = Column(BOOLEAN, nullable=False, default=True)     # False after the mute is expired.
 
     def __init__(self, guild_id: int, guild_name: str, user_id: int, user_name: str, start: datetime, end: datetime, reason: str):
         # Guild Information
@@ -134,29 +157,406 @@ class MuteRecord(Base):
 
 
 class DBWrapper:
-    users_engine = None
-    guilds_engine = None
+    """
+    Asynchronous data access layer of latte.
+    Queries are executed using asyncio drivers (aiomysql in production, aiosqlite in local tests),
+    so they never block the event loop.
+    """
+    users_engine: AsyncEngine = None
+    guilds_engine: AsyncEngine = None
+    session_factory: sessionmaker = None
+
+    # Tables stored in each database(schema).
+    users_tables: Tuple[Type[Base], ...] = (User,)
+    guilds_tables: Tuple[Type[Base], ...] = (Guild, WarnRecord, MuteRecord)
+
+    default_pool_options: Dict[str, int] = {
+        "pool_size": 5,         # Connections kept opened in pool.
+        "max_overflow": 10,     # Connections allowed to be opened over pool_size.
+        "pool_timeout": 30,     # Seconds to wait for connection from pool.
+        "pool_recycle": 3600    # Seconds to recycle connection. (MySQL closes idle connections after wait_timeout)
+    }
 
     def __init__(self, **attrs):
-        self.id = get_value_from_kwargs("id", attrs, notnull=True)
-        self.pw = get_value_from_kwargs("pw", attrs, notnull=True)
-        self.host = get_value_from_kwargs("host", attrs, notnull=True)
-        self.port = get_value_from_kwargs("port", attrs, notnull=True)
+        self.driver: str = get_value_from_kwargs("driver", attrs) or "mysql+aiomysql"
+        if self.driver.startswith("sqlite"):
+            # SQLite databases are stored as files in this directory. (local tests)
+            self.path: str = get_value_from_kwargs("path", attrs) or "."
+        else:
+            self.id = get_value_from_kwargs("id", attrs, notnull=True)
+            self.pw = get_value_from_kwargs("pw", attrs, notnull=True)
+            self.host = get_value_from_kwargs("host", attrs, notnull=True)
+            self.port = get_value_from_kwargs("port", attrs, notnull=True)
+
+        self.echo: bool = bool(get_value_from_kwargs("echo", attrs))
+        # Size of SQLAlchemy`s compiled statement cache for each engine.
+        query_cache_size: Optional[int] = get_value_from_kwargs("query_cache_size", attrs)
+        self.query_cache_size: int = query_cache_size if query_cache_size is not None else 500
+        self.pool_options: Dict[str, int] = {
+            key: attrs[key] if key in attrs else default for key, default in self.default_pool_options.items()
+        }
+
+    def get_uri(self, schema: str) -> str:
+        if self.driver.startswith("sqlite"):
+            return f"{self.driver}:///{self.path}/{schema}.db"
+        return f"{self.driver}://{self.id}:{self.pw}@{self.host}:{self.port}/{schema}"
+
+    def _create_engine(self, schema: str) -> AsyncEngine:
+        options: Dict[str, Any] = {
+            "echo": self.echo,
+            "query_cache_size": self.query_cache_size
+        }
+        if not self.driver.startswith("sqlite"):
+            # SQLite driver does not use QueuePool, so pool options are only applied on MySQL.
+            options.update(self.pool_options)
+            options["pool_pre_ping"] = True
+        return create_async_engine(self.get_uri(schema), **options)
 
     def create_engine(self):
-        # Define the MySQL engine using MySQL Connector/Python
-        base_uri = f"mysql+mysqlconnector://{self.id}:{self.pw}@{self.host}:{self.port}"
-
         # guilds database(schema)
-        self.guilds_engine = sqlalchemy.create_engine(
-            f"{base_uri}/latte_guild",
-            echo=True,
-            convert_unicode=False
-        )
+        self.guilds_engine = self._create_engine("latte_guild")
 
         # users database(schema)
-        self.users_engine = sqlalchemy.create_engine(
-            f"{base_uri}/latte_user",
-            echo=True,
-            convert_unicode=False
-        )
+        self.users_engine = self._create_engine("latte_user")
+
+        binds: Dict[Type[Base], AsyncEngine] = {table: self.users_engine for table in self.users_tables}
+        binds.update({table: self.guilds_engine for table in self.guilds_tables})
+        self.session_factory = sessionmaker(class_=AsyncSession, binds=binds, expire_on_commit=False)
+
+    async def create_tables(self):
+        """
+        Create tables which does not exist in databases.
+        """
+        async with self.users_engine.begin() as connection:
+            await connection.run_sync(
+                Base.metadata.create_all, tables=[table.__table__ for table in self.users_tables]
+            )
+        async with self.guilds_engine.begin() as connection:
+            await connection.run_sync(
+                Base.metadata.create_all, tables=[table.__table__ for table in self.guilds_tables]
+            )
+
+    async def close(self):
+        """
+        Close every pooled connections.
+        """
+        if self.users_engine is not None:
+            await self.users_engine.dispose()
+        if self.guilds_engine is not None:
+            await self.guilds_engine.dispose()
+
+    @asynccontextmanager
+    async def session(self) -> AsyncIterator[AsyncSession]:
+        """
+        Open session for single unit of work (such as single command).
+        Transaction is committed when the block exits, or rolled back if exception is raised.
+
+        async with bot.db.session() as session:
+            session.add(WarnRecord(...))
+        """
+        if self.session_factory is None:
+            raise RuntimeError("Database engines are not created! Call `DBWrapper.create_engine()` first.")
+        async with self.session_factory() as session:
+            async with session.begin():
+                yield session
+
+    """
+    Data access helpers
+    """
+
+    async def get(self, table: Type[Base], id: int) -> Optional[Base]:
+        async with self.session() as session:
+            return await session.get(table, id)
+
+    async def get_user(self, user_id: int) -> Optional[User]:
+        return await self.get(User, user_id)
+
+    async def get_guild(self, guild_id: int) -> Optional[Guild]:
+        return await self.get(Guild, guild_id)
+
+    async def add(self, *records: Base):
+        async with self.session() as session:
+            session.add_all(records)
+
+    async def merge(self, record: Base) -> Base:
+        """
+        Insert or update the record using its primary key.
+        """
+        async with self.session() as session:
+            return await session.merge(record)
+
+    async def get_guild_prefixes(self) -> Dict[int, str]:
+        """
+        :return: dictionary of guild ids and guild-specific prefixes. Guilds using default prefix are not included.
+        """
+        async with self.session() as session:
+            result = await session.execute(select(Guild.id, Guild.prefix).where(Guild.prefix.isnot(None)))
+            return {guild_id: prefix for guild_id, prefix in result}
+
+    async def set_guild_prefix(self, guild_id: int, guild_name: str, prefix: Optional[str]):
+        async with self.session() as session:
+            guild: Optional[Guild] = await session.get(Guild, guild_id)
+            if guild is None:
+                session.add(Guild(id=guild_id, name=guild_name, prefix=prefix))
+            else:
+                guild.name = guild_name
+                guild.prefix = prefix
+
+    async def get_warns(self, guild_id: int, user_id: int, before_id: Optional[int] = None,
+                        limit: int = 25) -> List[WarnRecord]:
+        """
+        Get warn history of the member, newest first.
+        Use the smallest id of the previous page as `before_id` to get next page (keyset pagination).
+        """
+        query = select(WarnRecord).where(WarnRecord.guild_id == guild_id, WarnRecord.user_id == user_id)
+        if before_id is not None:
+            query = query.where(WarnRecord.id < before_id)
+        async with self.session() as session:
+            result = await session.execute(query.order_by(WarnRecord.id.desc()).limit(limit))
+            return list(result.scalars())
+
+    async def count_warns(self, guild_id: int, user_id: int) -> int:
+        async with self.session() as session:
+            result = await session.execute(
+                select(func.count()).select_from(WarnRecord)
+                .where(WarnRecord.guild_id == guild_id, WarnRecord.user_id == user_id)
+            )
+            return result.scalar()
+
+    async def get_mutes(self, guild_id: int, user_id: int, before_id: Optional[int] = None,
+                        limit: int = 25) -> List[MuteRecord]:
+        """
+        Get mute history of the member, newest first. Paginated in same way as `get_warns`.
+        """
+        query = select(MuteRecord).where(MuteRecord.guild_id == guild_id, MuteRecord.user_id == user_id)
+        if before_id is not None:
+            query = query.where(MuteRecord.id < before_id)
+        async with self.session() as session:
+            result = await session.execute(query.order_by(MuteRecord.id.desc()).limit(limit))
+            return list(result.scalars())
+
+    async def get_mutes_ending_before(self, guild_id: int, before: datetime,
+                                      after: Optional[Tuple[datetime, int]] = None,
+                                      limit: int = 100) -> List[MuteRecord]:
+        """
+        Get mutes of the guild which end before given time, ordered by (end time, id).
+        Use (end, id) of the last mute of the previous page as `after` to get next page.
+        End time is not unique, so id breaks ties and mutes sharing end time at page boundary are never skipped.
+        """
+        query = select(MuteRecord).where(MuteRecord.guild_id == guild_id, MuteRecord.end < before)
+        if after is not None:
+            after_end, after_id = after
+            query = query.where(or_(
+                MuteRecord.end > after_end,
+                and_(MuteRecord.end == after_end, MuteRecord.id > after_id)
+            ))
+        async with self.session() as session:
+            result = await session.execute(query.order_by(MuteRecord.end, MuteRecord.id).limit(limit))
+            return list(result.scalars())
+
+    async def get_active_mutes_ending_before(self, before: datetime) -> List[MuteRecord]:
+        """
+        Get active mutes of every guilds which end before given time, ordered by end time.
+        """
+        async with self.session() as session:
+            result = await session.execute(
+                select(MuteRecord).where(MuteRecord.active.is_(True), MuteRecord.end < before).order_by(MuteRecord.end)
+            )
+            return list(result.scalars())
+
+    async def get_latest_active_mute_end(self, guild_id: int, user_id: int) -> Optional[datetime]:
+        """
+        Get the latest end time of active mutes of the member, or None if the member has no active mute.
+        """
+        async with self.session() as session:
+            result = await session.execute(
+                select(func.max(MuteRecord.end))
+                .where(MuteRecord.guild_id == guild_id, MuteRecord.user_id == user_id, MuteRecord.active.is_(True))
+            )
+            return result.scalar()
+
+    async def deactivate_mutes(self, guild_id: int, user_id: int, ended_before: datetime):
+        """
+        Mark active mutes of the member which end before given time as expired.
+        """
+        async with self.session() as session:
+            await session.execute(
+                update(MuteRecord)
+                .where(MuteRecord.guild_id == guild_id, MuteRecord.user_id == user_id,
+                       MuteRecord.active.is_(True), MuteRecord.end <= ended_before)
+                .values(active=False)
+            )
+
+
+class WriteBehindBuffer:
+    """
+    Buffer which collects records and inserts them in bulk.
+    Records are flushed when `batch_size` records are collected or `flush_interval` seconds passed,
+    so bursts of moderation actions cost only few INSERT statements.
+    Batches which failed to be inserted are put back in front of the buffer, and retried in next flush.
+    If a batch keeps failing for `max_attempts` flushes, it is bisected to find rows which can`t be inserted,
+    and those rows are moved to `dead_letters` so they don`t block every records behind them.
+    """
+
+    def __init__(self, db: DBWrapper, batch_size: int = 100, flush_interval: float = 2.0, max_attempts: int = 3,
+                 logger: Optional[logging.Logger] = None):
+        self.db = db
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_attempts = max_attempts
+        self.logger = logger if logger is not None else logging.getLogger("latte.db")
+
+        self._pending: Dict[Type[Base], Deque[Dict[str, Any]]] = {}
+        self._attempts: Dict[Type[Base], int] = {}     # Consecutive failed flushes of the first batch of each table.
+        self.dead_letters: List[Tuple[Type[Base], Dict[str, Any]]] = []
+        self._flush_event: Optional[asyncio.Event] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._task: Optional[asyncio.Task] = None
+
+        # Statistics
+        self.flushed: int = 0
+        self.failed_batches: int = 0
+
+    def __len__(self) -> int:
+        return sum(len(records) for records in self._pending.values())
+
+    @staticmethod
+    def to_row(record: Base) -> Dict[str, Any]:
+        """
+        Convert record instance into row dictionary. Auto-incremented primary keys which are not set are omitted,
+        and column defaults are applied here so every rows in a batch have same keys.
+        Strings longer than their column are truncated, so one long reason can`t fail the whole batch.
+        """
+        row: Dict[str, Any] = {}
+        for column in record.__table__.columns:
+            value = getattr(record, column.key)
+            if value is None:
+                if column.primary_key:
+                    continue
+                if column.default is not None and column.default.is_scalar:
+                    value = column.default.arg
+            elif isinstance(value, str):
+                length: Optional[int] = getattr(column.type, "length", None)
+                if length is not None and len(value) > length:
+                    value = value[:length]
+            row[column.key] = value
+        return row
+
+    def put(self, record: Base):
+        """
+        Put record into buffer. Record will be inserted in next flush.
+        """
+        table: Type[Base] = type(record)
+        if table not in self._pending:
+            self._pending[table] = deque()
+        self._pending[table].append(self.to_row(record))
+        if len(self) >= self.batch_size and self._flush_event is not None:
+            self._flush_event.set()
+
+    def start(self):
+        """
+        Start background flush task. Must be called inside of running event loop.
+        """
+        if self._task is None or self._task.done():
+            self._flush_event = asyncio.Event()
+            self._flush_lock = asyncio.Lock()
+            self._task = asyncio.ensure_future(self._flush_loop())
+
+    async def close(self):
+        """
+        Stop background flush task, and flush every remaining records.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+        if len(self) > 0:
+            self.logger.error(msg=f"[WriteBehindBuffer.close] {len(self)} records are not flushed and discarded!")
+
+    async def _flush_loop(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._flush_event.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_event.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                # Keep flushing : records stay in the buffer and are retried in next flush.
+                self.logger.error(msg="[WriteBehindBuffer._flush_loop] Unexpected error during flush!", exc_info=e)
+
+    async def flush(self):
+        """
+        Insert every buffered records in batches of `batch_size` records.
+        """
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+        async with self._flush_lock:
+            # Iterate over snapshot : records of new tables can be put while batches are being inserted.
+            for table, records in list(self._pending.items()):
+                while len(records) > 0:
+                    batch: List[Dict[str, Any]] = [records.popleft() for _ in range(min(self.batch_size, len(records)))]
+                    if self._attempts.get(table, 0) >= self.max_attempts:
+                        done: int = await self._insert_bisect(table, batch)
+                        if done < len(batch):
+                            records.extendleft(reversed(batch[done:]))
+                            self.failed_batches += 1
+                            break
+                        self._attempts.pop(table, None)
+                        continue
+                    try:
+                        await self._insert(table, batch)
+                    except Exception as e:
+                        # Put failed batch back in front of the buffer to keep records in order.
+                        records.extendleft(reversed(batch))
+                        self.failed_batches += 1
+                        self._attempts[table] = self._attempts.get(table, 0) + 1
+                        self.logger.error(
+                            msg=f"[WriteBehindBuffer.flush] Failed to insert {len(batch)} records into "
+                                f"`{table.__tablename__}`. Retrying in next flush. "
+                                f"(attempt {self._attempts[table]})",
+                            exc_info=e
+                        )
+                        break
+                    self._attempts.pop(table, None)
+
+    async def _insert(self, table: Type[Base], batch: List[Dict[str, Any]]):
+        async with self.db.session() as session:
+            await session.execute(insert(table), batch)
+        self.flushed += len(batch)
+
+    async def _insert_bisect(self, table: Type[Base], batch: List[Dict[str, Any]]) -> int:
+        """
+        Insert batch by halves until rows which fail alone are found, and move them to `dead_letters`.
+        Bisecting stops at connection errors, because every rows would fail regardless of their contents.
+        :return: number of leading rows in the batch which are inserted or moved to dead letters.
+        """
+        try:
+            await self._insert(table, batch)
+            return len(batch)
+        except (OperationalError, InterfaceError, OSError, asyncio.TimeoutError) as e:
+            self.logger.error(
+                msg=f"[WriteBehindBuffer._insert_bisect] Failed to insert {len(batch)} records into "
+                    f"`{table.__tablename__}`. Retrying in next flush.",
+                exc_info=e
+            )
+            return 0
+        except Exception as e:
+            if len(batch) == 1:
+                self.dead_letters.append((table, batch[0]))
+                self.logger.error(
+                    msg=f"[WriteBehindBuffer._insert_bisect] Moved a record of `{table.__tablename__}` "
+                        f"to dead letters : {batch[0]}",
+                    exc_info=e
+                )
+                return 1
+            middle: int = len(batch) // 2
+            done: int = await self._insert_bisect(table, batch[:middle])
+            if done < middle:
+                return done
+            return middle + await self._insert_bisect(table, batch[middle:])
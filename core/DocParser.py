@@ -1,11 +1,17 @@
 from __future__ import annotations
-from typing import Union, Dict, Any, List
-import os, json
+from typing import Union, Dict, Any, List, Awaitable, Callable, Iterable, Iterator, NamedTuple, Optional, Tuple
+import asyncio, logging, os, json, re
+from utils import TTLCache, EmbedFactory
 
 # Markdown Grammer
 HEADING = "#"
 ITALIC = "*"
 BOLD = "**"
+CODE = "`"
+CODE_FENCE = "```"
+UNORDERED_LIST = "-*+"
+# Characters which can start inline markup.
+INLINE_MARKER = re.compile(r"[*`]")
 
 # Data Indicator
 DOCUMENT = Dict[str, str]    # Raw dictionary value for document
@@ -73,6 +79,174 @@ class MarkdownPacakge:
         return json.dumps(self.package, indent=4, ensure_ascii=False)
 
 
+class DocumentEntry(NamedTuple):
+    path: str           # path relative to documents root, joined with '/'. (ex: ko-kr/intro.md)
+    file_path: str      # path of the markdown file.
+    mtime_ns: int
+    size: int
+
+
+# Renders document into cached object. (ex: embed)
+DOCUMENT_RENDERER = Callable[[MarkdownDocument], Awaitable[Any]]
+
+
+class DocumentStore:
+    """
+    Flat index of markdown documents under `root`.
+    Only paths and file stats are kept in memory : document bodies are read when they are rendered,
+    and rendered results are kept in LRU cache of `max_rendered` documents.
+    `refresh` re-scans file stats and only invalidates documents which are added, modified or removed.
+    """
+
+    def __init__(self, root: str, renderer: Optional[DOCUMENT_RENDERER] = None, max_rendered: int = 64,
+                 logger: Optional[logging.Logger] = None):
+        self.root = root
+        self.renderer = renderer
+        self.logger = logger if logger is not None else logging.getLogger("latte.docs")
+        self.index: Dict[str, DocumentEntry] = {}
+        # (path, mtime_ns) -> rendered document. Modified documents never hit stale results.
+        self.rendered = TTLCache(maxsize=max_rendered, ttl=float("inf"))
+        self._watch_task: Optional[asyncio.Task] = None
+
+    def scan(self) -> Dict[str, DocumentEntry]:
+        """
+        Walk documents root and stat every markdown file. File contents are not read.
+        """
+        entries: Dict[str, DocumentEntry] = {}
+        stack: List[Tuple[str, str]] = [(self.root, "")]
+        while len(stack) > 0:
+            dir_path, prefix = stack.pop()
+            try:
+                with os.scandir(dir_path) as it:
+                    for entry in it:
+                        if entry.is_dir():
+                            stack.append((entry.path, f"{prefix}{entry.name}/"))
+                        elif entry.name.endswith(".md"):
+                            stat = entry.stat()
+                            path: str = f"{prefix}{entry.name}"
+                            entries[path] = DocumentEntry(
+                                path=path, file_path=entry.path, mtime_ns=stat.st_mtime_ns, size=stat.st_size
+                            )
+            except FileNotFoundError:
+                continue
+        return entries
+
+    def build(self):
+        self.index = self.scan()
+        self.rendered.clear()
+        self.logger.info(msg=f"[DocumentStore.build] Indexed {len(self.index)} documents in `{self.root}`.")
+
+    def refresh(self, new_index: Optional[Dict[str, DocumentEntry]] = None) -> Tuple[List[str], List[str], List[str]]:
+        """
+        Re-scan documents root and apply changes to the index.
+        :param new_index: result of `scan`, if it is already done. (ex: in executor)
+        :return: (added, modified, removed) document paths.
+        """
+        if new_index is None:
+            new_index = self.scan()
+        added: List[str] = [path for path in new_index if path not in self.index]
+        removed: List[str] = [path for path in self.index if path not in new_index]
+        modified: List[str] = [
+            path for path, entry in new_index.items()
+            if path in self.index and self.index[path][2:] != entry[2:]
+        ]
+        for path in modified + removed:
+            old: DocumentEntry = self.index[path]
+            self.rendered.invalidate((path, old.mtime_ns))
+        self.index = new_index
+        if len(added) + len(modified) + len(removed) > 0:
+            self.logger.info(
+                msg=f"[DocumentStore.refresh] Documents changed : "
+                    f"{len(added)} added, {len(modified)} modified, {len(removed)} removed."
+            )
+        return added, modified, removed
+
+    def __contains__(self, path: str) -> bool:
+        return path in self.index
+
+    def list(self, prefix: str = "") -> List[str]:
+        """
+        :return: sorted paths of documents in directory `prefix`. (ex: `ko-kr/`)
+        """
+        return sorted(path for path in self.index if path.startswith(prefix))
+
+    def get(self, path: str) -> Optional[MarkdownDocument]:
+        """
+        Read document of the path. Returns None if the document does not exist.
+        """
+        entry: Optional[DocumentEntry] = self.index.get(path)
+        if entry is None:
+            return None
+        return self.read(entry)
+
+    @staticmethod
+    def read(entry: DocumentEntry) -> Optional[MarkdownDocument]:
+        """
+        Read document of the index entry. Returns None if the file is removed after last refresh.
+        Only touches file system, so it is safe to call in executor.
+        """
+        try:
+            with open(entry.file_path, mode="rt", encoding="utf-8") as document_file:
+                content: str = document_file.read()
+        except FileNotFoundError:
+            return None
+        return MarkdownDocument(
+            document={"type": "file", "path": entry.path, "filename": os.path.basename(entry.path), "content": content}
+        )
+
+    async def render(self, path: str) -> Optional[Any]:
+        """
+        Return rendered document of the path, using cached result if the document is not modified.
+        """
+        entry: Optional[DocumentEntry] = self.index.get(path)
+        if entry is None:
+            return None
+        key: Tuple[str, int] = (path, entry.mtime_ns)
+        rendered: Any = self.rendered.get(key)
+        if rendered is not None:
+            return rendered
+        document: Optional[MarkdownDocument] = await asyncio.get_event_loop().run_in_executor(None, self.read, entry)
+        if document is None:
+            # Removed after last refresh. Index is only modified in event loop thread, unless it is refreshed meanwhile.
+            if self.index.get(path) is entry:
+                del self.index[path]
+            return None
+        rendered = await self.renderer(document) if self.renderer is not None else document
+        self.rendered.set(key, rendered)
+        return rendered
+
+    """
+    File watching
+    """
+
+    def start_watching(self, interval: float = 30.0, loop: Optional[asyncio.AbstractEventLoop] = None):
+        """
+        Refresh index every `interval` seconds in executor.
+        """
+        if self._watch_task is None or self._watch_task.done():
+            self._watch_task = (loop if loop is not None else asyncio.get_event_loop()).create_task(self._watch(interval))
+
+    def stop_watching(self):
+        if self._watch_task is not None:
+            self._watch_task.cancel()
+            self._watch_task = None
+
+    async def _watch(self, interval: float):
+        loop = asyncio.get_event_loop()
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                # Only file system is touched in executor. Index and cache are updated in event loop thread.
+                self.refresh(new_index=await loop.run_in_executor(None, self.scan))
+            except Exception as e:
+                self.logger.error(msg="[DocumentStore._watch] Failed to refresh documents!", exc_info=e)
+
+    def get_stats(self) -> Dict[str, Union[int, float]]:
+        stats: Dict[str, Union[int, float]] = self.rendered.get_stats()
+        stats["documents"] = len(self.index)
+        return stats
+
+
 def parse_doc(root: str, is_root: bool = True) -> Union[MarkdownPacakge, PACKAGE]:
     files = os.listdir(root)
     result: PACKAGE = {
@@ -108,37 +282,36 @@ def parse_doc(root: str, is_root: bool = True) -> Union[MarkdownPacakge, PACKAGE
 
 class MarkdownParser:
     """
-    Parser for markdown document file.
+    Single-pass streaming tokenizer for markdown documents.
+    Lines are consumed one by one and block tokens are yielded as soon as they are complete,
+    so documents never need to be loaded as a whole. Supported syntax : headings, bold, italic, inline code,
+    ordered / unordered lists and fenced code blocks. Everything else is treated as a paragraph.
     """
     def __init__(self):
         pass
 
     def parse_dir(self, file_dir: str, is_root: bool = True) -> Dict[str, PARSED]:
         files = os.listdir(file_dir)
+        result = {
+            "type": "folder",
+            "content": []
+        }
         if is_root:
-            result = {
-                "root": file_dir,
-                "type": "folder",
-                "content": []
-            }
-        else:
-            result = {
-                "type": "folder"
-            }
+            result["root"] = file_dir
         for file in files:
             if file.endswith(".md"):
-                result["content"].append(self.parse(file))
+                result["content"].append(self.parse(os.path.join(file_dir, file)))
             elif '.' not in file:
                 """
                 Simple way to detect whether this is folder or file.
                 Can misjudge folder as file, but since it can be ignored, I'll use this way.
                 """
-                result["content"].append(self.parse_dir(file, is_root=False))
+                result["content"].append(self.parse_dir(os.path.join(file_dir, file), is_root=False))
 
         return result
 
     def parse(self, file_dir: str):
-        with open(file=file_dir, mode="rt", encoding="ut-8") as document_file:
+        with open(file=file_dir, mode="rt", encoding="utf-8") as document_file:
             result = {
                 "type": "file",
                 "filename": file_dir,
@@ -146,40 +319,112 @@ class MarkdownParser:
             }
             return result
 
-    def _parse_markdown(self, file) -> Dict[str, Any]:
+    def _parse_markdown(self, file) -> CONTENT:
         """
-        parse markdown file into
+        parse markdown file into list of block tokens.
 
         :param file: file object which is readable, and text mode.
         :return: parsed, processed markdown data.
         """
-        data: List[Dict[str, Any]] = []
-        for line in file:
-            line_datas: List[Dict[str, Any]]
-            eat: str = ""
-            for char in line:
-                # Parse entire line : Heading
-                # Heading parser
-                if line.startswith(HEADING):
-                    data.append(self._process_heading(line))
-
-                # Parse consumed some chars only : Bold, Italic,
-                # Bold parser
-                elif eat.startswith(BOLD) and eat.endswith(BOLD):
-                    data.append(self._process_bold(eat))
-
-                # Nothing to parse. eat char and parse again.
+        return list(self.tokenize(file))
+
+    def tokenize(self, lines: Iterable[str]) -> Iterator[Dict[str, Any]]:
+        """
+        Yield block tokens of markdown lines. Each line is looked at once, and code block lines are never parsed.
+        """
+        code: Optional[Dict[str, Any]] = None
+        for line in lines:
+            line = line.rstrip("\r\n")
+            stripped: str = line.lstrip()
+
+            # Inside of code block : keep lines as-is until closing fence.
+            if code is not None:
+                if stripped.startswith(CODE_FENCE):
+                    code["content"] = '\n'.join(code["content"])
+                    yield code
+                    code = None
                 else:
-                    eat += char
+                    code["content"].append(line)
+                continue
+
+            if stripped == "":
+                yield {"Type": "Blank"}
+            elif stripped.startswith(CODE_FENCE):
+                code = {"Type": "Code", "Language": stripped[len(CODE_FENCE):].strip(), "content": []}
+            elif line.startswith(HEADING) and self._heading_level(line) > 0:
+                yield self._process_heading(line)
+            else:
+                item: Optional[Dict[str, Any]] = self._process_list_item(line, stripped)
+                yield item if item is not None else {"Type": "Paragraph", "content": self.parse_inline(stripped)}
+
+        # Unterminated code block ends with the document.
+        if code is not None:
+            code["content"] = '\n'.join(code["content"])
+            yield code
+
+    @staticmethod
+    def _heading_level(line: str) -> int:
+        level: int = len(line) - len(line.lstrip(HEADING))
+        # `#tag` is not a heading : marker must be followed by space.
+        return level if level <= 6 and (len(line) == level or line[level] == ' ') else 0
 
     def _process_heading(self, line: str) -> Dict[str, Any]:
-        level: int = line.count(HEADING)
+        level: int = self._heading_level(line)
         return {
             "Type": "Heading",
-            "content": line.replace(HEADING, ''),
+            "content": line[level:].strip().rstrip(HEADING).strip(),
             "Level": level
         }
 
+    def _process_list_item(self, line: str, stripped: str) -> Optional[Dict[str, Any]]:
+        level: int = (len(line) - len(stripped)) // 2
+        if stripped[0] in UNORDERED_LIST and stripped[1:2] == ' ':
+            return {"Type": "ListItem", "Ordered": False, "Level": level, "content": self.parse_inline(stripped[2:])}
+        digits: int = 0
+        while digits < len(stripped) and stripped[digits].isdigit():
+            digits += 1
+        if 0 < digits < 10 and stripped[digits:digits + 2] == ". ":
+            return {
+                "Type": "ListItem", "Ordered": True, "Level": level, "Number": int(stripped[:digits]),
+                "content": self.parse_inline(stripped[digits + 2:])
+            }
+        return None
+
+    def parse_inline(self, text: str) -> List[Dict[str, str]]:
+        """
+        Split text into Text / Bold / Italic / InlineCode spans.
+        Markers without closing pair are kept as text, and never searched again, so each line is scanned linearly.
+        """
+        spans: List[Dict[str, str]] = []
+        unclosed: set = set()
+        position: int = 0
+        plain_start: int = 0
+        while True:
+            match = INLINE_MARKER.search(text, position)
+            if match is None:
+                break
+            start: int = match.start()
+            marker: str = BOLD if text.startswith(BOLD, start) else match.group()
+            end: int = -1 if marker in unclosed else text.find(marker, start + len(marker))
+            if end == -1 or end == start + len(marker):
+                if end == -1:
+                    unclosed.add(marker)
+                position = start + len(marker)
+                continue
+            if plain_start < start:
+                spans.append({"Type": "Text", "content": text[plain_start:start]})
+            content: str = text[start + len(marker):end]
+            if marker == BOLD:
+                spans.append(self._process_bold(content))
+            elif marker == ITALIC:
+                spans.append(self._process_italic(content))
+            else:
+                spans.append({"Type": "InlineCode", "content": content})
+            position = plain_start = end + len(marker)
+        if plain_start < len(text):
+            spans.append({"Type": "Text", "content": text[plain_start:]})
+        return spans
+
     def _process_bold(self, line: str) -> Dict[str, Any]:
         return {
             "Type": "Bold",
@@ -193,10 +438,180 @@ class MarkdownParser:
         }
 
 
+class MarkdownEmbedRenderer:
+    """
+    Render markdown tokens into embed pages.
+    Each heading starts a field, and text under it is packed into field values.
+    Fields are split at line boundaries when they exceed discord embed limits, and pages are split
+    when they have too many fields or characters. Text before the first heading becomes description of the first page.
+    """
+    # Discord embed limits.
+    max_title: int = 256
+    max_description: int = 2048
+    max_fields_per_embed: int = 25
+    max_chars_per_embed: int = 6000
+    max_field_name: int = 256
+    max_field_value: int = 1024
+    # Characters reserved for page footer. (ex: "12/34 페이지")
+    footer_reserve: int = 32
+
+    EMPTY_NAME: str = "\u200b"
+
+    def __init__(self, parser: Optional[MarkdownParser] = None):
+        self.parser = parser if parser is not None else MarkdownParser()
+
+    @staticmethod
+    def render_inline(spans: List[Dict[str, str]]) -> str:
+        parts: List[str] = []
+        for span in spans:
+            if span["Type"] == "Bold":
+                parts.append(f"{BOLD}{span['content']}{BOLD}")
+            elif span["Type"] == "Italic":
+                parts.append(f"{ITALIC}{span['content']}{ITALIC}")
+            elif span["Type"] == "InlineCode":
+                parts.append(f"`{span['content']}`")
+            else:
+                parts.append(span["content"])
+        return ''.join(parts)
 
+    def _render_block(self, token: Dict[str, Any]) -> List[str]:
+        """
+        Render block token into lines of discord markdown. Each returned item is never split further,
+        except code blocks which are re-fenced when they are split.
+        """
+        if token["Type"] == "Paragraph":
+            return [self.render_inline(token["content"])]
+        elif token["Type"] == "ListItem":
+            bullet: str = f"{token['Number']}." if token["Ordered"] else "•"
+            return [f"{'  ' * token['Level']}{bullet} {self.render_inline(token['content'])}"]
+        elif token["Type"] == "Blank":
+            return [""]
+        elif token["Type"] == "Code":
+            return self._split_code(token["Language"], token["content"])
+        return []
+
+    def _split_code(self, language: str, content: str) -> List[str]:
+        opening: str = f"{CODE_FENCE}{language}\n"
+        limit: int = self.max_field_value - len(opening) - len(CODE_FENCE) - 1
+        blocks: List[str] = []
+        current: List[str] = []
+        current_len: int = 0
+        for line in content.split('\n'):
+            while len(line) > limit:
+                # Line is longer than a field : hard split.
+                if len(current) > 0:
+                    blocks.append('\n'.join(current))
+                    current, current_len = [], 0
+                blocks.append(line[:limit])
+                line = line[limit:]
+            if len(current) > 0 and current_len + len(line) + 1 > limit:
+                blocks.append('\n'.join(current))
+                current, current_len = [], 0
+            current.append(line)
+            current_len += len(line) + 1
+        if len(current) > 0:
+            blocks.append('\n'.join(current))
+        return [f"{opening}{block}\n{CODE_FENCE}" for block in blocks]
+
+    def paginate(self, tokens: Iterable[Dict[str, Any]], title: str = "") -> Tuple[str, str, List[List[Dict[str, str]]]]:
+        """
+        Pack tokens into pages of fields, in single pass.
+        :return: (title, description, pages). Title is replaced with the first level-1 heading if `title` is empty.
+        """
+        pages: List[List[Dict[str, str]]] = [[]]
+        page_chars: List[int] = [0]
+        description: str = ""
+        # Text before the first heading is buffered to be used as description, until it gets too long.
+        leading: Optional[List[str]] = []
+        leading_len: int = 0
+        name: str = self.EMPTY_NAME
+        lines: List[str] = []
+        lines_len: int = 0
+
+        def add_field(value: str):
+            chars: int = len(name) + len(value)
+            fixed: int = len(title) + self.footer_reserve + (len(description) if len(pages) == 1 else 0)
+            if len(pages[-1]) >= self.max_fields_per_embed or fixed + page_chars[-1] + chars > self.max_chars_per_embed:
+                pages.append([])
+                page_chars.append(0)
+            pages[-1].append({"name": name, "value": value, "inline": False})
+            page_chars[-1] += chars
+
+        def flush(allow_empty: bool = False):
+            nonlocal lines, lines_len
+            value: str = '\n'.join(lines).strip('\n')
+            lines, lines_len = [], 0
+            if value != "" or allow_empty:
+                add_field(value if value != "" else self.EMPTY_NAME)
+
+        def append(line: str):
+            nonlocal lines_len
+            while len(line) > self.max_field_value:
+                flush()
+                lines.append(line[:self.max_field_value])
+                flush()
+                line = line[self.max_field_value:]
+            if lines_len + len(line) + 1 > self.max_field_value:
+                flush()
+            lines.append(line)
+            lines_len += len(line) + 1
+
+        def end_leading():
+            nonlocal leading, description
+            text: str = '\n'.join(leading).strip('\n')
+            if len(text) <= self.max_description:
+                description = text
+            else:
+                for line in leading:
+                    append(line)
+            leading = None
+
+        for token in tokens:
+            if token["Type"] == "Heading":
+                if leading is not None:
+                    if token["Level"] == 1 and title == "" and leading_len == 0:
+                        title = token["content"][:self.max_title]
+                        continue
+                    end_leading()
+                    flush()
+                else:
+                    flush(allow_empty=True)
+                heading: str = f"{BOLD}{token['content']}{BOLD}" if token["Level"] <= 2 else token["content"]
+                name = heading[:self.max_field_name] if token["content"] != "" else self.EMPTY_NAME
+                continue
+
+            for line in self._render_block(token):
+                if leading is not None:
+                    leading.append(line)
+                    leading_len += len(line) + 1
+                    if leading_len > self.max_description:
+                        end_leading()
+                else:
+                    append(line)
 
+        if leading is not None:
+            end_leading()
+            flush()
+        else:
+            flush(allow_empty=True)
+        if len(pages[-1]) == 0 and len(pages) > 1:
+            pages.pop()
+        return title, description, pages
 
-
-
-
-
+    async def render(self, lines: Iterable[str], title: str = "") -> List[Any]:
+        """
+        Tokenize markdown lines and render them into embeds. (one embed per page)
+        """
+        title, description, pages = self.paginate(self.parser.tokenize(lines), title=title)
+        embeds: List[Any] = []
+        for index, fields in enumerate(pages):
+            embed = await EmbedFactory(
+                title=title,
+                description=description if index == 0 else "",
+                color=EmbedFactory.default_color,
+                fields=fields
+            ).build()
+            if len(pages) > 1:
+                embed.set_footer(text=f"{index + 1}/{len(pages)} 페이지")
+            embeds.append(embed)
+        return embeds
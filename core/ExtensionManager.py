@@ -1,17 +1,31 @@
 from typing import Type, Dict, List, Tuple, Union, overload, Callable, NoReturn, Any, Optional
-from discord.ext.commands import Cog
+from concurrent.futures import ThreadPoolExecutor
+import ast, asyncio, importlib, importlib.util, sys, time
+from collections.abc import Mapping
+from discord.ext.commands import Cog, Command, Context
 from discord.ext.commands.errors import *
 from .exceptions import BadExtArguments
+from .config import thaw
 
-EXT_CONFIG = Dict[str, Union[str, Dict[str, List[Dict[str, str]]]]]
+EXT_CONFIG = Dict[str, Union[str, int, Dict[str, List[Dict[str, Union[str, bool, List[str]]]]]]]
 EXT_MAP = Dict[str, Dict[str, str]]
 
 
 class ExtensionManager:
     ext_map: EXT_MAP
     ext_storage: Dict[str, Type[Cog]]
+    # Module paths of lazy extensions, and commands which load them on first use : {module path : {name : aliases}}
+    lazy_exts: Dict[str, Dict[str, List[str]]]
+    # Startup timings of each extension (seconds) : {module path : {"prepare": float, "setup": float}}
+    load_times: Dict[str, Dict[str, float]]
 
     def __init__(self, extensions_config: EXT_CONFIG):
+        self.lazy_exts = {}
+        self.load_times = {}
+        self._lazy_locks: Dict[str, asyncio.Lock] = {}
+        # Number of threads used to import extensions concurrently before loading them. (0 to disable)
+        self.import_workers: int = extensions_config["import_workers"] \
+            if "import_workers" in extensions_config.keys() else 4
         self.ext_map = self.map(extensions_config)
 
     def map(self, extensions_config: EXT_CONFIG) -> EXT_MAP:
@@ -37,39 +51,42 @@ class ExtensionManager:
             for ext in exts:
                 ext_path = f"{base_dir}/{category}/{ext['ext_file']}"
                 ext_map[category][ext["ext_name"]] = self.convert_dir(ext_path)
+                if "lazy" in ext.keys() and ext["lazy"]:
+                    # Commands are listed as names, or as {"name": name, "aliases": [aliases]}.
+                    self.lazy_exts[ext_map[category][ext["ext_name"]]] = {
+                        command if type(command) == str else command["name"]:
+                            [] if type(command) == str else list(command["aliases"] if "aliases" in command.keys() else [])
+                        for command in (ext["commands"] if "commands" in ext.keys() else [])
+                    }
 
-        import json
-        print("[ExtensionManager.map] mapped extension_config :\n" + json.dumps(obj=ext_map, indent=4,
-                                                                                ensure_ascii=False))
         return ext_map
 
     def _validate_config(self, extensions_config: EXT_CONFIG) -> bool:
         import json
-        print(json.dumps(obj=extensions_config, indent=4, ensure_ascii=False))
         if "base_dir" not in extensions_config.keys() or "extensions" not in extensions_config.keys():
             print("[ExtensionManager.validate] extensions_config must contain keys (base_dir, extensions).")
             return False
 
-        if type(extensions_config["base_dir"]) != str or type(extensions_config["extensions"]) != dict:
+        if type(extensions_config["base_dir"]) != str or not isinstance(extensions_config["extensions"], Mapping):
             print("[ExtensionManager.validate] extensions_config base_dir, extensions must have a string value.")
             print(type(extensions_config["base_dir"]), type(extensions_config["extensions"]))
             return False
 
         for category, exts in extensions_config["extensions"].items():
-            if type(category) != str or type(exts) != list:
+            if type(category) != str or not isinstance(exts, (list, tuple)):
                 print(
                     "[ExtensionManager.validate] extensions_config category and exts(List[Dict[str, str]]) must be a string, list.")
                 print(type(category), type(exts))
                 return False
             for ext in exts:
-                if type(ext) != dict:
+                if not isinstance(ext, Mapping):
                     print(
                         "[ExtensionManager.validate] extensions_config extension in exts(List[Dict[str, str]]) must be a dictionary.")
                     print(type(ext))
                     return False
                 elif "ext_name" not in ext.keys() or "ext_file" not in ext.keys():
                     print("[ExtensionManager.validate] extensions_config must contain keys (ext_name, ext_file)")
-                    print(json.dumps(obj=ext))
+                    print(json.dumps(obj=thaw(ext)))
                     return False
                 elif type(ext["ext_name"]) != str or type(ext["ext_file"]) != str:
                     print(
@@ -287,19 +304,185 @@ class ExtensionManager:
         bot.reload_extension(self.ext_map[ext_category][ext_name])
 
     def load_all(self, bot):
+        """
+        Load every extensions in map. Modules of extensions are imported concurrently first,
+        and then loaded one by one. Lazy extensions only register command stubs, which load them on first use.
+        """
         bot.get_logger().info(
             msg="[ExtensionManager.load_all] loading all extensions in map..."
         )
-        for ext_category, exts in self.ext_map.items():
-            print("EXT CATEGORY :", ext_category)
-            for ext_name, ext_path in exts.items():
-                print("EXT NAME :", ext_name)
-                print("EXT PATH :", ext_path)
-                self.load_ext(bot=bot, ext_category=ext_category, ext_name=ext_name, ext_dir=ext_path)
+        started: float = time.perf_counter()
+        eager_exts: List[Tuple[str, str, str]] = [
+            (ext_category, ext_name, ext_path)
+            for ext_category, exts in self.ext_map.items()
+            for ext_name, ext_path in exts.items()
+            if ext_path not in self.lazy_exts.keys()
+        ]
+        prepare_times: Dict[str, float] = self.prepare_imports(
+            bot=bot, ext_paths=[ext_path for _, _, ext_path in eager_exts if ext_path not in bot.extensions]
+        )
+        for ext_category, ext_name, ext_path in eager_exts:
+            setup_started: float = time.perf_counter()
+            self.load_ext(bot=bot, ext_category=ext_category, ext_name=ext_name, ext_dir=ext_path)
+            self.load_times[ext_path] = {
+                "prepare": prepare_times[ext_path] if ext_path in prepare_times.keys() else 0.0,
+                "setup": time.perf_counter() - setup_started
+            }
+        for ext_path in self.lazy_exts.keys():
+            self.register_lazy(bot=bot, ext_path=ext_path)
+
         bot.get_logger().info(
-            msg="[ExtensionManager.load_all] successfully loaded all extensions in map!"
+            msg=f"[ExtensionManager.load_all] successfully loaded all extensions in map! "
+                f"({round(time.perf_counter() - started, 3)}s, {len(self.lazy_exts)} lazy extensions)\n"
+                + '\n'.join(
+                    f"  {ext_path} : prepare {round(times['prepare'], 3)}s, setup {round(times['setup'], 3)}s"
+                    for ext_path, times in sorted(
+                        self.load_times.items(), key=lambda item: item[1]["prepare"] + item[1]["setup"], reverse=True
+                    )
+                )
         )
 
+    def prepare_imports(self, bot, ext_paths: List[str]) -> Dict[str, float]:
+        """
+        Import third-party modules which extensions depend on concurrently, so they are cached in `sys.modules`
+        before `bot.load_extension` executes extensions. Extension modules themselves are never imported here,
+        since `load_extension` always executes them again. Failures are ignored here, and reported while loading.
+        :return: seconds taken to import dependencies of each extension.
+        """
+        if self.import_workers <= 0 or len(ext_paths) == 0:
+            return {}
+
+        def prepare(ext_path: str) -> Tuple[str, float]:
+            started: float = time.perf_counter()
+            try:
+                for module_name in self.find_dependencies(ext_path):
+                    importlib.import_module(module_name)
+            except Exception as e:
+                bot.get_logger().debug(msg=f"[ExtensionManager.prepare_imports] Failed to prepare {ext_path} : {e}")
+            return ext_path, time.perf_counter() - started
+
+        with ThreadPoolExecutor(max_workers=self.import_workers, thread_name_prefix="latte-ext-import") as executor:
+            return dict(executor.map(prepare, ext_paths))
+
+    # Top-level packages of latte itself. They are imported by latte before extensions are loaded.
+    own_packages: Tuple[str, ...] = ("core", "utils", "extensions")
+
+    @staticmethod
+    def parse_module(ext_path: str) -> Optional[ast.Module]:
+        """
+        Parse source of the module without executing it.
+        """
+        spec = importlib.util.find_spec(ext_path)
+        if spec is None or spec.origin is None or not spec.origin.endswith(".py"):
+            return None
+        with open(spec.origin, mode="rt", encoding="utf-8") as module_file:
+            return ast.parse(module_file.read(), filename=spec.origin)
+
+    def find_dependencies(self, ext_path: str) -> List[str]:
+        """
+        :return: absolute imports at the top level of the extension module, except latte`s own packages.
+        """
+        tree: Optional[ast.Module] = self.parse_module(ext_path)
+        if tree is None:
+            return []
+        modules: List[str] = []
+        for node in tree.body:
+            if isinstance(node, ast.Import):
+                modules.extend(alias.name for alias in node.names)
+            elif isinstance(node, ast.ImportFrom) and node.level == 0 and node.module is not None:
+                modules.append(node.module)
+        return [
+            module for module in modules
+            if module.split('.')[0] not in self.own_packages and module not in sys.modules
+        ]
+
+    def find_aliases(self, ext_path: str, command_names: List[str]) -> Dict[str, List[str]]:
+        """
+        Read literal `aliases` of commands declared in the extension module, without executing it.
+        """
+        try:
+            tree: Optional[ast.Module] = self.parse_module(ext_path)
+        except (OSError, SyntaxError, ImportError):
+            return {}
+        found: Dict[str, List[str]] = {}
+        for node in ast.walk(tree) if tree is not None else []:
+            if not isinstance(node, ast.Call):
+                continue
+            keywords: Dict[str, ast.expr] = {keyword.arg: keyword.value for keyword in node.keywords if keyword.arg}
+            if "name" not in keywords or "aliases" not in keywords:
+                continue
+            try:
+                name: Any = ast.literal_eval(keywords["name"])
+                aliases: Any = ast.literal_eval(keywords["aliases"])
+            except ValueError:
+                continue
+            if name in command_names and isinstance(aliases, (list, tuple)):
+                found[name] = [alias for alias in aliases if isinstance(alias, str) and alias != ""]
+        return found
+
+    def register_lazy(self, bot, ext_path: str):
+        """
+        Register command stubs of lazy extension. Stub loads the extension, and invokes the real command again.
+        Aliases of stubs are declared ones in extension config, and ones found in the extension module.
+        """
+        if ext_path in bot.extensions:
+            return
+        found: Dict[str, List[str]] = self.find_aliases(ext_path, list(self.lazy_exts[ext_path].keys()))
+        for command_name, aliases in self.lazy_exts[ext_path].items():
+            if bot.get_command(command_name) is not None:
+                continue
+            stub_aliases: List[str] = [
+                alias for alias in dict.fromkeys(aliases + (found[command_name] if command_name in found else []))
+                if bot.get_command(alias) is None
+            ]
+            bot.add_command(Command(
+                self._create_stub(bot=bot, ext_path=ext_path), name=command_name, aliases=stub_aliases, hidden=True
+            ))
+        bot.get_logger().info(
+            msg=f"[ExtensionManager.register_lazy] Registered lazy extension {ext_path} "
+                f"with commands {list(self.lazy_exts[ext_path].keys())}"
+        )
+
+    def _create_stub(self, bot, ext_path: str) -> Callable:
+        async def stub(ctx: Context, *, args: str = None):
+            await self.load_lazy(bot=bot, ext_path=ext_path)
+            if ext_path not in bot.extensions:
+                return
+            real: Optional[Command] = bot.get_command(ctx.invoked_with)
+            if real is None or real.callback is stub:
+                return
+            # Invoke the real command in this context, instead of dispatching the message again :
+            # `bot.invoke` would run global checks, hooks and `on_command` events twice.
+            # Rewind the view consumed by the stub to just after the invoker, so the real command parses arguments.
+            ctx.view.index = ctx.view.previous = len(ctx.prefix) + len(ctx.invoked_with)
+            ctx.command = real
+            await real.invoke(ctx)
+        return stub
+
+    async def load_lazy(self, bot, ext_path: str):
+        """
+        Load lazy extension on first use of its commands.
+        """
+        if ext_path not in self._lazy_locks.keys():
+            self._lazy_locks[ext_path] = asyncio.Lock()
+        async with self._lazy_locks[ext_path]:
+            if ext_path in bot.extensions:
+                return
+            for command_name in self.lazy_exts[ext_path].keys():
+                # Aliases of the stub are removed together.
+                bot.remove_command(command_name)
+            started: float = time.perf_counter()
+            self.load_ext(bot=bot, ext_dir=ext_path)
+            self.load_times[ext_path] = {"prepare": 0.0, "setup": time.perf_counter() - started}
+            if ext_path not in bot.extensions:
+                # Failed to load. Keep stubs, so the extension can be loaded again on next use.
+                self.register_lazy(bot=bot, ext_path=ext_path)
+                return
+            bot.get_logger().info(
+                msg=f"[ExtensionManager.load_lazy] Loaded lazy extension {ext_path} on first use "
+                    f"({round(self.load_times[ext_path]['setup'], 3)}s)"
+            )
+
     def unload_all(self, bot):
         bot.get_logger().info(
             msg="[ExtensionManager.unload_all] unloading all extensions in map..."
@@ -0,0 +1,110 @@
+"""
+core/HTTPClient.py
+~~~~~~~~~~~~~~~~~~
+Module for latte`s shared http client.
+
+HTTPClient : Bot-owned aiohttp session. Every extension should send http requests using `bot.http_client`
+             instead of creating their own `aiohttp.ClientSession`, so the connection pool, dns cache and
+             keep-alive connections can be shared across the whole bot.
+"""
+import asyncio, logging
+from typing import Any, Dict, Optional, Union
+import aiohttp
+
+RESPONSE = Union[Dict[str, Any], str, bytes]
+
+
+class HTTPClient:
+    """
+    Shared http client which owns single `aiohttp.ClientSession` with bounded keep-alive connection pool.
+    Session is created lazily on the running event loop (:meth:`start`), and must be closed using :meth:`close`.
+    """
+
+    # Default options. Can be overridden with `http` section in bot config.
+    default_options: Dict[str, Union[int, float]] = {
+        "limit": 100,               # Maximum number of simultaneous connections.
+        "limit_per_host": 10,       # Maximum number of simultaneous connections for each host.
+        "dns_cache_ttl": 300,       # Seconds to cache resolved dns records.
+        "keepalive_timeout": 30,    # Seconds to keep idle connections in pool.
+        "total_timeout": 30,        # Seconds for entire request including reading response body.
+        "connect_timeout": 10       # Seconds to acquire connection from pool and connect to the host.
+    }
+
+    def __init__(self, logger: Optional[logging.Logger] = None, **options):
+        self.options: Dict[str, Union[int, float]] = {**self.default_options, **options}
+        self.logger = logger if logger is not None else logging.getLogger("latte.http")
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            raise RuntimeError("HTTPClient is not started! Call `HTTPClient.start()` before sending requests.")
+        return self._session
+
+    def is_started(self) -> bool:
+        return self._session is not None and not self._session.closed
+
+    async def start(self):
+        """
+        Create shared session. Must be called inside of running event loop.
+        """
+        async with self._lock:
+            if self.is_started():
+                return
+            connector = aiohttp.TCPConnector(
+                limit=int(self.options["limit"]),
+                limit_per_host=int(self.options["limit_per_host"]),
+                ttl_dns_cache=self.options["dns_cache_ttl"],
+                use_dns_cache=True,
+                keepalive_timeout=self.options["keepalive_timeout"]
+            )
+            timeout = aiohttp.ClientTimeout(
+                total=self.options["total_timeout"],
+                connect=self.options["connect_timeout"]
+            )
+            self._session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+            self.logger.info(msg=f"[HTTPClient.start] Created shared http session with options : {self.options}")
+
+    async def close(self):
+        """
+        Close shared session and release every pooled connections.
+        """
+        async with self._lock:
+            if self._session is not None and not self._session.closed:
+                await self._session.close()
+                # Give underlying ssl transports a chance to close gracefully.
+                await asyncio.sleep(0.25)
+                self.logger.info(msg="[HTTPClient.close] Closed shared http session.")
+            self._session = None
+
+    async def request(self, method: str, url: str, response_type: str = "json", **kwargs) -> RESPONSE:
+        """
+        Send http request using shared session and return the response body.
+        :param method: http method to use.
+        :param url: url to request.
+        :param response_type: type of the response body to return. (json / text / bytes)
+        :param kwargs: keyword arguments passed into `aiohttp.ClientSession.request()`.
+        :return: response body processed as `response_type`.
+        """
+        if not self.is_started():
+            await self.start()
+        async with self.session.request(method=method, url=url, **kwargs) as response:
+            return await self.read_response(response, response_type)
+
+    async def get(self, url: str, response_type: str = "json", **kwargs) -> RESPONSE:
+        return await self.request("GET", url, response_type=response_type, **kwargs)
+
+    async def post(self, url: str, response_type: str = "json", **kwargs) -> RESPONSE:
+        return await self.request("POST", url, response_type=response_type, **kwargs)
+
+    @staticmethod
+    async def read_response(response: aiohttp.ClientResponse, response_type: str = "json") -> RESPONSE:
+        if response_type == "json":
+            return await response.json()
+        elif response_type == "text":
+            return await response.text(encoding="utf-8")
+        elif response_type == "bytes":
+            return await response.read()
+        else:
+            raise ValueError("Unexpected response type!")
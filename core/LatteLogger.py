@@ -0,0 +1,158 @@
+"""
+core/LatteLogger.py
+~~~~~~~~~~~~~~~~~~~
+Module for latte`s logging pipeline.
+
+LogPipeline : Loggers only put records into a queue (`QueueHandler`), and a background thread (`QueueListener`)
+              writes them into console and size-rotated log files. So slow disk or stdout never blocks event loop.
+JSONFormatter : Formatter which writes each record as single json line, for log collectors.
+TracebackQueueHandler : QueueHandler which keeps traceback of the record apart from its message,
+                        so JSONFormatter can still write it as separate field in the listener thread.
+"""
+import copy, json, logging, os, queue, sys
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Any, Dict, List, Optional, Union
+
+LOG_FORMAT: str = "[%(asctime)s] [%(levelname)s] %(name)s: %(message)s"
+
+
+class JSONFormatter(logging.Formatter):
+    """
+    Format log record as json object in single line.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        data: Dict[str, Any] = {
+            "time": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "message": record.getMessage()
+        }
+        # Records from the queue only have formatted traceback. (See `TracebackQueueHandler`)
+        if record.exc_text:
+            data["exc_info"] = record.exc_text
+        elif record.exc_info:
+            data["exc_info"] = self.formatException(record.exc_info)
+        if record.stack_info:
+            data["stack_info"] = record.stack_info
+        return json.dumps(data, ensure_ascii=False)
+
+
+class TracebackQueueHandler(QueueHandler):
+    """
+    Default `QueueHandler.prepare` merges traceback into the message and drops `exc_info`, because traceback objects
+    can`t cross threads safely. This one formats traceback into `exc_text` instead, and keeps it apart from the message.
+    """
+    exception_formatter: logging.Formatter = logging.Formatter()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.exception_formatter.formatException(record.exc_info)
+        record.msg = record.message
+        record.args = None
+        record.exc_info = None
+        return record
+
+
+class LogPipeline:
+    """
+    Queue-based logging pipeline shared by `discord` and `latte` loggers.
+    """
+
+    # Default options. Can be overridden with `logging` section in bot config.
+    default_options: Dict[str, Union[str, int, bool]] = {
+        "path": "./logs/Latte/latte.log",   # Path of log file. Rotated files get suffix `.1`, `.2`, ...
+        "max_bytes": 10 * 1024 * 1024,      # Size of log file to rotate.
+        "backup_count": 7,                  # Number of rotated log files to keep.
+        "json": False,                      # Write log file as json lines instead of plain text.
+        "console": True                     # Write logs into stdout too.
+    }
+
+    def __init__(self, **options):
+        self.options: Dict[str, Union[str, int, bool]] = {**self.default_options, **options}
+        self.loggers: List[logging.Logger] = []
+        self.queue: "queue.Queue[logging.LogRecord]" = queue.Queue()
+        self.queue_handler = TracebackQueueHandler(self.queue)
+        self.handlers: List[logging.Handler] = []
+        self.listener: Optional[QueueListener] = None
+
+    def _create_handlers(self) -> List[logging.Handler]:
+        handlers: List[logging.Handler] = []
+        if self.options["console"]:
+            console_handler: logging.Handler = logging.StreamHandler(sys.stdout)
+            console_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+            handlers.append(console_handler)
+
+        log_dir: str = os.path.dirname(self.options["path"])
+        if log_dir != '':
+            os.makedirs(log_dir, exist_ok=True)
+        file_handler: logging.Handler = RotatingFileHandler(
+            filename=self.options["path"],
+            maxBytes=self.options["max_bytes"],
+            backupCount=self.options["backup_count"],
+            encoding="utf-8",
+            delay=True
+        )
+        file_handler.setFormatter(JSONFormatter() if self.options["json"] else logging.Formatter(LOG_FORMAT))
+        handlers.append(file_handler)
+        return handlers
+
+    def attach(self, *loggers: logging.Logger):
+        """
+        Route records of loggers into the pipeline.
+        """
+        for logger in loggers:
+            if logger not in self.loggers:
+                self.loggers.append(logger)
+                logger.addHandler(self.queue_handler)
+
+    def start(self):
+        """
+        Start background writer thread.
+        """
+        if self.listener is not None:
+            return
+        self.handlers = self._create_handlers()
+        for logger in self.loggers:
+            for handler in self.handlers:
+                logger.removeHandler(handler)
+            logger.addHandler(self.queue_handler)
+        self.listener = QueueListener(self.queue, *self.handlers, respect_handler_level=True)
+        self.listener.start()
+
+    def stop(self):
+        """
+        Write every queued records and stop background writer thread.
+        Records logged after this are written directly by handlers, since event loop is not running anymore.
+        """
+        if self.listener is None:
+            return
+        self.listener.stop()
+        self.listener = None
+        for logger in self.loggers:
+            logger.removeHandler(self.queue_handler)
+            for handler in self.handlers:
+                logger.addHandler(handler)
+
+    def configure(self, **options):
+        """
+        Apply new options, recreating handlers.
+        """
+        was_running: bool = self.listener is not None
+        self.stop()
+        self.close_handlers()
+        self.options.update(options)
+        if was_running:
+            self.start()
+
+    def close_handlers(self):
+        for logger in self.loggers:
+            for handler in self.handlers:
+                logger.removeHandler(handler)
+        for handler in self.handlers:
+            handler.close()
+        self.handlers = []
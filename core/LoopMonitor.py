@@ -0,0 +1,166 @@
+"""
+core/LoopMonitor.py
+~~~~~~~~~~~~~~~~~~~
+Module for monitoring health of latte`s event loop.
+
+LoopMonitor : Heartbeat task measures scheduling lag of event loop continuously.
+              Watchdog thread samples the stack of event loop thread while the heartbeat is late,
+              so callbacks blocking the loop longer than `threshold` seconds are caught in the act,
+              attributed to extension module (cog / listener) which ran them, and reported through the logger.
+"""
+import asyncio, logging, sys, threading, time
+from collections import Counter, deque
+from types import FrameType
+from typing import Deque, Dict, List, NamedTuple, Optional, Tuple, Union
+
+
+class Stall(NamedTuple):
+    started: float              # time.time() when the loop was found blocked.
+    duration: float             # seconds the loop was blocked.
+    owner: str                  # module and function which blocked the loop.
+    stack: List[str]            # most sampled stack of loop thread. (outermost first)
+
+
+class StallStats:
+    __slots__ = ("count", "total", "max")
+
+    def __init__(self):
+        self.count: int = 0
+        self.total: float = 0.0
+        self.max: float = 0.0
+
+
+class LoopMonitor:
+    # Modules whose frames are used to attribute stalls, checked from the innermost frame.
+    owner_prefixes: Tuple[str, ...] = ("extensions.", "core.", "utils.")
+
+    def __init__(self, interval: float = 0.5, threshold: float = 0.25, sample_interval: float = 0.05,
+                 max_stalls: int = 50, logger: Optional[logging.Logger] = None):
+        self.interval = interval
+        self.threshold = threshold
+        self.sample_interval = sample_interval
+        self.logger = logger if logger is not None else logging.getLogger("latte.loop")
+
+        # Lag statistics (seconds)
+        self.lags: Deque[float] = deque(maxlen=120)
+        self.max_lag: float = 0.0
+
+        # Stalls
+        self.stalls: Deque[Stall] = deque(maxlen=max_stalls)
+        self.owners: Dict[str, StallStats] = {}
+
+        self._loop_thread_id: Optional[int] = None
+        self._last_beat: float = time.monotonic()
+        # Stacks sampled by watchdog thread during current stall. Only appended by watchdog and swapped by heartbeat.
+        self._samples: List[Tuple[str, ...]] = []
+        self._stall_started: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def start(self):
+        """
+        Start heartbeat task and watchdog thread. Must be called in event loop thread.
+        """
+        if self._task is not None and not self._task.done():
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._stop.clear()
+        self._task = asyncio.ensure_future(self._heartbeat())
+        self._thread = threading.Thread(target=self._watchdog, name="latte-loop-watchdog", daemon=True)
+        self._thread.start()
+
+    def close(self):
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+
+    async def _heartbeat(self):
+        while True:
+            expected: float = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now: float = time.monotonic()
+            lag: float = max(now - expected, 0.0)
+            self._last_beat = now
+            self.lags.append(lag)
+            if lag > self.max_lag:
+                self.max_lag = lag
+            if lag >= self.threshold:
+                self._finish_stall(lag)
+
+    def _watchdog(self):
+        while not self._stop.wait(self.sample_interval):
+            if time.monotonic() - self._last_beat < self.interval + self.threshold:
+                continue
+            frame: Optional[FrameType] = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+            if self._stall_started is None:
+                self._stall_started = time.time()
+            self._samples.append(self._extract(frame))
+
+    @staticmethod
+    def _extract(frame: FrameType) -> Tuple[str, ...]:
+        stack: List[str] = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append(f"{frame.f_globals.get('__name__', '?')}:{getattr(code, 'co_qualname', code.co_name)}:{frame.f_lineno}")
+            frame = frame.f_back
+        stack.reverse()
+        return tuple(stack)
+
+    def _finish_stall(self, lag: float):
+        samples, self._samples = self._samples, []
+        started, self._stall_started = self._stall_started, None
+        if len(samples) == 0:
+            # Stall was shorter than watchdog could catch. Only lag is known.
+            stack: Tuple[str, ...] = ()
+            owner: str = "UNKNOWN"
+        else:
+            stack = Counter(samples).most_common(1)[0][0]
+            owner = self.attribute(stack)
+
+        stall = Stall(started=started if started is not None else time.time() - lag, duration=lag,
+                      owner=owner, stack=list(stack))
+        self.stalls.append(stall)
+        if owner not in self.owners:
+            self.owners[owner] = StallStats()
+        stats: StallStats = self.owners[owner]
+        stats.count += 1
+        stats.total += lag
+        stats.max = max(stats.max, lag)
+
+        self.logger.warning(
+            msg=f"[LoopMonitor] Event loop was blocked for {lag:.3f}s by {owner} ({len(samples)} samples)."
+                + ("\n" + '\n'.join(f"  {line}" for line in stack[-15:]) if len(stack) > 0 else "")
+        )
+
+    def attribute(self, stack: Tuple[str, ...]) -> str:
+        """
+        Return innermost frame of latte`s own modules in the stack. (ex: extensions.Utility.InvitesExt:InviteCog.update)
+        """
+        for line in reversed(stack):
+            if line.startswith(self.owner_prefixes):
+                return line.rsplit(':', 1)[0]
+        return stack[-1].rsplit(':', 1)[0] if len(stack) > 0 else "UNKNOWN"
+
+    def get_stats(self) -> Dict[str, Union[int, float, List[Tuple[str, int, float, float]]]]:
+        recent: List[float] = list(self.lags)
+        return {
+            "last_lag": round(recent[-1], 4) if len(recent) > 0 else 0.0,
+            "avg_lag": round(sum(recent) / len(recent), 4) if len(recent) > 0 else 0.0,
+            "max_lag": round(self.max_lag, 4),
+            "stalls": sum(stats.count for stats in self.owners.values()),
+            "owners": sorted(
+                [(owner, stats.count, round(stats.total, 3), round(stats.max, 3)) for owner, stats in self.owners.items()],
+                key=lambda item: item[2], reverse=True
+            )
+        }
+
+    def get_last_stall(self) -> Optional[Stall]:
+        return self.stalls[-1] if len(self.stalls) > 0 else None
@@ -0,0 +1,77 @@
+"""
+core/MessageFilter.py
+~~~~~~~~~~~~~~~~~~~~~
+Module for dropping messages which no command or listener is interested in, before they are dispatched.
+
+MessageFilter : Single compiled regex over every command prefixes (default prefix and guild-specific prefixes)
+                and trigger phrases registered by listeners. Messages matching nothing are dropped in
+                `Latte.dispatch`, so command context and listener tasks are never created for plain chat messages.
+                Listeners which need every message must call `require_all_messages`, which disables the filter.
+"""
+import re
+from typing import Dict, Iterable, Optional, Pattern, Set
+
+
+class MessageFilter:
+    def __init__(self):
+        self._prefixes: Set[str] = set()
+        self._triggers: Dict[str, Set[str]] = {}      # owner -> exact trigger phrases
+        self._require_all: Set[str] = set()           # owners which need every message
+        self._pattern: Optional[Pattern[str]] = None
+
+        # Statistics
+        self.accepted: int = 0
+        self.dropped: int = 0
+
+    def set_prefixes(self, prefixes: Iterable[str]):
+        self._prefixes = {prefix for prefix in prefixes if prefix != ""}
+        self._pattern = None
+
+    def add_triggers(self, owner: str, phrases: Iterable[str]):
+        """
+        Register phrases which exactly match messages that `owner` listens to.
+        """
+        self._triggers[owner] = set(phrases)
+        self._pattern = None
+
+    def require_all_messages(self, owner: str):
+        self._require_all.add(owner)
+
+    def remove_owner(self, owner: str):
+        self._triggers.pop(owner, None)
+        self._require_all.discard(owner)
+        self._pattern = None
+
+    def is_enabled(self) -> bool:
+        return len(self._require_all) == 0
+
+    def compile(self) -> Pattern[str]:
+        """
+        Compile prefixes and trigger phrases into single regex. Longer alternatives are tried first.
+        """
+        triggers: Set[str] = set().union(*self._triggers.values()) if len(self._triggers) > 0 else set()
+        alternatives = []
+        if len(self._prefixes) > 0:
+            alternatives.append(
+                "(?:" + '|'.join(re.escape(prefix) for prefix in sorted(self._prefixes, key=len, reverse=True)) + ")"
+            )
+        if len(triggers) > 0:
+            alternatives.append(
+                "(?:" + '|'.join(re.escape(phrase) for phrase in sorted(triggers, key=len, reverse=True)) + r")\Z"
+            )
+        # Pattern which never matches, when there is nothing to match.
+        self._pattern = re.compile('|'.join(alternatives) if len(alternatives) > 0 else r"(?!)")
+        return self._pattern
+
+    def accepts(self, content: str) -> bool:
+        """
+        Return whether the message content can matter to any command or listener.
+        """
+        if len(self._require_all) > 0:
+            return True
+        pattern: Pattern[str] = self._pattern if self._pattern is not None else self.compile()
+        if pattern.match(content) is not None:
+            self.accepted += 1
+            return True
+        self.dropped += 1
+        return False
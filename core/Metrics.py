@@ -0,0 +1,247 @@
+"""
+core/Metrics.py
+~~~~~~~~~~~~~~~
+Module for command metrics of latte.
+
+LogHistogram : Latency histogram using log-scaled buckets. (4 buckets per power of two, so error is under 25%)
+MetricsRegistry : Per-command and per-shard count, error count and latency histogram.
+                  Recorded in bot-wide `before_invoke` / `after_invoke` hooks, and exposed through
+                  owner command and local prometheus text endpoint.
+"""
+import logging, time
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+from aiohttp import web
+from discord.ext import commands
+
+METRIC_KEY = Tuple[str, int]    # (command qualified name, shard id)
+
+# Bucket index of value is `_BUCKET_BASE[bits] | ((value >> _BUCKET_SHIFT[bits]) & 3)` where bits is its bit length.
+# Values under 4 (bits <= 2) are stored in bucket of the value itself. Precomputed, so recording needs no branches.
+_BUCKET_BASE: Tuple[int, ...] = tuple(0 if bits <= 2 else (bits - 2) << 2 for bits in range(65))
+_BUCKET_SHIFT: Tuple[int, ...] = tuple(0 if bits <= 2 else bits - 3 for bits in range(65))
+
+
+class LogHistogram:
+    __slots__ = ("buckets", "count", "sum", "max")
+
+    sub_buckets: int = 4
+    # Bucket index grows 4 per power of two, so 256 buckets cover every 64-bit nanoseconds.
+    size: int = 4 * 64
+
+    def __init__(self):
+        self.buckets: List[int] = [0] * self.size
+        self.count: int = 0
+        self.sum: int = 0
+        self.max: int = 0
+
+    @staticmethod
+    def index(value: int) -> int:
+        bits: int = value.bit_length()
+        if bits <= 2:
+            return value
+        # Top 3 bits of value select sub bucket : [4, 8) << (bits - 3)
+        return ((bits - 2) << 2) | ((value >> (bits - 3)) & 3)
+
+    @staticmethod
+    def upper_bound(index: int) -> int:
+        """
+        Exclusive upper bound of values stored in bucket.
+        """
+        if index < 4:
+            return index + 1
+        bits, sub = (index >> 2) + 2, index & 3
+        return (5 + sub) << (bits - 3)
+
+    def record(self, value: int):
+        # Same as `index`, using precomputed tables since it runs for every command.
+        bits: int = value.bit_length()
+        self.buckets[_BUCKET_BASE[bits] | ((value >> _BUCKET_SHIFT[bits]) & 3)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def merge(self, other: "LogHistogram"):
+        self.count += other.count
+        self.sum += other.sum
+        self.max = max(self.max, other.max)
+        buckets: List[int] = self.buckets
+        for index, count in enumerate(other.buckets):
+            if count > 0:
+                buckets[index] += count
+
+    def percentile(self, q: float) -> int:
+        """
+        Return upper bound of bucket containing q-quantile. (0 < q <= 1)
+        """
+        if self.count == 0:
+            return 0
+        target: float = q * self.count
+        seen: int = 0
+        for index, count in enumerate(self.buckets):
+            seen += count
+            if seen >= target:
+                return min(self.upper_bound(index), self.max)
+        return self.max
+
+    def cumulative(self, bounds: List[int]) -> Iterator[Tuple[int, int]]:
+        """
+        Yield (bound, number of values lower than bound) for each bound. Bounds must be powers of two.
+        """
+        seen: int = 0
+        index: int = 0
+        for bound in bounds:
+            while index < self.size and self.upper_bound(index) <= bound:
+                seen += self.buckets[index]
+                index += 1
+            yield bound, seen
+
+
+class CommandMetrics(LogHistogram):
+    """
+    Latency histogram of a command with its error count. Invoke count is the count of the histogram,
+    so recording a command updates single object.
+    """
+    __slots__ = ("errors",)
+
+    def __init__(self):
+        super().__init__()
+        self.errors: int = 0
+
+    @property
+    def latency(self) -> LogHistogram:
+        return self
+
+
+class MetricsRegistry:
+    # Prometheus histogram bounds : powers of two from ~131us to ~68s, in nanoseconds.
+    prometheus_bounds: List[int] = [1 << exp for exp in range(17, 37)]
+
+    def __init__(self, logger: Optional[logging.Logger] = None):
+        self.logger = logger if logger is not None else logging.getLogger("latte.metrics")
+        self.commands: Dict[METRIC_KEY, CommandMetrics] = {}
+        self.started_at: float = time.time()
+        self._runner: Optional[web.AppRunner] = None
+
+    """
+    Hooks
+    Register them using `bot.before_invoke` and `bot.after_invoke`, so every command of every cog is measured.
+    """
+
+    async def before_invoke(self, ctx: commands.Context):
+        ctx.invoke_started_ns = time.perf_counter_ns()
+
+    async def after_invoke(self, ctx: commands.Context):
+        started: Optional[int] = getattr(ctx, "invoke_started_ns", None)
+        if started is None:
+            return
+        self.record(
+            command=ctx.command.qualified_name if ctx.command is not None else "UNKNOWN",
+            shard_id=ctx.guild.shard_id if ctx.guild is not None else 0,
+            elapsed_ns=time.perf_counter_ns() - started,
+            failed=ctx.command_failed
+        )
+
+    def record(self, command: str, shard_id: int, elapsed_ns: int, failed: bool = False):
+        key: METRIC_KEY = (command, shard_id)
+        try:
+            metrics: CommandMetrics = self.commands[key]
+        except KeyError:
+            metrics = self.commands[key] = CommandMetrics()
+        if failed:
+            metrics.errors += 1
+        # Same as `LogHistogram.record`, inlined to save a method call on every command.
+        bits: int = elapsed_ns.bit_length()
+        metrics.buckets[_BUCKET_BASE[bits] | ((elapsed_ns >> _BUCKET_SHIFT[bits]) & 3)] += 1
+        metrics.count += 1
+        metrics.sum += elapsed_ns
+        if elapsed_ns > metrics.max:
+            metrics.max = elapsed_ns
+
+    """
+    Query
+    """
+
+    def merged(self) -> Dict[str, CommandMetrics]:
+        """
+        Merge metrics of every shards for each command.
+        """
+        merged: Dict[str, CommandMetrics] = {}
+        for (command, shard_id), metrics in self.commands.items():
+            if command not in merged:
+                merged[command] = CommandMetrics()
+            target: CommandMetrics = merged[command]
+            target.errors += metrics.errors
+            target.merge(metrics)
+        return merged
+
+    def get_stats(self, limit: int = 10) -> List[Dict[str, Union[str, int, float]]]:
+        """
+        Return summary of most used commands. Latencies are in milliseconds.
+        """
+        stats: List[Dict[str, Union[str, int, float]]] = []
+        for command, metrics in sorted(self.merged().items(), key=lambda item: item[1].count, reverse=True)[:limit]:
+            stats.append({
+                "command": command,
+                "count": metrics.count,
+                "errors": metrics.errors,
+                "p50": round(metrics.latency.percentile(0.5) / 1e6, 2),
+                "p95": round(metrics.latency.percentile(0.95) / 1e6, 2),
+                "p99": round(metrics.latency.percentile(0.99) / 1e6, 2),
+                "max": round(metrics.latency.max / 1e6, 2)
+            })
+        return stats
+
+    def to_prometheus(self) -> str:
+        """
+        Render metrics in prometheus text exposition format.
+        """
+        lines: List[str] = [
+            "# HELP latte_command_total Number of invoked commands.",
+            "# TYPE latte_command_total counter"
+        ]
+        for (command, shard_id), metrics in self.commands.items():
+            lines.append(f'latte_command_total{{command="{command}",shard="{shard_id}"}} {metrics.count}')
+        lines += [
+            "# HELP latte_command_errors_total Number of commands failed during invoke.",
+            "# TYPE latte_command_errors_total counter"
+        ]
+        for (command, shard_id), metrics in self.commands.items():
+            lines.append(f'latte_command_errors_total{{command="{command}",shard="{shard_id}"}} {metrics.errors}')
+        lines += [
+            "# HELP latte_command_duration_seconds Time taken to invoke commands.",
+            "# TYPE latte_command_duration_seconds histogram"
+        ]
+        for (command, shard_id), metrics in self.commands.items():
+            labels: str = f'command="{command}",shard="{shard_id}"'
+            for bound, count in metrics.latency.cumulative(self.prometheus_bounds):
+                lines.append(f'latte_command_duration_seconds_bucket{{{labels},le="{bound / 1e9:.6f}"}} {count}')
+            lines.append(f'latte_command_duration_seconds_bucket{{{labels},le="+Inf"}} {metrics.latency.count}')
+            lines.append(f'latte_command_duration_seconds_sum{{{labels}}} {metrics.latency.sum / 1e9:.6f}')
+            lines.append(f'latte_command_duration_seconds_count{{{labels}}} {metrics.latency.count}')
+        return '\n'.join(lines) + '\n'
+
+    """
+    Prometheus endpoint
+    """
+
+    async def _handle_metrics(self, request: web.Request) -> web.Response:
+        return web.Response(text=self.to_prometheus(), content_type="text/plain", charset="utf-8")
+
+    async def start_server(self, host: str = "127.0.0.1", port: int = 9100):
+        """
+        Serve prometheus text endpoint at http://host:port/metrics.
+        """
+        if self._runner is not None:
+            return
+        app = web.Application()
+        app.router.add_get("/metrics", self._handle_metrics)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, host=host, port=port).start()
+        self.logger.info(msg=f"[MetricsRegistry.start_server] Serving metrics at http://{host}:{port}/metrics")
+
+    async def close(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
@@ -0,0 +1,96 @@
+"""
+core/Profiler.py
+~~~~~~~~~~~~~~~~
+Module for profiling latte while it is running.
+
+SamplingProfiler : Statistical profiler which samples stacks of threads from background thread every `interval` seconds.
+                   Profiled code is never traced, so overhead is limited to the sampling thread itself.
+                   Result is written as collapsed stacks ("frame;frame;frame count" per line),
+                   which can be rendered using flamegraph.pl, speedscope, etc.
+"""
+import sys, threading, time
+from collections import Counter
+from types import FrameType
+from typing import Dict, List, Optional
+
+
+class SamplingProfiler:
+    def __init__(self, interval: float = 0.005, thread_id: Optional[int] = None, with_lineno: bool = False):
+        """
+        :param interval: seconds between samples.
+        :param thread_id: id of the thread to profile. Every threads except the sampler are profiled if None.
+        :param with_lineno: whether to distinguish frames by line number.
+        """
+        self.interval = interval
+        self.thread_id = thread_id
+        self.with_lineno = with_lineno
+
+        self.stacks: Counter = Counter()
+        self.samples: int = 0
+        self.started_at: Optional[float] = None
+        self.elapsed: float = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.is_running():
+            return
+        self._stop.clear()
+        self.started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._sample_loop, name="latte-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        self.elapsed = time.perf_counter() - self.started_at
+
+    def _sample_loop(self):
+        sampler_id: int = threading.get_ident()
+        names: Dict[int, str] = {thread.ident: thread.name for thread in threading.enumerate()}
+        while not self._stop.wait(self.interval):
+            frames: Dict[int, FrameType] = sys._current_frames()
+            if self.thread_id is not None:
+                frame: Optional[FrameType] = frames.get(self.thread_id)
+                if frame is not None:
+                    self.stacks[self._collapse(frame)] += 1
+            else:
+                for thread_id, frame in frames.items():
+                    if thread_id == sampler_id:
+                        continue
+                    if thread_id not in names:
+                        names = {thread.ident: thread.name for thread in threading.enumerate()}
+                    self.stacks[f"{names.get(thread_id, thread_id)};{self._collapse(frame)}"] += 1
+            self.samples += 1
+
+    def _collapse(self, frame: FrameType) -> str:
+        stack: List[str] = []
+        while frame is not None:
+            code = frame.f_code
+            name: str = f"{frame.f_globals.get('__name__', '?')}:{getattr(code, 'co_qualname', code.co_name)}"
+            stack.append(f"{name}:{frame.f_lineno}" if self.with_lineno else name)
+            frame = frame.f_back
+        stack.reverse()
+        return ';'.join(stack)
+
+    def collapsed(self) -> str:
+        """
+        Return samples as collapsed stacks, most sampled stack first.
+        """
+        return '\n'.join(f"{stack} {count}" for stack, count in self.stacks.most_common()) + '\n'
+
+    def top(self, limit: int = 10) -> List[tuple]:
+        """
+        Return functions which appeared on the top of stacks most frequently. (function, samples, ratio)
+        """
+        leaves: Counter = Counter()
+        for stack, count in self.stacks.items():
+            leaves[stack.rsplit(';', 1)[-1]] += count
+        total: int = max(sum(leaves.values()), 1)
+        return [(function, count, round(count / total, 3)) for function, count in leaves.most_common(limit)]
@@ -0,0 +1,265 @@
+"""
+core/RateLimiter.py
+~~~~~~~~~~~~~~~~~~~
+Module for discord rest api requests which latte sends directly. (`Latte.api_get`)
+
+RESTScheduler : Request scheduler which follows discord`s per-route buckets and global rate limit.
+                Requests are queued until the bucket is available instead of failing with 429,
+                and identical in-flight GET requests are merged into single request.
+                Buckets not used for `bucket_ttl` seconds are dropped, since every major parameter has its own bucket.
+"""
+import asyncio, logging, re
+from typing import Any, Dict, Optional, Union
+from .HTTPClient import HTTPClient, RESPONSE
+
+# Discord api uses these parameters to separate rate limit buckets. (major parameters)
+MAJOR_PARAMETER = re.compile(r"^/(channels|guilds|webhooks)/(\d+)")
+SNOWFLAKE = re.compile(r"/\d{15,21}")
+
+
+class Bucket:
+    """
+    Rate limit state of single discord rest api bucket.
+    """
+
+    def __init__(self, key: str):
+        self.key = key
+        self.remaining: Optional[int] = None    # None until discord tells us bucket`s limit.
+        self.reset_at: float = 0.0              # event loop time when bucket will be reset.
+        self.last_used: float = 0.0             # event loop time when request was sent in this bucket lastly.
+        self.lock = asyncio.Lock()
+
+    def update(self, remaining: Optional[int], reset_after: Optional[float], now: float):
+        if remaining is not None:
+            self.remaining = remaining
+        if reset_after is not None:
+            self.reset_at = now + reset_after
+
+    def delay(self, now: float) -> float:
+        """
+        :return: seconds to wait before sending next request in this bucket.
+        """
+        if self.remaining is not None and self.remaining <= 0 and self.reset_at > now:
+            return self.reset_at - now
+        return 0.0
+
+    def is_idle(self, now: float, ttl: float) -> bool:
+        return not self.lock.locked() and self.reset_at <= now and self.last_used + ttl <= now
+
+    def __repr__(self):
+        return f"<Bucket({self.key}, remaining={self.remaining}, reset_at={self.reset_at})>"
+
+
+class RESTScheduler:
+    base_url: str = "https://discord.com/api"
+    max_retries: int = 5
+    bucket_ttl: float = 300.0
+
+    def __init__(self, http_client: HTTPClient, logger: Optional[logging.Logger] = None):
+        self.http_client = http_client
+        self.logger = logger if logger is not None else logging.getLogger("latte.rest")
+
+        self._buckets: Dict[str, Bucket] = {}           # route key or bucket key -> Bucket
+        self._inflight: Dict[str, asyncio.Task] = {}    # request key -> running GET request
+        self._global_reset_at: float = 0.0
+        self._next_prune: float = 0.0
+
+        # Statistics
+        self.queue_depth: int = 0
+        self.requests: int = 0
+        self.merged: int = 0
+        self.ratelimited: int = 0
+        self.waited: int = 0
+        self.total_wait: float = 0.0
+        self.max_wait: float = 0.0
+
+    @staticmethod
+    def route_key(method: str, api_url: str) -> str:
+        """
+        Convert api url into route key. Snowflakes except the major parameter are replaced into `{id}`,
+        so requests to the same route share single bucket.
+        """
+        path = api_url.split('?')[0]
+        major = MAJOR_PARAMETER.match(path)
+        if major is not None:
+            rest = SNOWFLAKE.sub("/{id}", path[major.end():])
+            return f"{method} {major.group(0)}{rest}"
+        return f"{method} {SNOWFLAKE.sub('/{id}', path)}"
+
+    def _get_bucket(self, route: str) -> Bucket:
+        if route not in self._buckets:
+            self._buckets[route] = Bucket(key=route)
+        return self._buckets[route]
+
+    async def request(self, method: str, api_url: str, response_type: str = "json",
+                      headers: Optional[Dict[str, str]] = None, **kwargs) -> RESPONSE:
+        """
+        Send request to discord rest api following rate limits.
+        :param method: http method to use.
+        :param api_url: discord api url which starts with '/'. (ex: /guilds/1234)
+        :param response_type: type of the response body to return. (json / text / bytes)
+        :param headers: http headers to send.
+        :return: response body processed as `response_type`.
+        """
+        if not api_url.startswith('/'):
+            raise ValueError("Invalid API url!")
+
+        method = method.upper()
+        if method != "GET":
+            return await self._send(method, api_url, response_type, headers, **kwargs)
+
+        # Merge identical in-flight GET requests.
+        request_key = f"{api_url}:{response_type}"
+        task: Optional[asyncio.Task] = self._inflight.get(request_key)
+        if task is not None:
+            self.merged += 1
+        else:
+            task = asyncio.ensure_future(self._send(method, api_url, response_type, headers, **kwargs))
+            self._inflight[request_key] = task
+            task.add_done_callback(lambda t: self._inflight.pop(request_key, None) if self._inflight.get(request_key) is t else None)
+        # Shield the request so cancelling one caller does not cancel the others waiting on it.
+        return await asyncio.shield(task)
+
+    async def _acquire(self, bucket: Bucket) -> float:
+        """
+        Wait until both global limit and bucket are available, and reserve one request in bucket.
+        :return: seconds waited.
+        """
+        loop = asyncio.get_event_loop()
+        waited: float = 0.0
+        # Lock is held while sleeping on purpose : requests of the bucket are released one by one in order,
+        # instead of every waiter waking up at reset and racing for the remaining requests.
+        async with bucket.lock:
+            while True:
+                now = loop.time()
+                delay = max(self._global_reset_at - now, bucket.delay(now))
+                if delay <= 0:
+                    break
+                waited += delay
+                await asyncio.sleep(delay)
+            if bucket.remaining is not None:
+                bucket.remaining -= 1
+            bucket.last_used = loop.time()
+        return waited
+
+    async def _send(self, method: str, api_url: str, response_type: str,
+                    headers: Optional[Dict[str, str]], **kwargs) -> RESPONSE:
+        loop = asyncio.get_event_loop()
+        route = self.route_key(method, api_url)
+        self.requests += 1
+        self.queue_depth += 1
+        if loop.time() >= self._next_prune:
+            self._prune_buckets(loop.time())
+        try:
+            for attempt in range(self.max_retries + 1):
+                bucket = self._get_bucket(route)
+                waited = await self._acquire(bucket)
+                if waited > 0:
+                    self._record_wait(route, waited)
+
+                if not self.http_client.is_started():
+                    await self.http_client.start()
+                async with self.http_client.session.request(
+                        method=method, url=self.base_url + api_url, headers=headers, **kwargs
+                ) as response:
+                    self._update_bucket(route, bucket, response.headers, loop.time())
+                    # Route may be moved into shared bucket by the headers : rate limit must be applied to it.
+                    bucket = self._get_bucket(route)
+
+                    if response.status == 429:
+                        self.ratelimited += 1
+                        data: Dict[str, Any] = await self._read_ratelimit_body(response)
+                        retry_after: float = self.get_retry_after(data, response.headers)
+                        if data.get("global", False) or response.headers.get("X-RateLimit-Global") == "true":
+                            self._global_reset_at = loop.time() + retry_after
+                        else:
+                            bucket.update(remaining=0, reset_after=retry_after, now=loop.time())
+                        self.logger.warning(
+                            msg=f"[RESTScheduler._send] Rate limited on route `{route}` "
+                                f"(global : {data.get('global', False)}). Retrying after {retry_after} seconds "
+                                f"({attempt + 1}/{self.max_retries})"
+                        )
+                        continue
+
+                    return await HTTPClient.read_response(response, response_type)
+
+            raise RuntimeError(f"[RESTScheduler._send] Exceeded maximum retries on route `{route}`!")
+        finally:
+            self.queue_depth -= 1
+
+    @staticmethod
+    async def _read_ratelimit_body(response) -> Dict[str, Any]:
+        """
+        Read body of 429 response. Responses from cloudflare or proxies may not be json.
+        """
+        try:
+            data: Any = await response.json(content_type=None)
+        except ValueError:
+            return {}
+        return data if isinstance(data, dict) else {}
+
+    @staticmethod
+    def get_retry_after(data: Dict[str, Any], headers) -> float:
+        """
+        Seconds to wait after 429 response : body `retry_after`, or `Retry-After` / `X-RateLimit-Reset-After` headers.
+        """
+        for value in (data.get("retry_after"), headers.get("Retry-After"), headers.get("X-RateLimit-Reset-After")):
+            if value is None:
+                continue
+            try:
+                return float(value)
+            except (TypeError, ValueError):
+                continue
+        return 1.0
+
+    def _update_bucket(self, route: str, bucket: Bucket, headers, now: float):
+        remaining: Optional[str] = headers.get("X-RateLimit-Remaining")
+        reset_after: Optional[str] = headers.get("X-RateLimit-Reset-After")
+        bucket_hash: Optional[str] = headers.get("X-RateLimit-Bucket")
+
+        if bucket_hash is not None:
+            # Routes sharing same bucket hash (and major parameter) share single bucket.
+            major = MAJOR_PARAMETER.match(route.split(' ', 1)[1])
+            bucket_key = f"{bucket_hash}:{major.group(0) if major is not None else ''}"
+            shared: Bucket = self._buckets.setdefault(bucket_key, bucket)
+            self._buckets[route] = shared
+            bucket = shared
+
+        bucket.update(
+            remaining=int(remaining) if remaining is not None else None,
+            reset_after=float(reset_after) if reset_after is not None else None,
+            now=now
+        )
+
+    def _prune_buckets(self, now: float):
+        """
+        Drop route and bucket keys whose bucket is idle. Dropped routes start with fresh bucket on next request.
+        """
+        idle = [key for key, bucket in self._buckets.items() if bucket.is_idle(now, self.bucket_ttl)]
+        for key in idle:
+            del self._buckets[key]
+        self._next_prune = now + self.bucket_ttl
+        if len(idle) > 0:
+            self.logger.debug(msg=f"[RESTScheduler._prune_buckets] Dropped {len(idle)} idle bucket keys.")
+
+    def _record_wait(self, route: str, waited: float):
+        self.waited += 1
+        self.total_wait += waited
+        self.max_wait = max(self.max_wait, waited)
+        self.logger.info(
+            msg=f"[RESTScheduler] Request on route `{route}` waited {waited:.3f}s for rate limit. "
+                f"(queue depth : {self.queue_depth})"
+        )
+
+    def get_stats(self) -> Dict[str, Union[int, float]]:
+        return {
+            "queue_depth": self.queue_depth,
+            "requests": self.requests,
+            "merged": self.merged,
+            "ratelimited": self.ratelimited,
+            "waited": self.waited,
+            "total_wait": round(self.total_wait, 3),
+            "avg_wait": round(self.total_wait / self.waited, 3) if self.waited > 0 else 0.0,
+            "max_wait": round(self.max_wait, 3),
+            "buckets": len(set(map(id, self._buckets.values())))
+        }
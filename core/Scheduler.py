@@ -0,0 +1,166 @@
+"""
+core/Scheduler.py
+~~~~~~~~~~~~~~~~~
+Module for timers which latte should handle in background.
+
+MuteScheduler : Expire mutes at their end time. Only mutes ending in `horizon` seconds are kept in memory,
+                using min-heap ordered by their end time, and scheduler sleeps until the earliest one ends.
+                When a mute expires, `mute_expire` event is dispatched. (listener : on_mute_expire(guild_id, user_id))
+                Mutes superseded by later mute of the same member expire silently, so members are never unmuted early.
+                Mute records may still be in `Latte.record_buffer`, so it is flushed before mutes are read from database.
+"""
+import asyncio, heapq, logging
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Set, Tuple
+from .DB import DBWrapper
+
+MUTE_ENTRY = Tuple[datetime, int, int]     # (end, guild_id, user_id)
+
+
+class MuteScheduler:
+    def __init__(self, bot, horizon: float = 3600.0, retry_delay: float = 30.0, logger: Optional[logging.Logger] = None):
+        self.bot = bot
+        self.horizon = timedelta(seconds=horizon)
+        # Seconds to wait before retrying after unexpected error, such as database failure.
+        self.retry_delay = retry_delay
+        self.logger = logger if logger is not None else logging.getLogger("latte.scheduler")
+
+        self._heap: List[MUTE_ENTRY] = []
+        self._entries: Set[MUTE_ENTRY] = set()
+        # Mutes scheduled beyond current horizon, kept until a load moves them into the heap.
+        # Their records may not be inserted yet when the load reads database.
+        self._deferred: Set[MUTE_ENTRY] = set()
+        # Latest end of mutes scheduled in this process for each member, including ones beyond horizon.
+        self._latest_end: Dict[Tuple[int, int], datetime] = {}
+        self._horizon_end: datetime = datetime.min
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def db(self) -> DBWrapper:
+        return self.bot.db
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def schedule(self, guild_id: int, user_id: int, end: datetime):
+        """
+        Schedule new mute to expire at `end`. (UTC)
+        Mutes ending after current horizon are deferred, and moved into the heap by the load which covers them.
+        """
+        entry: MUTE_ENTRY = (end, guild_id, user_id)
+        if (guild_id, user_id) not in self._latest_end or self._latest_end[(guild_id, user_id)] < end:
+            self._latest_end[(guild_id, user_id)] = end
+        if end >= self._horizon_end:
+            self._deferred.add(entry)
+            return
+        if entry in self._entries:
+            return
+        self._push(entry)
+        if self._heap[0] == entry and self._wakeup is not None:
+            # New mute ends earlier than the mute scheduler is waiting for.
+            self._wakeup.set()
+
+    def _push(self, entry: MUTE_ENTRY):
+        heapq.heappush(self._heap, entry)
+        self._entries.add(entry)
+
+    def _pop(self) -> MUTE_ENTRY:
+        entry: MUTE_ENTRY = heapq.heappop(self._heap)
+        self._entries.discard(entry)
+        return entry
+
+    async def load(self):
+        """
+        Load active mutes ending before next horizon from database, and deferred mutes ending before next horizon.
+        """
+        horizon_end: datetime = datetime.utcnow() + self.horizon
+        await self._flush_records()
+        records = await self.db.get_active_mutes_ending_before(before=horizon_end)
+        for record in records:
+            entry: MUTE_ENTRY = (record.end, record.guild_id, record.user_id)
+            if entry not in self._entries:
+                self._push(entry)
+        for entry in [entry for entry in self._deferred if entry[0] < horizon_end]:
+            self._deferred.discard(entry)
+            if entry not in self._entries:
+                self._push(entry)
+        self._horizon_end = horizon_end
+        self.logger.info(
+            msg=f"[MuteScheduler.load] Loaded {len(records)} mutes ending before {horizon_end} (UTC). "
+                f"{len(self._heap)} mutes are scheduled."
+        )
+
+    async def _flush_records(self):
+        """
+        Insert mute records waiting in write-behind buffer, so database reflects every scheduled mutes.
+        """
+        record_buffer = getattr(self.bot, "record_buffer", None)
+        if record_buffer is not None:
+            await record_buffer.flush()
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.ensure_future(self._run())
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        await self.bot.wait_until_ready()
+        while True:
+            try:
+                now: datetime = datetime.utcnow()
+                while len(self._heap) > 0 and self._heap[0][0] <= now:
+                    await self._expire(*self._pop())
+
+                if now >= self._horizon_end:
+                    await self.load()
+                    continue
+
+                deadline: datetime = self._heap[0][0] if len(self._heap) > 0 else self._horizon_end
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=(deadline - now).total_seconds())
+                except asyncio.TimeoutError:
+                    pass
+            except Exception as e:
+                # Keep the scheduler alive. Mutes which are not expired stay active in database, and are loaded again.
+                self.logger.error(
+                    msg=f"[MuteScheduler._run] Unexpected error! Retrying in {self.retry_delay} seconds.", exc_info=e
+                )
+                await asyncio.sleep(self.retry_delay)
+
+    async def _expire(self, end: datetime, guild_id: int, user_id: int):
+        key: Tuple[int, int] = (guild_id, user_id)
+        if key in self._latest_end and self._latest_end[key] > end:
+            # Member was muted again with later end time in this process.
+            # Later mute may be still in write-behind buffer, so it is checked here before database.
+            self.logger.info(msg=f"[MuteScheduler._expire] Mute of user {user_id} in guild {guild_id} is superseded.")
+            return
+        try:
+            # Mute shorter than flush interval may expire before its record is inserted.
+            # Insert it first, or it is inserted as active and expires again in next load.
+            await self._flush_records()
+            await self.db.deactivate_mutes(guild_id=guild_id, user_id=user_id, ended_before=end)
+            latest_end: Optional[datetime] = await self.db.get_latest_active_mute_end(guild_id=guild_id, user_id=user_id)
+        except Exception as e:
+            # Mute stays active in database, so it is expired when mutes are loaded again.
+            self.logger.error(
+                msg=f"[MuteScheduler._expire] Failed to mark mute of user {user_id} in guild {guild_id} as expired! "
+                    f"Retrying in next load.",
+                exc_info=e
+            )
+            return
+        if latest_end is not None and latest_end > end:
+            self.logger.info(msg=f"[MuteScheduler._expire] Mute of user {user_id} in guild {guild_id} is superseded.")
+            return
+        self._latest_end.pop(key, None)
+        self.bot.dispatch("mute_expire", guild_id, user_id)
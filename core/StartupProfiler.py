@@ -0,0 +1,161 @@
+"""
+core/StartupProfiler.py
+~~~~~~~~~~~~~~~~~~~~~~~
+Module for measuring startup time of latte. (`app.py --profile-startup`)
+
+StartupProfiler : Record wall-clock time of startup phases (config load, logger setup, extension mapping,
+                  extension loading, db engine creation, gateway connect ...) and import cost of every module,
+                  and write them as json report. Startup can be checked against time budget in benchmarks.
+ImportTimer : Meta path finder which measures time taken to execute each imported module. (like `-X importtime`)
+
+This module only uses standard library, and is loaded by app.py before `core` package is imported,
+so imports of core and its dependencies are measured too. It does nothing until `StartupProfiler.enable` is called.
+"""
+import json, os, sys, threading, time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+
+class ImportTimer:
+    """
+    Wraps `exec_module` of loaders found by other finders, to measure cumulative and self time of each module.
+    """
+
+    def __init__(self):
+        self.stats: Dict[str, Tuple[float, float]] = {}     # module name -> (cumulative, self)
+        self._local = threading.local()
+
+    def _stack(self) -> List[float]:
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+    def find_spec(self, fullname: str, path=None, target=None):
+        spec = None
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is not None:
+                break
+        if spec is None:
+            return None
+
+        loader = spec.loader
+        # Builtin / frozen importers are classes shared by every module, so they are not wrapped.
+        if loader is None or isinstance(loader, type) or not hasattr(loader, "exec_module"):
+            return spec
+        exec_module = loader.exec_module
+
+        def timed_exec_module(module):
+            stack: List[float] = self._stack()
+            stack.append(0.0)
+            started: float = time.perf_counter()
+            try:
+                exec_module(module)
+            finally:
+                elapsed: float = time.perf_counter() - started
+                children: float = stack.pop()
+                if len(stack) > 0:
+                    stack[-1] += elapsed
+                self.stats[fullname] = (elapsed, elapsed - children)
+                try:
+                    del loader.exec_module
+                except AttributeError:
+                    pass
+
+        try:
+            loader.exec_module = timed_exec_module
+        except AttributeError:
+            pass
+        return spec
+
+
+class StartupProfiler:
+    def __init__(self):
+        self.enabled: bool = False
+        self.origin: float = time.perf_counter()
+        self.started_at: float = time.time()
+        self.phases: List[Dict[str, Any]] = []
+        self.marks: Dict[str, float] = {}
+        self.details: Dict[str, Any] = {}
+        self.import_timer: Optional[ImportTimer] = None
+
+        # Options set by app.py
+        self.report_path: str = "./logs/startup-profile.json"
+        self.budget: Optional[float] = None     # Seconds allowed from process start to gateway ready.
+        self.exit_after_startup: bool = False   # Close latte as soon as startup is finished. (for benchmarks)
+        self.finished: bool = False
+        self.over_budget: bool = False
+
+    def enable(self, track_imports: bool = True):
+        self.enabled = True
+        if track_imports and self.import_timer is None:
+            self.import_timer = ImportTimer()
+            sys.meta_path.insert(0, self.import_timer)
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.origin
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        if not self.enabled:
+            yield
+            return
+        started: float = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name=name, start=started - self.origin, duration=time.perf_counter() - started)
+
+    def record(self, name: str, start: float, duration: float):
+        if self.enabled:
+            self.phases.append({"name": name, "start": round(start, 6), "duration": round(duration, 6)})
+
+    def mark(self, name: str):
+        if self.enabled and name not in self.marks:
+            self.marks[name] = round(self.elapsed(), 6)
+
+    def report(self, top_imports: int = 100) -> Dict[str, Any]:
+        imports: List[Dict[str, Any]] = []
+        if self.import_timer is not None:
+            imports = [
+                {"module": module, "cumulative": round(cumulative, 6), "self": round(self_time, 6)}
+                for module, (cumulative, self_time) in sorted(
+                    self.import_timer.stats.items(), key=lambda item: item[1][1], reverse=True
+                )[:top_imports]
+            ]
+        total: float = self.marks["gateway_ready"] if "gateway_ready" in self.marks else round(self.elapsed(), 6)
+        return {
+            "started_at": self.started_at,
+            "python": sys.version,
+            "total": total,
+            "budget": self.budget,
+            "over_budget": self.budget is not None and total > self.budget,
+            "phases": self.phases,
+            "marks": self.marks,
+            "details": self.details,
+            "imports": imports
+        }
+
+    def finish(self) -> Dict[str, Any]:
+        """
+        Write report into `report_path`. Only the first call writes report.
+        """
+        report: Dict[str, Any] = self.report()
+        if not self.enabled or self.finished:
+            return report
+        self.finished = True
+        self.over_budget = report["over_budget"]
+        report_dir: str = os.path.dirname(self.report_path)
+        if report_dir != '':
+            os.makedirs(report_dir, exist_ok=True)
+        with open(self.report_path, mode="wt", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        if self.import_timer is not None and self.import_timer in sys.meta_path:
+            sys.meta_path.remove(self.import_timer)
+        return report
+
+
+# Shared profiler instance used across latte.
+startup_profiler = StartupProfiler()
@@ -16,4 +16,13 @@ from .ExtensionManager import *
 from .exceptions import *
 from .config import *
 from .Service import *
-from .DocParser import *
\ No newline at end of file
+from .DocParser import *
+from .HTTPClient import *
+from .RateLimiter import *
+from .Scheduler import *
+from .LatteLogger import *
+from .Metrics import *
+from .LoopMonitor import *
+from .Profiler import *
+from .MessageFilter import *
+from .StartupProfiler import *
\ No newline at end of file
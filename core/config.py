@@ -1,4 +1,20 @@
-from typing import Any, Union, Callable, Optional, List, Dict
+import asyncio, inspect, json, logging, os, shutil, tempfile, threading
+from collections.abc import Mapping
+from types import MappingProxyType
+from typing import Any, Union, Callable, Optional, List, Dict, Tuple
+
+# Optional dependencies, only required to use TOML / YML configs.
+try:
+    import toml
+except ImportError:
+    toml = None
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+# Subscriber of config changes : callback(old value, new value). Value is None if the key does not exist.
+CONFIG_SUBSCRIBER = Callable[[Any, Any], Any]
 
 
 class ConfigException(Exception):
@@ -47,6 +63,85 @@ class ConfigMethodNotSupported(ConfigException):
         super(ConfigMethodNotSupported, self).__init__(alert=f"Config method `{method_name}` is not supported in config type `{config_type}`!")
 
 
+class ConfigInvalid(ConfigException, ValueError):
+    """
+    An exception which indicates config content does not match with its schema.
+    """
+    def __init__(self, errors: List[str]):
+        super(ConfigInvalid, self).__init__(alert="Config is invalid!\n" + '\n'.join(errors))
+        self.errors = errors
+
+
+# Marker of missing config values.
+_MISSING = object()
+
+SCHEMA_TYPE = Union[type, Tuple[type, ...]]
+
+
+def freeze(value: Any) -> Any:
+    """
+    Convert config content into read-only snapshot : dictionaries into mapping proxies, and lists into tuples.
+    """
+    if isinstance(value, MappingProxyType):
+        return value
+    if isinstance(value, Mapping):
+        return MappingProxyType({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+def thaw(value: Any) -> Any:
+    """
+    Convert frozen snapshot back into plain dictionaries and lists, which can be modified and serialized.
+    """
+    if isinstance(value, Mapping):
+        return {key: thaw(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [thaw(item) for item in value]
+    return value
+
+
+class ConfigSchema:
+    """
+    Typed schema of config, used as `validator` of Config. Fields are declared as {dotted path : (type(s), required)}.
+    Required fields are only checked when their parent exists, so optional sections can have required fields.
+    """
+    def __init__(self, fields: Dict[str, Tuple[SCHEMA_TYPE, bool]]):
+        self.fields = fields
+
+    def __call__(self, config: Any):
+        errors: List[str] = self.check(config)
+        if len(errors) > 0:
+            raise ConfigInvalid(errors=errors)
+
+    def check(self, config: Any) -> List[str]:
+        errors: List[str] = []
+        for path, (types, required) in self.fields.items():
+            parent_path, _, key = path.rpartition('.')
+            parent: Any = Config.lookup(config, parent_path) if parent_path != '' else config
+            if not isinstance(parent, Mapping):
+                continue
+            if key not in parent:
+                if required:
+                    errors.append(f"`{path}` is required.")
+                continue
+            value: Any = parent[key]
+            expected: Tuple[type, ...] = types if isinstance(types, tuple) else (types,)
+            names: str = ' or '.join(t.__name__ for t in expected)
+            # Frozen snapshots contain mapping proxies and tuples instead of dictionaries and lists.
+            if dict in expected:
+                expected += (MappingProxyType,)
+            if list in expected:
+                expected += (tuple,)
+            # bool is a subclass of int, but `true` is not a valid integer config value.
+            if not isinstance(value, expected) or (isinstance(value, bool) and bool not in expected):
+                errors.append(
+                    f"`{path}` must be {names}, not {type(value).__name__}."
+                )
+        return errors
+
+
 class Config:
     class Types:
         JSON: str = "file/json"
@@ -62,54 +157,105 @@ class Config:
             """
             return value in [cls.JSON, cls.TOML, cls.YML]
 
-    config: Optional[Union[Dict[str, Union[Dict[str, Any], int, str, bool]], str]] = None
+        @classmethod
+        def from_path(cls, path: str) -> str:
+            """
+            Guess config type using extension of the config file. (.json / .toml / .yml, .yaml)
+            """
+            extension: str = os.path.splitext(path)[1].lower()
+            if extension == ".toml":
+                return cls.TOML
+            elif extension in (".yml", ".yaml"):
+                return cls.YML
+            return cls.JSON
 
-    def __init__(self, config_type: str, config_dir: str, text_processor: Callable[[str], Any] = lambda x: x):
+    def __init__(self, config_type: str, config_dir: str, text_processor: Optional[Callable[[str], Any]] = None,
+                 validator: Optional[Callable[[Any], None]] = None, logger: Optional[logging.Logger] = None,
+                 generations: int = 3, save_delay: float = 1.0):
         # Type Check
         if not self.Types.CHECK(config_type):
             raise TypeError("Config Type must be a Config.Types enum value!")
         self.config_type = config_type
         self.config_dir = config_dir
 
-        if config_type == self.Types.TOML and text_processor is None:
-            raise ValueError("`TEXT` type config requires ")
+        if text_processor is None:
+            if config_type == self.Types.TOML and toml is None:
+                raise ConfigMethodNotSupported(method_name="process (`toml` package is not installed)", config_type=config_type)
+            if config_type == self.Types.YML and yaml is None:
+                raise ConfigMethodNotSupported(method_name="process (`PyYAML` package is not installed)", config_type=config_type)
+        # Custom processor of raw config text. Built-in processor of config type is used if None.
         self.text_processor = text_processor
 
-    def read(self, encoding: str = "utf-8") -> str:
+        # Loaded config and values cached by `get`, swapped together. (See `config` property)
+        self._state: Tuple[Any, Dict[str, Any]] = (None, {})
+        # Callable which raises exception if the config content is invalid.
+        self.validator = validator
+        self.logger = logger if logger is not None else logging.getLogger("latte.config")
+
+        # Hot reload
+        # `self.config` is treated as immutable snapshot : it is never modified in place, but replaced as a whole,
+        # so readers always see either old or new config.
+        self._subscribers: Dict[str, List[CONFIG_SUBSCRIBER]] = {}
+        self._mtime: Optional[float] = None
+        self._watch_task: Optional[asyncio.Task] = None
+
+        # Persistence
+        self.generations = generations      # Number of backups kept for rollback.
+        self.save_delay = save_delay        # Seconds to wait for more changes before writing config file.
+        self._dirty: bool = False
+        self._save_task: Optional[asyncio.Task] = None
+        self._save_lock: Optional[asyncio.Lock] = None
+        # Write running in executor. It can`t be cancelled, so it is awaited before next write or flush.
+        self._write_future: Optional[asyncio.Future] = None
+        # Serializes writes of sync `save` and executor writes of `save_async`.
+        self._write_lock = threading.Lock()
+        # Number of saves running in executor. File watcher never reloads own writes while it is positive.
+        self._saving: int = 0
+
+    def read(self, encoding: str = "utf-8", path: Optional[str] = None) -> str:
+        path = path if path is not None else self.config_dir
+        self.logger.debug(msg=f"[Config.read] Reading config file `{path}` ...")
         try:
-            print("[Config.read] Opening config file ...")
-            with open(
-                    file=self.config_dir,
-                    mode="rt",
-                    encoding=encoding
-            ) as config_file:
-                print("[Config.read] Reading config file data and return it ...")
+            with open(file=path, mode="rt", encoding=encoding) as config_file:
                 return config_file.read()
         except FileNotFoundError:
-            print("[Config.read] Config file does not exist! Raising ConfigNotFound exception...")
+            self.logger.error(msg=f"[Config.read] Config file `{path}` does not exist!")
             raise ConfigNotFound()
 
     def process(self, raw_content: str):
-        print("[Config.process] Processing config file data ...")
+        self.logger.debug(msg=f"[Config.process] Processing config file data as `{self.config_type}` ...")
         if self.config_type == self.Types.JSON:
-            print("[Config.process] Config type is defined as JSON. Try to load config file data as dictionary ...")
             if type(raw_content) != str:
-                print("[Config.process] Processing config file data ...")
                 raise ValueError("JSON-type config file must be loaded using string value (text).")
-            import json
-            return json.loads(raw_content)
-        else:
+            return json.loads(raw_content) if self.text_processor is None else self.text_processor(raw_content)
+        elif self.text_processor is not None:
             return self.text_processor(raw_content)
+        elif self.config_type == self.Types.TOML:
+            return toml.loads(raw_content)
+        else:
+            return yaml.safe_load(raw_content)
+
+    def dump(self, content: Any) -> str:
+        """
+        Convert config content into text of config type. Frozen snapshots are thawed first.
+        """
+        if type(content) == str:
+            return content
+        content = thaw(content)
+        if self.config_type == self.Types.TOML:
+            return toml.dumps(content)
+        elif self.config_type == self.Types.YML:
+            return yaml.safe_dump(content, allow_unicode=True, sort_keys=False)
+        return json.dumps(obj=content, indent=4, ensure_ascii=False)
 
     def load(self):
-        print("[Config.load] Loading config ...")
-        if not self.is_loaded():
-            print("[Config.load] Config is not loaded. Reading & Processing config file ...")
-            self.config = self.process(self.read())
-            print("[Config.load] Done!")
-        else:
-            print("[Config.load] Config is already loaded! Raising ConfigAlreadyLoaded exception ...")
+        if self.is_loaded():
+            self.logger.error(msg="[Config.load] Config is already loaded!")
             raise ConfigAlreadyLoaded()
+        self._mtime = self._get_mtime()
+        self.config = self.validate(self.process(self.read()))
+        self._dirty = False
+        self.logger.info(msg=f"[Config.load] Loaded config from `{self.config_dir}`.")
 
     def is_loaded(self) -> bool:
         """
@@ -117,66 +263,386 @@ class Config:
         """
         return self.config is not None
 
-    def write(self, content: str, encoding: str = "utf-8"):
-        print("[Config.write] Opening config file as a write-text mode ...")
-        try:
-            with open(
-                    file=self.config_dir,
-                    mode="wt",
-                    encoding=encoding
-            ) as config_file:
-                print("[Config.save] Checking config type ...")
-                if self.config_type == self.Types.JSON:
-                    print("[Config.save] Found JSON type config! Checking type of stored config content ...")
-                    if type(self.config) != dict:
-                        print("[Config.save] Config should store dictionary type content if it is a JSON type! "
-                              "raising TypeError ...")
-                        raise TypeError("Type of the config content does not match with config_type attribute!")
-
-                    print("[Config.save] Config contains dictionary content. Dumping dictionary into config file ...")
-                    import json
-                    json.dump(obj=content, fp=config_file, indent=4, ensure_ascii=False)
-                    print("[Config.save] Finished dumping dictionary!")
-
-                else:
-                    config_file.write(content)
-                print("[Config.save] Finished writing down config into config file!")
+    def is_dirty(self) -> bool:
+        """
+        :return: if the loaded config has changes which are not written on config file yet.
+        """
+        return self._dirty
 
-        except FileNotFoundError:
+    """
+    Persistence
+    Config file is never truncated in place : content is written on temporary file in the same directory, fsync-ed,
+    and renamed over config file, so config file always contains either old or new content even if latte crashes.
+    Previous config files are kept as `<config>.1` (newest) ~ `<config>.<generations>` for rollback.
+    """
+
+    def backup_path(self, generation: int) -> str:
+        return f"{self.config_dir}.{generation}"
+
+    def get_generations(self) -> List[int]:
+        """
+        :return: generations of backups which exist on disk, newest first.
+        """
+        return [
+            generation for generation in range(1, self.generations + 1) if os.path.exists(self.backup_path(generation))
+        ]
+
+    def write(self, content: Any, encoding: str = "utf-8"):
+        if type(content) != str and not isinstance(content, Mapping):
+            raise TypeError("Type of the config content does not match with config_type attribute!")
+        # Dump before touching any file, so content which can`t be serialized never breaks config file.
+        text: str = self.dump(content)
+        config_dir: str = os.path.dirname(os.path.abspath(self.config_dir))
+        if not os.path.isdir(config_dir):
             raise ConfigNotFound()
 
+        with self._write_lock:
+            # Unique temporary file in the same directory, so rename stays atomic and concurrent writers never collide.
+            fd, temp_path = tempfile.mkstemp(dir=config_dir, prefix=f"{os.path.basename(self.config_dir)}.", suffix=".tmp")
+            try:
+                with open(fd, mode="wt", encoding=encoding) as temp_file:
+                    temp_file.write(text)
+                    temp_file.flush()
+                    os.fsync(temp_file.fileno())
+                if os.path.exists(self.config_dir):
+                    shutil.copymode(self.config_dir, temp_path)
+                self._rotate_backups()
+                os.replace(temp_path, self.config_dir)
+            except BaseException:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+                raise
+            self._fsync_dir(config_dir)
+        self.logger.debug(msg=f"[Config.write] Wrote {len(text)} characters on `{self.config_dir}`.")
+
+    def _rotate_backups(self):
+        if self.generations <= 0 or not os.path.exists(self.config_dir):
+            return
+        for generation in range(self.generations - 1, 0, -1):
+            if os.path.exists(self.backup_path(generation)):
+                os.replace(self.backup_path(generation), self.backup_path(generation + 1))
+        try:
+            # Hard link keeps current config file in place until it is replaced by rename.
+            os.link(self.config_dir, self.backup_path(1))
+        except OSError:
+            shutil.copy2(self.config_dir, self.backup_path(1))
+
+    @staticmethod
+    def _fsync_dir(path: str):
+        # Persist the rename itself. Not every platform allows opening directories. (ex: Windows)
+        try:
+            fd: int = os.open(path, os.O_RDONLY)
+        except OSError:
+            return
+        try:
+            os.fsync(fd)
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
+
     def save(self):
-        print("[Config.save] Writing config content on config file ...")
-        self.write(content=self.config)
-        print("[Config.save] Successfully wrote config content on config file!")
+        """
+        Write loaded config on config file synchronously. Pending debounced save is cancelled.
+        """
+        self._cancel_pending_save()
+        self._write_snapshot(self.config)
+        self.logger.info(msg=f"[Config.save] Saved config on `{self.config_dir}`.")
 
-    def unload(self):
-        print("[Config.unload] Unloading config...")
-        if self.is_loaded():
-            print("[Config.unload] Found loaded config. Saving...")
+    def _write_snapshot(self, snapshot: Any):
+        self.write(content=snapshot)
+        # Own writes should not be reloaded by the file watcher.
+        self._mtime = self._get_mtime()
+        # Config could be changed again while the snapshot was being written.
+        self._dirty = self.config is not snapshot
+
+    async def save_async(self):
+        """
+        Write loaded config on config file in executor. Writes never overlap each other.
+        Cancelling the caller does not cancel the write : `_saving` is decreased only when the write really finishes.
+        """
+        if self._save_lock is None:
+            self._save_lock = asyncio.Lock()
+        async with self._save_lock:
+            # Caller of previous write could be cancelled while its write was still running.
+            await self._wait_write()
+            snapshot: Any = self.config
+            self._saving += 1
+            self._write_future = asyncio.get_event_loop().run_in_executor(None, self._write_snapshot, snapshot)
+            self._write_future.add_done_callback(self._on_write_done)
+            await asyncio.shield(self._write_future)
+        self.logger.info(msg=f"[Config.save_async] Saved config on `{self.config_dir}`.")
+
+    def _on_write_done(self, future: asyncio.Future):
+        self._saving -= 1
+
+    async def _wait_write(self):
+        """
+        Wait for write running in executor, if any. Its failure is handled by its own caller.
+        """
+        future: Optional[asyncio.Future] = self._write_future
+        if future is None or future.done():
+            return
+        try:
+            await asyncio.shield(future)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            pass
+
+    def schedule_save(self):
+        """
+        Save config after `save_delay` seconds. Changes made until then are coalesced into single write.
+        Saved synchronously if there is no running event loop.
+        """
+        self._dirty = True
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
             self.save()
-            print("[Config.unload] Saved loaded config! Clearing config attribute ...")
-            self.config = None
-            print("[Config.unload] Successfully cleared config attribute!")
-        else:
-            print("[Config.unload] Cannot found any loaded config. Raising ConfigNotLoaded exception!")
+            return
+        if self._save_task is None or self._save_task.done():
+            self._save_task = asyncio.ensure_future(self._delayed_save())
+
+    async def _delayed_save(self):
+        await asyncio.sleep(self.save_delay)
+        try:
+            await self.save_async()
+        except Exception as e:
+            self.logger.error(msg="[Config._delayed_save] Failed to save config! Changes are kept in memory.", exc_info=e)
+            return
+        # Changes made while the file was being written are saved in next round.
+        if self._dirty and self.is_loaded():
+            self._save_task = asyncio.ensure_future(self._delayed_save())
+
+    async def flush(self):
+        """
+        Write pending changes immediately. Write already running in executor is awaited first.
+        """
+        self._cancel_pending_save()
+        await self._wait_write()
+        if self._dirty and self.is_loaded():
+            await self.save_async()
+
+    def _cancel_pending_save(self):
+        if self._save_task is not None:
+            self._save_task.cancel()
+            self._save_task = None
+
+    async def rollback(self, generation: int = 1):
+        """
+        Restore config from backup of given generation. Restored config is validated, swapped and saved,
+        so current config becomes the newest backup. Files are read and written in executor.
+        """
+        if not self.is_loaded():
+            raise ConfigNotLoaded()
+        backup_path: str = self.backup_path(generation)
+        if not os.path.exists(backup_path):
+            raise ConfigNotFound()
+        restored: Any = await asyncio.get_event_loop().run_in_executor(
+            None, lambda: self.validate(self.process(self.read(path=backup_path)))
+        )
+        self._cancel_pending_save()
+        self.swap(restored)
+        self._dirty = True
+        await self.save_async()
+        self.logger.info(msg=f"[Config.rollback] Restored config from generation {generation}.")
+
+    def unload(self):
+        if not self.is_loaded():
+            self.logger.error(msg="[Config.unload] Cannot find any loaded config!")
             raise ConfigNotLoaded()
+        if self._dirty:
+            self.save()
+        self._cancel_pending_save()
+        self.config = None
+        self.logger.info(msg="[Config.unload] Unloaded config.")
 
     def reload(self):
-        print("[Config.reload] Reloading config...")
-        self.unload()
-        self.load()
-        print("[Config.reload] Successfully reloaded config!")
-
-    def get(self, key_phrase: str) -> Any:
-        if self.config_type != self.Types.JSON:
-            keys: List[str] = key_phrase.split('.')
-            item: Any = self.config[keys[0]]
-            for key in keys[1:]:
-                item = item[key]
-            return item
-        else:
-            raise ConfigMethodNotSupported(method_name=self.get.__name__, config_type=self.config_type)
+        """
+        Read config file again, and swap loaded config with it.
+        Loaded config is kept until new one is processed and validated, so readers never see empty config.
+        """
+        if not self.is_loaded():
+            raise ConfigNotLoaded()
+        self._mtime = self._get_mtime()
+        self.swap(self.validate(self.process(self.read())))
+        # Config file is the source of truth now.
+        self._cancel_pending_save()
+        self._dirty = False
+        self.logger.info(msg="[Config.reload] Successfully reloaded config!")
+
+    async def reload_async(self):
+        """
+        Same as `reload`, but file is read and processed in executor.
+        """
+        if not self.is_loaded():
+            raise ConfigNotLoaded()
+        loop = asyncio.get_event_loop()
+        mtime, new_config = await loop.run_in_executor(None, self._read_new_config)
+        self._mtime = mtime
+        self.swap(new_config)
+        self._cancel_pending_save()
+        self._dirty = False
+        self.logger.info(msg="[Config.reload_async] Successfully reloaded config!")
+
+    def _read_new_config(self) -> Tuple[Optional[float], Any]:
+        mtime: Optional[float] = self._get_mtime()
+        return mtime, self.validate(self.process(self.read()))
+
+    def _get_mtime(self) -> Optional[float]:
+        try:
+            return os.stat(self.config_dir).st_mtime
+        except OSError:
+            return None
+
+    @property
+    def config(self) -> Any:
+        return self._state[0]
+
+    @config.setter
+    def config(self, value: Any):
+        # Replace config and cache of `get` in single assignment, so cached values never outlive their snapshot.
+        # Snapshot is frozen, so values returned by `get` can`t be modified in place by their readers.
+        self._state = (freeze(value), {})
+
+    def validate(self, config: Any) -> Any:
+        """
+        Check processed config content before it is used.
+        :return: the config content itself.
+        :raise: TypeError or exception raised by `validator`.
+        """
+        if not isinstance(config, Mapping):
+            raise TypeError("Config must contain a mapping at the top level!")
+        if self.validator is not None:
+            self.validator(config)
+        return config
+
+    def swap(self, new_config: Any):
+        """
+        Replace loaded config with new one in single assignment, and notify subscribers of changed keys.
+        """
+        old_config, self.config = self.config, new_config
+        # Compare frozen snapshots, so subscribers receive read-only values.
+        self._notify(old_config, self.config)
+
+    def set(self, key_phrase: str, value: Any, persist: bool = True):
+        """
+        Change single value of the config. New config is built from plain copy of current snapshot,
+        so snapshot which readers are holding is never modified.
+        Changed config is validated before it is swapped, and saved by `schedule_save` if `persist` is True.
+        """
+        keys: List[str] = key_phrase.split('.')
+        new_config: Dict[str, Any] = thaw(self.config)
+        parent: Dict[str, Any] = new_config
+        for key in keys[:-1]:
+            if key not in parent:
+                parent[key] = {}
+            if type(parent[key]) != dict:
+                raise TypeError(f"Config value of `{key}` in `{key_phrase}` is not a dictionary!")
+            parent = parent[key]
+        parent[keys[-1]] = value
+        self.swap(self.validate(new_config))
+        if persist:
+            self.schedule_save()
+
+    """
+    Subscribers
+    """
+
+    def subscribe(self, key_phrase: str, callback: CONFIG_SUBSCRIBER):
+        """
+        Call `callback(old value, new value)` when value of the key (dotted path such as `api.naver`) is changed.
+        Coroutine functions are also accepted, and scheduled as tasks.
+        """
+        if key_phrase not in self._subscribers:
+            self._subscribers[key_phrase] = []
+        self._subscribers[key_phrase].append(callback)
+
+    def unsubscribe(self, key_phrase: str, callback: CONFIG_SUBSCRIBER):
+        if key_phrase in self._subscribers and callback in self._subscribers[key_phrase]:
+            self._subscribers[key_phrase].remove(callback)
+            if len(self._subscribers[key_phrase]) == 0:
+                del self._subscribers[key_phrase]
+
+    @staticmethod
+    def lookup(config: Any, key_phrase: str, default: Any = None) -> Any:
+        """
+        Walk dotted path in config content.
+        """
+        item: Any = config
+        for key in key_phrase.split('.'):
+            if not isinstance(item, Mapping) or key not in item:
+                return default
+            item = item[key]
+        return item
+
+    def _notify(self, old_config: Any, new_config: Any):
+        for key_phrase, callbacks in list(self._subscribers.items()):
+            old_value: Any = self.lookup(old_config, key_phrase)
+            new_value: Any = self.lookup(new_config, key_phrase)
+            if old_value == new_value:
+                continue
+            self.logger.info(msg=f"[Config._notify] Config `{key_phrase}` is changed.")
+            for callback in list(callbacks):
+                try:
+                    result: Any = callback(old_value, new_value)
+                    if inspect.isawaitable(result):
+                        asyncio.ensure_future(result)
+                except Exception as e:
+                    self.logger.error(
+                        msg=f"[Config._notify] Subscriber of config `{key_phrase}` raised an exception!", exc_info=e
+                    )
+
+    """
+    File watching
+    """
+
+    def start_watching(self, interval: float = 5.0):
+        """
+        Poll modification time of config file every `interval` seconds, and reload config when it is changed.
+        Must be called inside of running event loop.
+        """
+        if self._watch_task is None or self._watch_task.done():
+            self._watch_task = asyncio.ensure_future(self._watch(interval))
+
+    def stop_watching(self):
+        if self._watch_task is not None:
+            self._watch_task.cancel()
+            self._watch_task = None
+
+    async def _watch(self, interval: float):
+        loop = asyncio.get_event_loop()
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                mtime: Optional[float] = await loop.run_in_executor(None, self._get_mtime)
+                # Own write in progress : `_mtime` is updated when it finishes.
+                if self._saving > 0 or mtime is None or mtime == self._mtime:
+                    continue
+                await self.reload_async()
+            except Exception as e:
+                # Keep current config if new one is broken. It will be retried when the file is modified again.
+                self._mtime = await loop.run_in_executor(None, self._get_mtime)
+                self.logger.error(msg="[Config._watch] Failed to reload modified config! Keeping current config.",
+                                  exc_info=e)
+
+    def get(self, key_phrase: str, default: Any = _MISSING) -> Any:
+        """
+        Return config value of dotted path. (ex: `api.naver.client_id`)
+        Path is resolved once for each config snapshot and cached, so repeated lookups cost single dict lookup.
+        :param default: value to return if the path does not exist. KeyError is raised if not given.
+        """
+        config, cache = self._state
+        try:
+            value: Any = cache[key_phrase]
+        except KeyError:
+            value = cache[key_phrase] = self.lookup(config, key_phrase, default=_MISSING)
+        if value is _MISSING:
+            if default is _MISSING:
+                raise KeyError(key_phrase)
+            return default
+        return value
 
     def __getitem__(self, key) -> Any:
         return self.config[key]
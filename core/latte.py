@@ -1,10 +1,53 @@
 import asyncio, logging, discord, koreanbots
 from .ExtensionManager import ExtensionManager
 from .config import *
-from .DB import DBWrapper
-from typing import List, Tuple, Any, Dict, NoReturn, Callable, Union
+from .DB import DBWrapper, WriteBehindBuffer
+from .HTTPClient import HTTPClient
+from .RateLimiter import RESTScheduler
+from .Scheduler import MuteScheduler
+from .LatteLogger import LogPipeline
+from .Metrics import MetricsRegistry
+from .LoopMonitor import LoopMonitor
+from .MessageFilter import MessageFilter
+from .StartupProfiler import startup_profiler
+from utils import TTLCache
+from typing import List, Tuple, Any, Dict, NoReturn, Callable, Union, Optional
 from discord.ext.commands import AutoShardedBot
 
+# Schema of latte`s config. Checked whenever config is loaded or reloaded, so a broken config never replaces working one.
+LATTE_CONFIG_SCHEMA = ConfigSchema(fields={
+    "token": (str, True),
+    "prefix": ((str, list), True),
+    "admin_log": (int, True),
+    "database": (dict, True),
+    "ext": (dict, True),
+    "ext.base_dir": (str, True),
+    "ext.extensions": (dict, True),
+    "ext.import_workers": (int, False),
+    "api": (dict, True),
+    "api.koreanbots": (str, True),
+    "api.naver": (dict, False),
+    "api.naver.client_id": (str, True),
+    "api.naver.client_secret": (str, True),
+    "test": (dict, False),
+    "test.token": (str, True),
+    "test.prefix": ((str, list), True),
+    "documents_root": (str, False),
+    "documents_refresh_interval": ((int, float), False),
+    "invites_snapshot": (str, False),
+    "config_watch_interval": ((int, float), False),
+    "http": (dict, False),
+    "cache": (dict, False),
+    "cache.guild": (dict, False),
+    "logging": (dict, False),
+    "audit": (dict, False),
+    "errors": (dict, False),
+    "metrics": (dict, False),
+    "metrics.host": (str, False),
+    "metrics.port": (int, False),
+    "loop_monitor": (dict, False)
+})
+
 
 class Latte(AutoShardedBot):
     """
@@ -24,10 +67,38 @@ class Latte(AutoShardedBot):
     # Database
     # TODO : Work on ORM Structure using sqlalchemy & mysql
     db: DBWrapper = None
+    # Buffer for moderation records (warns, mutes) which are inserted in bulk.
+    record_buffer: WriteBehindBuffer = None
+    # Scheduler which expires mutes at their end time.
+    mute_scheduler: MuteScheduler = None
+
+    # Command metrics recorded in before_invoke / after_invoke hooks.
+    metrics: MetricsRegistry = None
+
+    # Monitor of event loop lag and callbacks blocking the loop.
+    loop_monitor: LoopMonitor = None
+
+    # Logging pipeline which writes logs in background thread.
+    log_pipeline: LogPipeline = None
 
     # Extensions
     ext: ExtensionManager = None
 
+    # Shared http client. Extensions must use this client instead of creating their own sessions.
+    http_client: HTTPClient = None
+
+    # Discord rest api request scheduler used in `api_get`.
+    rest: RESTScheduler = None
+
+    # Guild-specific prefixes. Preloaded from database at startup, and updated in `set_guild_prefix`.
+    guild_prefixes: Dict[int, str] = {}
+
+    # Pre-filter which drops messages that no command or listener is interested in. (`Latte.dispatch`)
+    message_filter: MessageFilter = None
+
+    # Cache of guild payloads received from discord rest api. (`Latte.get_guild_data`)
+    guild_cache: TTLCache = None
+
     # Flags
     test_mode: bool = False  # a flag value which indicates bot`s current mode (release / test)
     do_reboot: bool = False
@@ -58,7 +129,8 @@ class Latte(AutoShardedBot):
         self.test_mode = test_mode
 
         # Set discord & bot`s logger
-        self._set_logger(discord_level=logging.INFO)
+        with startup_profiler.phase("logger setup"):
+            self._set_logger(discord_level=logging.INFO)
         self.logger = self.get_logger()
 
         # Initialize bot`s service instance
@@ -66,15 +138,34 @@ class Latte(AutoShardedBot):
 
         # Setup bot
         self._setup()
+        self.log_pipeline.configure(**self.config.get("logging", {}))
         super(Latte, self).__init__(command_prefix=self.get_guild_prefix, help_command=None, **options)
 
-        self.db = DBWrapper(
-            id=self.config["database"]["id"],
-            pw=self.config["database"]["pw"],
-            host=self.config["database"]["host"],
-            port=self.config["database"]["port"]
+        self.db = DBWrapper(**self.config.get("database"))
+        self.record_buffer = WriteBehindBuffer(db=self.db, logger=self.get_logger(name="latte.db"))
+        self.mute_scheduler = MuteScheduler(bot=self, logger=self.get_logger(name="latte.scheduler"))
+        self.http_client = HTTPClient(
+            logger=self.get_logger(name="latte.http"),
+            **self.config.get("http", {})
+        )
+        self.rest = RESTScheduler(http_client=self.http_client, logger=self.get_logger(name="latte.rest"))
+        guild_cache_options: Dict[str, Any] = self.config.get("cache.guild", {})
+        self.guild_cache = TTLCache(
+            maxsize=guild_cache_options["maxsize"] if "maxsize" in guild_cache_options else 1000,
+            ttl=guild_cache_options["ttl"] if "ttl" in guild_cache_options else 600
         )
-        self.koreanbot = koreanbots.Client(self, self.config.config["api"]["koreanbots"], postCount=True)
+        self.metrics = MetricsRegistry(logger=self.get_logger(name="latte.metrics"))
+        self.loop_monitor = LoopMonitor(
+            logger=self.get_logger(name="latte.loop"),
+            **self.config.get("loop_monitor", {})
+        )
+        self.before_invoke(self.metrics.before_invoke)
+        self.after_invoke(self.metrics.after_invoke)
+        self.message_filter = MessageFilter()
+        self.refresh_message_filter()
+        self.config.subscribe("prefix", lambda old, new: self.refresh_message_filter())
+        self.config.subscribe("test.prefix", lambda old, new: self.refresh_message_filter())
+        self.koreanbot = koreanbots.Client(self, self.config.get("api.koreanbots"), postCount=True)
 
     def _opt_out_token(self, args: Tuple[Any], kwargs: Dict[str, Any]) \
             -> Tuple[Tuple[Tuple[Any], ...], Dict[str, Dict[str, Any]]]:
@@ -112,13 +203,18 @@ class Latte(AutoShardedBot):
         self.logger.info(msg="[SETUP] Setup Phase Started :")
 
         self.logger.info(msg="[SETUP] Loading bot config")
-        self.config = Config(config_dir=self.bot_config_dir, config_type=Config.Types.JSON)
-        self.config.load()
+        with startup_profiler.phase("config load"):
+            self.config = Config(
+                config_dir=self.bot_config_dir, config_type=Config.Types.from_path(self.bot_config_dir),
+                validator=LATTE_CONFIG_SCHEMA, logger=self.get_logger(name="latte.config")
+            )
+            self.config.load()
 
         self.logger.info(msg="[SETUP] Connecting databases.")
 
         self.logger.info(msg="[SETUP] Preparing ExtensionManager.")
-        self.ext = ExtensionManager(extensions_config=self.config["ext"])
+        with startup_profiler.phase("extension mapping"):
+            self.ext = ExtensionManager(extensions_config=self.config.get("ext"))
 
         self.logger.info(msg="[SETUP] Setup Phase Finished.")
 
@@ -137,8 +233,11 @@ class Latte(AutoShardedBot):
             "버그 제보는 언제나 환영이에요 :D"
         ]
 
-        self.ext.load_all(bot=self)
-        self.db.create_engine()
+        with startup_profiler.phase("extension loading"):
+            self.ext.load_all(bot=self)
+        startup_profiler.details["extensions"] = self.ext.load_times
+        with startup_profiler.phase("db engine creation"):
+            self.db.create_engine()
         # self.lavalink = LavalinkClient(user_id=self.user.id if self.user is not None else self.bot_config["id"])
 
         self.logger.info(msg="Initialization Phase Finished")
@@ -148,7 +247,9 @@ class Latte(AutoShardedBot):
         save bot`s datas.
         """
         self.logger.info(msg="Save Phase :")
-        self.config.save()
+        # Changes are usually written by debounced saves already. Config file is rewritten only if some are left.
+        if self.config.is_loaded() and self.config.is_dirty():
+            self.config.save()
 
     def run(self, *args, **kwargs):
         """
@@ -167,14 +268,48 @@ class Latte(AutoShardedBot):
 
         # Run bot using Super-class (discord.ext.commands.AutoSharedBot).
         if self.test_mode:
-            super().run(self.config.config["test"]["token"], *args, **kwargs)
+            super().run(self.config.get("test.token"), *args, **kwargs)
 
         else:
-            super().run(self.config.config["token"], *args, **kwargs)
+            super().run(self.config.get("token"), *args, **kwargs)
 
         # Save Datas
         self._save()
 
+    async def start(self, *args, **kwargs):
+        """
+        Start latte. Shared resources which require running event loop are prepared here.
+        """
+        with startup_profiler.phase("resources start"):
+            self.loop_monitor.start()
+            self.config.start_watching(
+                interval=self.config.get("config_watch_interval", 5.0)
+            )
+            await self.http_client.start()
+            await self.db.create_tables()
+            await self.load_guild_prefixes()
+            self.record_buffer.start()
+            self.mute_scheduler.start()
+            if self.config.get("metrics", None) is not None:
+                await self.metrics.start_server(**self.config.get("metrics"))
+        startup_profiler.mark("gateway_connect")
+        await super().start(*args, **kwargs)
+
+    async def close(self):
+        """
+        Close latte and release shared resources.
+        """
+        await super().close()
+        await self.mute_scheduler.close()
+        await self.metrics.close()
+        self.loop_monitor.close()
+        self.config.stop_watching()
+        await self.config.flush()
+        await self.http_client.close()
+        await self.record_buffer.close()
+        await self.db.close()
+        self.log_pipeline.stop()
+
     def check_reboot(self) -> bool:
         return self.do_reboot and self.is_closed()
 
@@ -188,6 +323,7 @@ class Latte(AutoShardedBot):
     def _set_logger(self, discord_level=logging.INFO, latte_level=logging.DEBUG):
         """
         Set some options of latte`s loggeer.
+        Records are written by background thread of `LogPipeline`, so logging never blocks event loop.
         """
         logging.getLogger("discord.gateway").setLevel(logging.WARNING)
         discord_logger = logging.getLogger("discord")
@@ -195,75 +331,106 @@ class Latte(AutoShardedBot):
         latte_logger = self.get_logger()
         latte_logger.setLevel(level=latte_level)
 
-        # Set console logger
-
-        import sys
-        console_handler: logging.Handler = logging.StreamHandler(sys.stdout)
-        console_handler.setFormatter(
-            logging.Formatter("[%(asctime)s] [%(levelname)s] %(name)s: %(message)s")
-        )
-        discord_logger.addHandler(hdlr=console_handler)
-        latte_logger.addHandler(hdlr=console_handler)
-
-        from pytz import timezone, utc
-        import datetime
-
-        tz = timezone("Asia/Seoul")
-        current_dt_KST: datetime.datetime = utc.localize(datetime.datetime.now()).astimezone(tz)
-        current_dt_KST_month: str = '0' + (
-            str(current_dt_KST.month) if (0 < current_dt_KST.month < 10) else str(current_dt_KST.month)
-        )
-        log_filedir = f"./logs/Latte/{current_dt_KST.tzname()}%"
-        log_filedir += f"{current_dt_KST.year}-{current_dt_KST_month}-{current_dt_KST.day}%"
-        log_filedir += f"{current_dt_KST.hour}-{current_dt_KST.minute}-{current_dt_KST.second}.txt"
-        file_handler: logging.Handler = logging.FileHandler(filename=log_filedir, mode="x", encoding="utf-8")
-        file_handler.setFormatter(
-            logging.Formatter("[%(asctime)s] [%(levelname)s] %(name)s: %(message)s")
-        )
-        discord_logger.addHandler(hdlr=file_handler)
-        latte_logger.addHandler(hdlr=file_handler)
-
-        import os
-        log_files: List[str] = sorted(os.listdir("./logs/Latte"))
-        if len(log_files) > 7:
-            """
-            If logs files are stored more than 7, latte will automatically delete logs except recent 7 ones.
-            """
-            latte_logger.info(msg="Too many logs files are stored! Deleting except recent 7 logs...")
-            for log_file in log_files[:len(log_files)-7]:
-                latte_logger.info(msg=f"Deleting lof file ./logs/Latte/{log_file}")
-                os.remove(path=f'./logs/Latte/{log_file}')
+        self.log_pipeline = LogPipeline()
+        self.log_pipeline.attach(discord_logger, latte_logger)
+        self.log_pipeline.start()
 
     @staticmethod
-    def get_guild_prefix(bot, message: discord.Message) -> List[str]:
+    def get_guild_prefix(bot, message: discord.Message) -> Union[List[str], str]:
         """
-        Return guild specific prefix.
+        Return guild specific prefix. Called on every messages, so prefixes are only looked up in memory.
         :param message: Message to define command prefix.
         :return: command prefix (List[str] or str)
         """
-        # guild_prefix: str = self.db.get(message.guild.id)
-        # return guild_prefix
-        return bot.config["test"]["prefix"] if bot.test_mode else bot.config["prefix"]
+        if message.guild is not None:
+            guild_prefix: Optional[str] = bot.guild_prefixes.get(message.guild.id)
+            if guild_prefix is not None:
+                return guild_prefix
+        return bot.get_default_prefix()
+
+    def get_default_prefix(self) -> Union[List[str], str]:
+        return self.config.get("test.prefix") if self.test_mode else self.config.get("prefix")
+
+    def refresh_message_filter(self):
+        """
+        Update prefixes of message filter, using default prefix and every guild-specific prefixes.
+        """
+        default_prefix: Union[List[str], str] = self.get_default_prefix()
+        prefixes: List[str] = [default_prefix] if isinstance(default_prefix, str) else list(default_prefix)
+        self.message_filter.set_prefixes(prefixes + list(self.guild_prefixes.values()))
+
+    def dispatch(self, event_name: str, *args, **kwargs):
+        """
+        Dispatch event. Messages which can`t be a command or a trigger of listeners are dropped here,
+        unless someone is waiting for messages using `wait_for`.
+        """
+        if event_name == "message" and "message" not in self._listeners \
+                and not self.message_filter.accepts(args[0].content):
+            return
+        super().dispatch(event_name, *args, **kwargs)
+
+    async def load_guild_prefixes(self):
+        """
+        Load every guild-specific prefixes stored in database into memory.
+        """
+        self.guild_prefixes = await self.db.get_guild_prefixes()
+        self.refresh_message_filter()
+        self.logger.info(msg=f"[Latte.load_guild_prefixes] Loaded {len(self.guild_prefixes)} guild-specific prefixes.")
+
+    async def set_guild_prefix(self, guild: discord.Guild, prefix: Optional[str]):
+        """
+        Change guild-specific prefix. Database is updated first, and then in-memory prefixes.
+        :param guild: guild to change prefix.
+        :param prefix: new prefix. Reset into default prefix if None.
+        """
+        await self.db.set_guild_prefix(guild_id=guild.id, guild_name=guild.name, prefix=prefix)
+        if prefix is None:
+            self.guild_prefixes.pop(guild.id, None)
+        else:
+            self.guild_prefixes[guild.id] = prefix
+        self.refresh_message_filter()
 
     async def api_get(self, api_url: str, response_type: str = "json") -> Union[Dict[str, Any], str, bytes]:
-        import aiohttp
-        base_url = "https://discord.com/api"
+        """
+        Send GET request to discord rest api directly. Requests are scheduled following discord`s rate limits.
+        :param api_url: discord api url which starts with '/'. (ex: /guilds/1234)
+        :param response_type: type of the response body to return. (json / text / bytes)
+        """
         if not api_url.startswith('/'):
             raise ValueError("Invalid API url!")
 
-        url = base_url + api_url
         headers: dict = {
-            "Authorization": f"Bot {self.config['token']}"
+            "Authorization": f"Bot {self.config.get('token')}"
         }
-        async with aiohttp.request(method="get", url=url, headers=headers) as response:
-            if response_type == "json":
-                return await response.json()
-            elif response_type == "text":
-                return await response.text()
-            elif response_type == "bytes":
-                return await response.read()
-            else:
-                raise ValueError("Unexpected respomse type!")
+        return await self.rest.request(method="GET", api_url=api_url, response_type=response_type, headers=headers)
+
+    async def get_guild_data(self, guild_id: int) -> Dict[str, Any]:
+        """
+        Get guild payload from discord rest api. Payloads are cached until `on_guild_update` event is dispatched,
+        or cache item is expired.
+        :param guild_id: id of the guild to get.
+        :return: guild payload (https://discord.com/developers/docs/resources/guild#guild-object)
+        """
+        guild_data: Optional[Dict[str, Any]] = self.guild_cache.get(guild_id)
+        if guild_data is None:
+            guild_data = await self.api_get(api_url=f"/guilds/{guild_id}", response_type="json")
+            # Error payloads ({"code": ..., "message": ...}) are returned as-is but never cached,
+            # so transient errors (ex: 403, 404 during guild join) are not served until cache expires.
+            if isinstance(guild_data, dict) and "id" in guild_data:
+                self.guild_cache.set(guild_id, guild_data)
+        return guild_data
+
+    async def on_guild_update(self, before: discord.Guild, after: discord.Guild):
+        """
+        event listener for latte`s on_guild_update event. Invalidate cached guild payload.
+        """
+        self.guild_cache.invalidate(after.id)
+
+    async def on_guild_remove(self, guild: discord.Guild):
+        """
+        event listener for latte`s on_guild_remove event. Invalidate cached guild payload.
+        """
+        self.guild_cache.invalidate(guild.id)
 
     async def presence_loop(self):
         """
@@ -285,6 +452,21 @@ class Latte(AutoShardedBot):
         """
         self.logger.info("라떼봇 온라인!")
 
+        if startup_profiler.enabled and not startup_profiler.finished:
+            startup_profiler.mark("gateway_ready")
+            startup_profiler.record(
+                name="gateway connect",
+                start=startup_profiler.marks["gateway_connect"],
+                duration=startup_profiler.marks["gateway_ready"] - startup_profiler.marks["gateway_connect"]
+            )
+            report = startup_profiler.finish()
+            self.logger.info(
+                msg=f"[Latte.on_ready] Startup took {report['total']}s. Report is written in {startup_profiler.report_path}"
+            )
+            if startup_profiler.exit_after_startup:
+                await self.close()
+                return
+
         # 봇의 상태메세지를 지속적으로 변경합니다.
         self.loop.create_task(self.presence_loop())
         self.get_logger().info(
@@ -1,16 +1,23 @@
 from discord.ext import commands
-import discord, aiohttp, random
+import discord, random
 from core import Latte
 from utils import get_cog_name_in_ext
 
 
 class AICog(commands.Cog):
+    # Messages which latte answers to.
+    triggers: frozenset = frozenset(["라떼야", "라떼"])
+
     def __init__(self, bot: Latte):
         self.bot = bot
-        
+        self.bot.message_filter.add_triggers(owner=AICog.__module__, phrases=self.triggers)
+
+    def cog_unload(self):
+        self.bot.message_filter.remove_owner(owner=AICog.__module__)
+
     @commands.Cog.listener()
     async def on_message(self, msg: discord.Message):
-        if msg.content in ["라떼야", "라떼"]:
+        if msg.content in self.triggers:
             await msg.channel.send(await self.random_text())
 
     async def random_text(self) -> str:
@@ -21,9 +21,9 @@ class R6S_API:
 class GameStatsCog(commands.Cog):
     def __init__(self, bot: Latte):
         self.bot = bot
-        self.lol = LOL_API(bot.config.config["api"])
-        self.pubg = PUBG_API(bot.config.config["api"])
-        self.r6s = R6S_API(bot.config.config["api"])
+        self.lol = LOL_API(bot.config.get("api"))
+        self.pubg = PUBG_API(bot.config.get("api"))
+        self.r6s = R6S_API(bot.config.get("api"))
 
 
 def setup(bot: Latte):
@@ -1,8 +1,8 @@
-import discord, logging, aiohttp, json
+import discord, logging, json
 from discord.ext import commands
 from xml.etree.ElementTree import Element, ElementTree, fromstring
 from typing import List, Optional, Mapping, Dict, Tuple
-from core import Latte
+from core import Latte, HTTPClient
 from utils import get_cog_name_in_ext, EmbedFactory
 from .SearchAPIExceptions import *
 
@@ -69,9 +69,10 @@ class NaverSearch:
     )
     logger.addHandler(handler)
 
-    def __init__(self, client_id: str, client_secret: str):
+    def __init__(self, client_id: str, client_secret: str, http_client: HTTPClient):
         self.client_id = client_id
         self.client_secret = client_secret
+        self.http_client = http_client
 
     async def search(self, category: str, query: str, response_format: str = "xml", count: int = 3) -> Optional[dict]:
         """
@@ -92,41 +93,42 @@ class NaverSearch:
             self.logger.error(msg=f"Response format {response_format} is not supported in category {category}!")
             raise NaverSearch_CategoryNotSupported(query=query, category=category, response_format=response_format)
 
-        async with aiohttp.ClientSession() as session:
-            headers: Mapping[str, str] = {"X-Naver-Client-Id": f"{self.client_id}",
-                                          "X-Naver-Client-Secret": f"{self.client_secret}"}
-            async with session.request(method="GET",
-                                       url=f"{self.request_url_base}/{category}.{response_format}?query={query}&display={count}",
-                                       headers=headers) as response:
-                response_str: str = await response.text(encoding="utf-8")
-                self.logger.debug(msg=f"response_str = {response_str}")
-                if response_format == "xml":
-                    parsed_response: Element = ElementTree(fromstring(response_str)).getroot()
-                    parsed_items: List[Optional[Element]] = parsed_response.find("channel").findall("item")
+        headers: Mapping[str, str] = {"X-Naver-Client-Id": f"{self.client_id}",
+                                      "X-Naver-Client-Secret": f"{self.client_secret}"}
+        response_str: str = await self.http_client.get(
+            url=f"{self.request_url_base}/{category}.{response_format}",
+            params={"query": query, "display": count},
+            headers=headers,
+            response_type="text"
+        )
+        self.logger.debug(msg=f"response_str = {response_str}")
+        if response_format == "xml":
+            parsed_response: Element = ElementTree(fromstring(response_str)).getroot()
+            parsed_items: List[Optional[Element]] = parsed_response.find("channel").findall("item")
 
-                    total_result = {}
-                    if len(parsed_items) > 0:
-                        for item in parsed_items:
-                            item_result = {
-                                "title": await self.parse_content(item=item, tag="title"),
-                                "link": await self.parse_content(item=item, tag="link"),
-                                "description": await self.parse_content(item=item, tag="description")
-                            }
-                            if category == "blog":
-                                item_result["postdate"] = await self.parse_content(item=item, tag="postdate")
-                                item_result["author"] = await self.parse_content(item=item, tag="bloggername")
-                            elif category == "cafearticle":
-                                item_result["cafename"] = await self.parse_content(item=item, tag="cafename")
-                                item_result["cafeurl"] = await self.parse_content(item=item, tag="cafeurl")
+            total_result = {}
+            if len(parsed_items) > 0:
+                for item in parsed_items:
+                    item_result = {
+                        "title": await self.parse_content(item=item, tag="title"),
+                        "link": await self.parse_content(item=item, tag="link"),
+                        "description": await self.parse_content(item=item, tag="description")
+                    }
+                    if category == "blog":
+                        item_result["postdate"] = await self.parse_content(item=item, tag="postdate")
+                        item_result["author"] = await self.parse_content(item=item, tag="bloggername")
+                    elif category == "cafearticle":
+                        item_result["cafename"] = await self.parse_content(item=item, tag="cafename")
+                        item_result["cafeurl"] = await self.parse_content(item=item, tag="cafeurl")
 
-                            total_result[item_result["title"]] = item_result
-                    else:
-                        total_result = {"result":"No Search Result"}
-                    return total_result
+                    total_result[item_result["title"]] = item_result
+            else:
+                total_result = {"result":"No Search Result"}
+            return total_result
 
-                elif response_format == "json":
-                    content: dict = await response.json(encoding="utf-8")
-                    self.logger.debug(msg=f"final parsed response = {json.dumps(obj=content, indent=4, ensure_ascii=False)}")
+        elif response_format == "json":
+            content: dict = json.loads(response_str)
+            self.logger.debug(msg=f"final parsed response = {content}")
 
     async def parse_content(self, item: Element, tag: str):
         return ("".join(list(item.find(tag).itertext()))).replace("<b>", '__**').replace("</b>", '**__').replace("&quot;", '"')
@@ -144,15 +146,25 @@ class SearchAPICog(commands.Cog):
     def __init__(self, bot: Latte):
         self.bot: Latte = bot
         self.naverSearch = NaverSearch(
-            client_id=bot.config["api"]["naver"]["client_id"],
-            client_secret=bot.config["api"]["naver"]["client_secret"]
+            client_id=bot.config.get("api.naver.client_id"),
+            client_secret=bot.config.get("api.naver.client_secret"),
+            http_client=bot.http_client
         )
         self.googleSearch = GoogleSearch()
+        self.bot.config.subscribe("api.naver", self.on_naver_config_update)
         self.bot.logger.info("[SearchAPIExt.init] SearchAPI module have been initialized.")
 
     def cog_unload(self):
+        self.bot.config.unsubscribe("api.naver", self.on_naver_config_update)
         self.bot.logger.info("[SearchAPIExt.unload] SearchAPI module have been unloaded.")
 
+    def on_naver_config_update(self, old: Optional[dict], new: Optional[dict]):
+        if new is None:
+            return
+        self.naverSearch.client_id = new["client_id"]
+        self.naverSearch.client_secret = new["client_secret"]
+        self.bot.logger.info("[SearchAPIExt.on_naver_config_update] Naver search api keys have been updated.")
+
     @commands.group(
         name="search",
         aliases=["검색"],
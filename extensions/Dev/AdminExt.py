@@ -1,117 +1,89 @@
-import discord, json, traceback
+import asyncio, discord, io, threading, time
 from discord.ext import commands
-from core import Latte, BadExtArguments, Config
+from core import Latte, BadExtArguments, Config, SamplingProfiler
 from utils import EmbedFactory, get_cog_name_in_ext
-from typing import Dict, List, Type
+from typing import Dict, List, Optional, Type
+from .AuditSink import AuditSink
+from .ErrorAggregator import ErrorAggregator, ErrorRecord
 
 
 class AdminCog(commands.Cog):
+    # Longest duration which `profile` command can run profiler.
+    max_profile_seconds: float = 300.0
 
     def __init__(self, bot: Latte):
         self.bot = bot
+        self.audit_sink = AuditSink(
+            bot=bot,
+            channel_id=bot.config.get("admin_log"),
+            logger=bot.get_logger(name="latte.audit"),
+            **bot.config.get("audit", {})
+        )
+        self.audit_sink.start()
+        self.error_aggregator = ErrorAggregator(
+            bot=bot,
+            channel_id=bot.config.get("admin_log"),
+            logger=bot.get_logger(name="latte.errors"),
+            **bot.config.get("errors", {})
+        )
+        self.error_aggregator.start()
+        self.profiler: Optional[SamplingProfiler] = None
+
+    def cog_unload(self):
+        self.audit_sink.close()
+        self.error_aggregator.close()
+        if self.profiler is not None:
+            self.profiler.stop()
 
     @commands.Cog.listener()
     async def on_command(self, ctx: commands.Context):
         command_name: str = f"{ctx.cog.qualified_name if ctx.cog is not None else 'bot'}:{ctx.command.name if ctx.command is not None else 'UNKNOWN'}"
         self.bot.get_logger().info(
             msg=f"[AdminExt.on_command] User {EmbedFactory.get_user_info(user=ctx.author)} used `{command_name}` "
-                f"command with following arguments : \n{ctx.args, json.dumps(ctx.kwargs, indent=4, ensure_ascii=False)} "
+                f"command with following arguments : {ctx.args}, {ctx.kwargs}"
+        )
+        args: List[str] = [str(arg) for arg in ctx.args if not isinstance(arg, (commands.Cog, commands.Context))]
+        guild_info: str = f"{ctx.guild.name} ({ctx.guild.id})" if ctx.guild is not None else "DM"
+        self.audit_sink.put(
+            title=command_name,
+            detail=f"사용자 : {EmbedFactory.get_user_info(user=ctx.author)}\n서버 : {guild_info}\n"
+                   f"args : {args}\nkwargs : {ctx.kwargs}"
         )
-        if self.bot.config.is_loaded() and self.bot.config.config_type == Config.Types.JSON:
-            log_channel: discord.TextChannel = self.bot.get_channel(self.bot.config["admin_log"])
-            print(log_channel)
-            args = ('\n'.join([f"{arg_num} : {arg}" for arg_num, arg in enumerate(ctx.args)])) if len(
-                ctx.args) > 0 else "[]"
-            if log_channel is not None:
-                owner_info = f"{ctx.guild.owner.name}#{ctx.guild.owner.discriminator}" if ctx.guild.owner is not None else "UNKNOWN"
-                await log_channel.send(
-                    embed=await EmbedFactory(
-                        title="[AdminExt.on_command]",
-                        description=f"`{command_name}` 명령어가 사용되었습니다.",
-                        author={
-                            "name": EmbedFactory.get_user_info(user=self.bot.user, contain_id=True),
-                            "icon_url": self.bot.user.avatar_url
-                        },
-                        footer=EmbedFactory.get_command_caller(ctx.author),
-                        color=EmbedFactory.default_color,
-                        fields=[
-                            {
-                                "name": "명령어 파라미터 - 위치 인자 (*args)",
-                                "value": args,
-                                "inline": False
-                            },
-                            {
-                                "name": "명령어 파라미터 - 키워드 인자 (**kwargs)",
-                                "value": json.dumps(ctx.kwargs, indent=4, ensure_ascii=False),
-                                "inline": False
-                            },
-                            {
-                                "name": "명령어가 사용된 서버 정보",
-                                "value": f"이름 : {ctx.guild.name}\nid : {ctx.guild.id}\n주인 : {owner_info} ({ctx.guild.owner_id})",
-                                "inline": False
-                            }
-                        ]
-                    ).build()
-                )
 
     @commands.Cog.listener()
     async def on_command_error(self, ctx: commands.Context, error: Type[Exception]):
         command_name: str = f"{ctx.cog.qualified_name if ctx.cog is not None else 'bot'}:{ctx.command.name if ctx.command is not None else 'UNKNOWN'}"
-        self.bot.get_logger().error(
-            msg=f"[AdminExt.on_command] User {EmbedFactory.get_user_info(user=ctx.author)} used `{command_name}` "
-                f"command with following arguments : \n{ctx.args, json.dumps(ctx.kwargs, indent=4, ensure_ascii=False)}\n"
-                f", and error :\n{error}"
-        )
-        self.bot.get_logger().error(
-            msg=f"type of the error : {error}"
+        args: List[str] = [str(arg) for arg in ctx.args if not isinstance(arg, (commands.Cog, commands.Context))]
+        guild_info: str = f"{ctx.guild.name} ({ctx.guild.id})" if ctx.guild is not None else "DM"
+        record, is_new = self.error_aggregator.record(
+            error=error,
+            context=f"`{command_name}` / 사용자 : {EmbedFactory.get_user_info(user=ctx.author)} / 서버 : {guild_info}\n"
+                    f"args : {args}, kwargs : {ctx.kwargs}"
         )
+        if is_new:
+            self.bot.get_logger().error(
+                msg=f"[AdminExt.on_command_error] New error `{record.fingerprint}` in `{command_name}` command "
+                    f"used by {EmbedFactory.get_user_info(user=ctx.author)} with following arguments : "
+                    f"{ctx.args}, {ctx.kwargs}",
+                exc_info=self.error_aggregator.unwrap(error)
+            )
+        else:
+            self.bot.get_logger().error(
+                msg=f"[AdminExt.on_command_error] Error `{record.fingerprint}` occurred again in `{command_name}` "
+                    f"command ({record.count} times) : {record.error_type} : {record.message}"
+            )
         await ctx.channel.send(
             embed=await EmbedFactory(
                 title=f"[라떼봇 베타] An error occurred during executing command `{command_name}`\n> {error}"
             ).build()
         )
-        if self.bot.config.is_loaded() and self.bot.config.config_type == Config.Types.JSON:
-            log_channel: discord.TextChannel = self.bot.get_channel(self.bot.config["admin_log"])
-            if log_channel is not None:
-                owner_info = f"{ctx.guild.owner.name}#{ctx.guild.owner.discriminator}" if ctx.guild.owner is not None else "UNKNOWN"
-                tracebacks: list = traceback.format_exception(type(error.__cause__), error.__cause__, error.__cause__.__traceback__)
-                await log_channel.send(
-                    content=f"{self.bot.get_user(self.bot.owner_id).mention}",
-                    embed=await EmbedFactory(
-                        title="[AdminExt.on_command] command error detected",
-                        description=f"`{command_name}` 명령어가 사용되었습니다.",
-                        color=EmbedFactory.error_color,
-                        author={
-                            "name": EmbedFactory.get_user_info(user=self.bot.user, contain_id=True),
-                            "icon_url": self.bot.user.avatar_url
-                        },
-                        footer=EmbedFactory.get_command_caller(ctx.author),
-                        fields=[
-                            {
-                                "name": "오류가 발생한 서버 정보",
-                                "value": f"이름 : {ctx.guild.name}\nid : {ctx.guild.id}\n주인 : {owner_info} ({ctx.guild.owner_id})"
-                            },
-                            {
-                                "name": "명령어 실행 도중 발생한 오류 정보",
-                                "value": "```css\n"
-                                         f"{''.join(tracebacks)}\n```"
-                            },
-                            {
-                                "name": "명령어 파라미터 - 위치 인자 (*args)",
-                                "value": '\n'.join([f"{arg_num} : {arg}" for arg_num, arg in enumerate(ctx.args)])
-                            },
-                            {
-                                "name": "명령어 파라미터 - 키워드 인자 (**kwargs)",
-                                "value": json.dumps(ctx.kwargs, indent=4, ensure_ascii=False)
-                            },
-                        ]
-                    ).build()
-                )
+        if is_new:
+            await self.error_aggregator.report_new(record)
 
     @commands.Cog.listener()
     async def on_guild_join(self, guild: discord.Guild):
         owner_info = f"{guild.owner.name}#{guild.owner.discriminator}" if guild.owner is not None else "UNKNOWN"
-        await self.bot.get_channel(self.bot.config["admin_log"]).send(
+        await self.bot.get_channel(self.bot.config.get("admin_log")).send(
             embed=await EmbedFactory(
                 title="[EVENT] 라떼봇이 새로운 서버에 참여했습니다!",
                 description="event : on_guild_join",
@@ -134,7 +106,7 @@ class AdminCog(commands.Cog):
     @commands.Cog.listener()
     async def on_guild_remove(self, guild: discord.Guild):
         owner_info = f"{guild.owner.name}#{guild.owner.discriminator}" if guild.owner is not None else "UNKNOWN"
-        await self.bot.get_channel(self.bot.config.config["admin_log"]).send(
+        await self.bot.get_channel(self.bot.config.get("admin_log")).send(
             embed=await EmbedFactory(
                 title="[EVENT] 라떼봇이 서버에서 떠났습니다!",
                 description="event : on_guild_remove",
@@ -294,6 +266,232 @@ class AdminCog(commands.Cog):
             embed=await embed_factory.build()
         )
 
+    @commands.is_owner()
+    @commands.command(
+        name="rest-stats",
+        aliases=["reststats", "레이트리밋"],
+        description="Show statistics of discord rest api request scheduler.",
+        help=""
+    )
+    async def rest_stats(self, ctx: commands.Context):
+        stats = self.bot.rest.get_stats()
+        cache_stats = self.bot.guild_cache.get_stats()
+        audit_stats = self.audit_sink.get_stats()
+        await ctx.send(
+            embed=await EmbedFactory(
+                title="[ Admin Extension - REST Scheduler Statistics ]",
+                color=EmbedFactory.default_color,
+                footer=EmbedFactory.get_command_caller(ctx.author),
+                fields=[
+                    {
+                        "name": "대기열 / 버킷",
+                        "value": f"queue depth : {stats['queue_depth']}\nbuckets : {stats['buckets']}",
+                        "inline": False
+                    },
+                    {
+                        "name": "요청",
+                        "value": f"requests : {stats['requests']}\nmerged : {stats['merged']}\n"
+                                 f"rate limited (429) : {stats['ratelimited']}",
+                        "inline": False
+                    },
+                    {
+                        "name": "대기 시간",
+                        "value": f"waited : {stats['waited']}\ntotal : {stats['total_wait']}s\n"
+                                 f"avg : {stats['avg_wait']}s\nmax : {stats['max_wait']}s",
+                        "inline": False
+                    },
+                    {
+                        "name": "감사 로그",
+                        "value": f"queue depth : {audit_stats['queue_depth']}\nsent : {audit_stats['sent']} "
+                                 f"({audit_stats['messages']} messages)\ndropped : {audit_stats['dropped']}\n"
+                                 f"failed : {audit_stats['failed']}",
+                        "inline": False
+                    },
+                    {
+                        "name": "길드 캐시",
+                        "value": f"size : {cache_stats['size']} / {cache_stats['maxsize']}\n"
+                                 f"hits : {cache_stats['hits']}\nmisses : {cache_stats['misses']}\n"
+                                 f"hit rate : {cache_stats['hit_rate']}",
+                        "inline": False
+                    }
+                ]
+            ).build()
+        )
+
+    @commands.is_owner()
+    @commands.command(
+        name="metrics",
+        aliases=["명령어통계", "command-stats"],
+        description="Show count, error count and latency of most used commands.",
+        help=""
+    )
+    async def metrics(self, ctx: commands.Context, limit: int = 10):
+        stats = self.bot.metrics.get_stats(limit=min(limit, 25))
+        await ctx.send(
+            embed=await EmbedFactory(
+                title="[ Admin Extension - Command Metrics ]",
+                description="기록된 명령어가 없습니다." if len(stats) == 0 else "지연 시간 단위 : ms",
+                color=EmbedFactory.default_color,
+                footer=EmbedFactory.get_command_caller(ctx.author),
+                fields=[
+                    {
+                        "name": stat["command"],
+                        "value": f"count : {stat['count']} / errors : {stat['errors']}\n"
+                                 f"p50 : {stat['p50']} / p95 : {stat['p95']} / p99 : {stat['p99']} / max : {stat['max']}",
+                        "inline": False
+                    }
+                    for stat in stats
+                ]
+            ).build()
+        )
+
+    @commands.is_owner()
+    @commands.command(
+        name="loop-health",
+        aliases=["loophealth", "이벤트루프"],
+        description="Show event loop lag, and callbacks which blocked the event loop.",
+        help=""
+    )
+    async def loop_health(self, ctx: commands.Context):
+        stats = self.bot.loop_monitor.get_stats()
+        last_stall = self.bot.loop_monitor.get_last_stall()
+        fields = [
+            {
+                "name": "지연 시간 (초)",
+                "value": f"last : {stats['last_lag']}\navg : {stats['avg_lag']}\nmax : {stats['max_lag']}\n"
+                         f"stalls : {stats['stalls']}",
+                "inline": False
+            },
+            {
+                "name": "이벤트 루프를 막은 코드 (횟수 / 총 시간 / 최대 시간)",
+                "value": '\n'.join(
+                    f"`{owner}` : {count} / {total}s / {max_duration}s"
+                    for owner, count, total, max_duration in stats["owners"][:10]
+                )[:1024] if len(stats["owners"]) > 0 else "-",
+                "inline": False
+            }
+        ]
+        if last_stall is not None:
+            fields.append({
+                "name": f"최근 멈춤 ({round(last_stall.duration, 3)}s)",
+                "value": "```\n" + ('\n'.join(last_stall.stack[-10:]) or last_stall.owner)[-1000:] + "\n```",
+                "inline": False
+            })
+        await ctx.send(
+            embed=await EmbedFactory(
+                title="[ Admin Extension - Event Loop Health ]",
+                color=EmbedFactory.default_color,
+                footer=EmbedFactory.get_command_caller(ctx.author),
+                fields=fields
+            ).build()
+        )
+
+    @commands.is_owner()
+    @commands.command(
+        name="profile",
+        aliases=["프로파일", "profiler"],
+        description="Profile latte for given seconds using sampling profiler, and upload collapsed stacks.",
+        help="profile <seconds> [all] : profile event loop thread (or every threads) for seconds. (max 300)"
+    )
+    async def profile(self, ctx: commands.Context, seconds: float = 10.0, scope: str = "loop"):
+        if self.profiler is not None and self.profiler.is_running():
+            await ctx.send(content="이미 프로파일러가 실행중입니다.")
+            return
+        seconds = min(max(seconds, 1.0), self.max_profile_seconds)
+        # Commands run in event loop thread, so current thread is the one to profile.
+        self.profiler = SamplingProfiler(thread_id=None if scope == "all" else threading.get_ident())
+        await ctx.send(content=f"{seconds}초 동안 프로파일링을 시작합니다. ({'모든 스레드' if scope == 'all' else '이벤트 루프 스레드'})")
+        self.profiler.start()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            # Sampler wakes every few milliseconds, so joining it never blocks the loop for long.
+            self.profiler.stop()
+
+        top = self.profiler.top(limit=10)
+        await ctx.send(
+            embed=await EmbedFactory(
+                title="[ Admin Extension - Profiler ]",
+                description=f"{self.profiler.samples} samples / {round(self.profiler.elapsed, 2)}s",
+                color=EmbedFactory.default_color,
+                footer=EmbedFactory.get_command_caller(ctx.author),
+                fields=[
+                    {
+                        "name": "가장 많이 실행중이던 함수 (samples / 비율)",
+                        "value": '\n'.join(f"`{function}` : {count} / {ratio}" for function, count, ratio in top)[:1024]
+                                 if len(top) > 0 else "-",
+                        "inline": False
+                    }
+                ]
+            ).build(),
+            file=discord.File(
+                fp=io.BytesIO(self.profiler.collapsed().encode("utf-8")),
+                filename=f"latte-profile-{int(time.time())}.collapsed.txt"
+            )
+        )
+
+    @commands.is_owner()
+    @commands.command(
+        name="errors",
+        aliases=["오류", "error-table"],
+        description="Show aggregated command errors, or detail of single error fingerprint.",
+        help=""
+    )
+    async def errors(self, ctx: commands.Context, fingerprint: str = None):
+        if fingerprint is not None:
+            record: Optional[ErrorRecord] = self.error_aggregator.get(fingerprint)
+            if record is None:
+                await ctx.send(content=f"`{fingerprint}` 오류 기록을 찾을 수 없습니다.")
+                return
+            await ctx.send(
+                embed=await EmbedFactory(
+                    title=f"[ Admin Extension - Error `{record.fingerprint}` ]",
+                    description=f"```css\n{ErrorAggregator._shorten(record.traceback, 1800)}\n```",
+                    color=EmbedFactory.error_color,
+                    footer=EmbedFactory.get_command_caller(ctx.author),
+                    fields=[
+                        {
+                            "name": "오류",
+                            "value": ErrorAggregator._shorten(f"{record.error_type} : {record.message}", 1024),
+                            "inline": False
+                        },
+                        {
+                            "name": "발생 횟수",
+                            "value": f"total : {record.count}\nfirst : {record.first_seen:%Y-%m-%d %H:%M:%S} (UTC)\n"
+                                     f"last : {record.last_seen:%Y-%m-%d %H:%M:%S} (UTC)",
+                            "inline": False
+                        },
+                        {
+                            "name": "발생 상황 (최근)",
+                            "value": ErrorAggregator._shorten('\n\n'.join(record.samples), 1024),
+                            "inline": False
+                        }
+                    ]
+                ).build()
+            )
+            return
+
+        records: List[ErrorRecord] = self.error_aggregator.top(limit=20)
+        await ctx.send(
+            embed=await EmbedFactory(
+                title="[ Admin Extension - Error Table ]",
+                description="기록된 오류가 없습니다." if len(records) == 0 else
+                            f"{len(self.error_aggregator.records)}개의 오류 중 상위 {len(records)}개",
+                color=EmbedFactory.default_color,
+                footer=EmbedFactory.get_command_caller(ctx.author),
+                fields=[
+                    {
+                        "name": f"`{record.fingerprint}` {record.error_type} x{record.count}",
+                        "value": ErrorAggregator._shorten(
+                            f"{record.location}\nlast : {record.last_seen:%Y-%m-%d %H:%M:%S} (UTC)", 1024
+                        ),
+                        "inline": False
+                    }
+                    for record in records
+                ]
+            ).build()
+        )
+
     @commands.is_owner()
     @commands.group(
         name="extension",
@@ -377,14 +575,6 @@ class AdminCog(commands.Cog):
                 )
                 await ctx.send(embed=result_embed)
 
-                if category == "Utility" and name == "invites":
-                    # During reloading / loading module again, InvitesExt extension lose it`s trackin data.
-                    # So we need to call update() method and re-track invites data.
-                    # But, discord.Guild.invites() method is a coroutine,
-                    # it can`t be called in __init__ method while bot is running.
-                    # So, we need to call update() method manually right after reloading/loading extension again.
-                    await self.bot.get_cog(name).update()
-
     @commands.is_owner()
     @ext.command(
         name="unload",
@@ -475,14 +665,6 @@ class AdminCog(commands.Cog):
                 )
                 await ctx.send(embed=result_embed)
 
-                if category == "Utility" and name == "invites":
-                    # During reloading / loading module again, InvitesExt extension lose it`s trackin data.
-                    # So we need to call update() method and re-track invites data.
-                    # But, discord.Guild.invites() method is a coroutine,
-                    # it can`t be called in __init__ method while bot is running.
-                    # So, we need to call update() method manually right after reloading/loading extension again.
-                    await self.bot.get_cog(name).update()
-
     async def parse_params(self, params_raw: str) -> Dict[str, str]:
         params = params_raw.split('-')
         print(params)
@@ -0,0 +1,183 @@
+"""
+extensions/Dev/AuditSink.py
+~~~~~~~~~~~~~~~~~~~~~~~~~~~
+Batched sink of audit events which AdminExt reports into admin log channel.
+
+AuditSink : Collect audit events in bounded queue, and send them every `flush_interval` seconds
+            (or right after `batch_events` events are collected) as few messages, each packing many events.
+            Events which overflow the queue or failed to be sent are written into local log file instead,
+            so admin channel never competes with user-facing messages for rate limits.
+"""
+import asyncio, logging
+from collections import deque
+from datetime import datetime
+from typing import Deque, Dict, List, NamedTuple, Optional
+import discord
+from utils import EmbedFactory
+
+
+class AuditEvent(NamedTuple):
+    title: str
+    detail: str
+    time: datetime
+
+
+class AuditSink:
+    # Discord embed limits.
+    max_fields_per_embed: int = 25
+    max_chars_per_embed: int = 6000
+    max_field_name: int = 256
+    max_field_value: int = 1024
+
+    def __init__(self, bot, channel_id: int, flush_interval: float = 10.0, batch_events: int = 50,
+                 max_queue: int = 1000, max_detail: int = 300, logger: Optional[logging.Logger] = None):
+        self.bot = bot
+        self.channel_id = channel_id
+        self.flush_interval = flush_interval
+        self.batch_events = batch_events
+        self.max_queue = max_queue
+        self.max_detail = min(max_detail, self.max_field_value)
+        self.logger = logger if logger is not None else logging.getLogger("latte.audit")
+
+        self._queue: Deque[AuditEvent] = deque()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+        # Statistics
+        self.received: int = 0
+        self.sent: int = 0
+        self.messages: int = 0
+        self.dropped: int = 0
+        self.failed: int = 0
+        self._dropped_since_flush: int = 0
+
+    def put(self, title: str, detail: str):
+        """
+        Queue audit event. Never blocks : when the queue is full, event is written into local log file instead.
+        """
+        self.received += 1
+        if len(self._queue) >= self.max_queue:
+            self.dropped += 1
+            self._dropped_since_flush += 1
+            self.logger.warning(msg=f"[AuditSink.put] Audit queue is full. Dropped event : {title} | {detail}")
+            return
+        self._queue.append(AuditEvent(title=title, detail=detail, time=datetime.utcnow()))
+        if len(self._queue) >= self.batch_events and self._wakeup is not None:
+            self._wakeup.set()
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = self.bot.loop.create_task(self._run())
+
+    def close(self):
+        """
+        Stop sending events. Events left in the queue are written into local log file.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        self._overflow(list(self._queue), reason="Audit sink closed.")
+        self._queue.clear()
+
+    async def _run(self):
+        self._wakeup = asyncio.Event()
+        await self.bot.wait_until_ready()
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                self.logger.error(msg="[AuditSink._run] Unexpected error while flushing audit events.", exc_info=e)
+
+    async def flush(self):
+        """
+        Send up to `batch_events` queued events into admin log channel.
+        """
+        if len(self._queue) == 0 and self._dropped_since_flush == 0:
+            return
+        events: List[AuditEvent] = [self._queue.popleft() for _ in range(min(self.batch_events, len(self._queue)))]
+        dropped, self._dropped_since_flush = self._dropped_since_flush, 0
+
+        channel: Optional[discord.TextChannel] = self.bot.get_channel(self.channel_id)
+        if channel is None:
+            self._overflow(events, reason=f"Admin log channel {self.channel_id} is not found.")
+            return
+
+        for embed_events, embed in await self.build_embeds(events, dropped):
+            try:
+                await channel.send(embed=embed)
+            except discord.HTTPException as e:
+                self.logger.error(msg=f"[AuditSink.flush] Failed to send audit events : {e}")
+                self._overflow(embed_events, reason="Failed to send audit events.")
+            else:
+                self.sent += len(embed_events)
+                self.messages += 1
+
+    async def build_embeds(self, events: List[AuditEvent], dropped: int = 0) -> List[tuple]:
+        """
+        Pack events into as few embeds as discord embed limits allow.
+        :return: list of (events in the embed, embed).
+        """
+        title: str = "[AdminExt] 명령어 사용 기록"
+        description: str = f"⚠ 대기열이 가득 차 {dropped}개의 기록이 로컬 로그 파일에만 저장되었습니다." if dropped > 0 else ""
+        footer_text: str = f"queued : {len(self._queue)} | dropped : {self.dropped} | failed : {self.failed}"
+
+        chunks: List[List[AuditEvent]] = []
+        current: List[AuditEvent] = []
+        current_chars: int = len(title) + len(description) + len(footer_text)
+        for event in events:
+            chars: int = min(len(event.title) + 9, self.max_field_name) + min(len(event.detail), self.max_detail)
+            if len(current) > 0 and (len(current) >= self.max_fields_per_embed
+                                     or current_chars + chars > self.max_chars_per_embed):
+                chunks.append(current)
+                current, current_chars = [], len(title) + len(footer_text)
+            current.append(event)
+            current_chars += chars
+        if len(current) > 0 or dropped > 0:
+            chunks.append(current)
+
+        built: List[tuple] = []
+        for index, chunk in enumerate(chunks):
+            embed: discord.Embed = await EmbedFactory(
+                title=title,
+                description=description if index == 0 else "",
+                color=EmbedFactory.warning_color if dropped > 0 else EmbedFactory.default_color,
+                fields=[
+                    {
+                        "name": f"{event.time:%H:%M:%S} {event.title}"[:self.max_field_name],
+                        "value": self._shorten(event.detail),
+                        "inline": False
+                    }
+                    for event in chunk
+                ]
+            ).build()
+            embed.set_footer(text=footer_text)
+            built.append((chunk, embed))
+        return built
+
+    def _shorten(self, text: str) -> str:
+        if text == "":
+            return "-"
+        return text if len(text) <= self.max_detail else text[:self.max_detail - 3] + "..."
+
+    def _overflow(self, events: List[AuditEvent], reason: str):
+        if len(events) == 0:
+            return
+        self.failed += len(events)
+        self.logger.warning(msg=f"[AuditSink] {reason} Writing {len(events)} audit events into local log.")
+        for event in events:
+            self.logger.info(msg=f"[AuditSink] {event.time.isoformat()} {event.title} | {event.detail}")
+
+    def get_stats(self) -> Dict[str, int]:
+        return {
+            "queue_depth": len(self._queue),
+            "received": self.received,
+            "sent": self.sent,
+            "messages": self.messages,
+            "dropped": self.dropped,
+            "failed": self.failed
+        }
@@ -1,7 +1,8 @@
-from typing import List
+import json
+from typing import Any, List
 
 from discord.ext import commands
-from core import Latte, BadExtArguments, ConfigNotFound, ConfigNotLoaded, ConfigAlreadyLoaded, ExtensionManager
+from core import Latte, BadExtArguments, ConfigNotFound, ConfigNotLoaded, ConfigAlreadyLoaded, ExtensionManager, thaw
 from utils import EmbedFactory, get_cog_name_in_ext
 
 
@@ -94,11 +95,13 @@ class ConfigCog(commands.Cog):
     async def config_reload(self, ctx: commands.Context):
         description: str = "UNDEFINED"  # Set some default text to prevent empty embed error.
         try:
-            self.bot.config.reload()
+            await self.bot.config.reload_async()
         except ConfigNotLoaded as e:
             description = str(e)
         except ConfigNotFound as e:
             description = str(e)
+        except (ValueError, TypeError) as e:
+            description = f"Config is invalid, so current config is kept : {e}"
         else:
             description = "Config successfully reloaded :D"
 
@@ -109,6 +112,64 @@ class ConfigCog(commands.Cog):
             )
         )
 
+    @commands.is_owner()
+    @config.command(
+        name="set",
+        aliases=["설정"],
+        description="",
+        help="`config set (dotted key) (json value)`"
+    )
+    async def config_set(self, ctx: commands.Context, key_phrase: str, *, value_raw: str):
+        description: str = "UNDEFINED"  # Set some default text to prevent empty embed error.
+        # Value is parsed as json (numbers, booleans, lists ...), and used as plain string if it is not a json.
+        try:
+            value: Any = json.loads(value_raw)
+        except ValueError:
+            value = value_raw
+        try:
+            self.bot.config.set(key_phrase=key_phrase, value=value)
+        except ConfigNotLoaded as e:
+            description = str(e)
+        except (ValueError, TypeError) as e:
+            description = f"Config is invalid, so current config is kept : {e}"
+        else:
+            description = f"Config `{key_phrase}` is set. It will be saved in {self.bot.config.save_delay} seconds."
+
+        await ctx.send(
+            embed=EmbedFactory.LOG_EMBED(
+                title="[ Admin Extension - Config Set Result ]",
+                description=description
+            )
+        )
+
+    @commands.is_owner()
+    @config.command(
+        name="rollback",
+        aliases=["롤백", "되돌리기"],
+        description="",
+        help="`config rollback (generation, default 1)`"
+    )
+    async def config_rollback(self, ctx: commands.Context, generation: int = 1):
+        description: str = "UNDEFINED"  # Set some default text to prevent empty embed error.
+        try:
+            await self.bot.config.rollback(generation=generation)
+        except ConfigNotLoaded as e:
+            description = str(e)
+        except ConfigNotFound:
+            description = f"Backup of generation {generation} does not exist! " \
+                          f"Available generations : {self.bot.config.get_generations()}"
+        except (ValueError, TypeError) as e:
+            description = f"Backup is invalid, so current config is kept : {e}"
+        else:
+            description = f"Config successfully rolled back to generation {generation} :D"
+
+        await ctx.send(
+            embed=EmbedFactory.LOG_EMBED(
+                title="[ Admin Extension - Config Rollback Result ]",
+                description=description
+            )
+        )
+
     @commands.is_owner()
     @config.command(
         name="show",
@@ -117,9 +178,8 @@ class ConfigCog(commands.Cog):
         help="`l;"
     )
     async def config_show(self, ctx: commands.Context):
-        import json
-        # config instance is json type, so it only have primitive values.
-        copied = self.bot.config.config.copy()
+        # config snapshot is frozen : thaw it into plain dictionary to remove secrets and dump it.
+        copied = thaw(self.bot.config.config)
         copied.pop("api")
         copied.pop("token")
         copied.pop("test")
@@ -150,8 +210,8 @@ class ConfigCog(commands.Cog):
         help=""
     )
     async def ext_config_reload(self, ctx: commands.Context):
-        self.bot.config.reload()
-        self.bot.ext = ExtensionManager(extensions_config=self.config["ext"])
+        await self.bot.config.reload_async()
+        self.bot.ext = ExtensionManager(extensions_config=self.bot.config["ext"])
 
 
 def setup(bot: Latte):
@@ -0,0 +1,170 @@
+"""
+extensions/Dev/ErrorAggregator.py
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+Aggregation of command errors which AdminExt reports into admin log channel.
+
+ErrorAggregator : Fingerprint errors using their type and traceback frames, and count occurrences of each fingerprint.
+                  New fingerprint is reported immediately, and repeated ones are reported once per `window` seconds
+                  as single summary with sample contexts. Fingerprints are kept in memory, so owners can query them.
+"""
+import asyncio, hashlib, logging, traceback
+from collections import OrderedDict, deque
+from datetime import datetime
+from typing import Deque, Dict, List, Optional, Tuple
+import discord
+from discord.ext import commands
+from utils import EmbedFactory
+
+
+class ErrorRecord:
+    __slots__ = ("fingerprint", "error_type", "message", "traceback", "location",
+                 "count", "window_count", "first_seen", "last_seen", "samples")
+
+    def __init__(self, fingerprint: str, error: BaseException, location: str, max_samples: int):
+        self.fingerprint = fingerprint
+        self.error_type: str = type(error).__qualname__
+        self.message: str = str(error)
+        self.traceback: str = ''.join(traceback.format_exception(type(error), error, error.__traceback__))
+        self.location = location
+        self.count: int = 0
+        self.window_count: int = 0
+        self.first_seen: datetime = datetime.utcnow()
+        self.last_seen: datetime = self.first_seen
+        self.samples: Deque[str] = deque(maxlen=max_samples)
+
+
+class ErrorAggregator:
+    def __init__(self, bot, channel_id: int, window: float = 300.0, max_fingerprints: int = 500,
+                 max_samples: int = 3, logger: Optional[logging.Logger] = None):
+        self.bot = bot
+        self.channel_id = channel_id
+        self.window = window
+        self.max_fingerprints = max_fingerprints
+        self.max_samples = max_samples
+        self.logger = logger if logger is not None else logging.getLogger("latte.errors")
+
+        # Fingerprint -> record, ordered by last occurrence.
+        self.records: "OrderedDict[str, ErrorRecord]" = OrderedDict()
+        self._task: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def unwrap(error: BaseException) -> BaseException:
+        """
+        Return the original exception raised inside command.
+        """
+        if isinstance(error, commands.CommandInvokeError) and error.original is not None:
+            return error.original
+        return error
+
+    @staticmethod
+    def fingerprint(error: BaseException) -> Tuple[str, str]:
+        """
+        Fingerprint error using its type and the frames of its traceback. Messages are excluded,
+        since they usually contain ids or user inputs.
+        :return: (fingerprint, location of the innermost frame)
+        """
+        frames: traceback.StackSummary = traceback.extract_tb(error.__traceback__)
+        key: str = f"{type(error).__module__}.{type(error).__qualname__}|" \
+                   + '|'.join(f"{frame.filename}:{frame.name}:{frame.lineno}" for frame in frames)
+        location: str = f"{frames[-1].filename}:{frames[-1].lineno} ({frames[-1].name})" if len(frames) > 0 else "-"
+        return hashlib.sha1(key.encode("utf-8")).hexdigest()[:10], location
+
+    def record(self, error: BaseException, context: str) -> Tuple[ErrorRecord, bool]:
+        """
+        Count error.
+        :return: record of the error`s fingerprint, and whether the fingerprint is new.
+        """
+        error = self.unwrap(error)
+        fingerprint, location = self.fingerprint(error)
+        record: Optional[ErrorRecord] = self.records.get(fingerprint)
+        is_new: bool = record is None
+        if is_new:
+            record = ErrorRecord(fingerprint=fingerprint, error=error, location=location, max_samples=self.max_samples)
+            self.records[fingerprint] = record
+            while len(self.records) > self.max_fingerprints:
+                self.records.popitem(last=False)
+        else:
+            self.records.move_to_end(fingerprint)
+            record.message = str(error)
+            record.last_seen = datetime.utcnow()
+            record.window_count += 1
+        record.count += 1
+        record.samples.append(context)
+        return record, is_new
+
+    def get(self, fingerprint: str) -> Optional[ErrorRecord]:
+        return self.records.get(fingerprint)
+
+    def top(self, limit: int = 10) -> List[ErrorRecord]:
+        return sorted(self.records.values(), key=lambda record: record.count, reverse=True)[:limit]
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = self.bot.loop.create_task(self._run())
+
+    def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self):
+        await self.bot.wait_until_ready()
+        while True:
+            await asyncio.sleep(self.window)
+            try:
+                await self.report_window()
+            except Exception as e:
+                self.logger.error(msg="[ErrorAggregator._run] Failed to report error summaries.", exc_info=e)
+
+    async def report_new(self, record: ErrorRecord):
+        """
+        Report new fingerprint with its full traceback, mentioning bot owner.
+        """
+        owner: Optional[discord.User] = self.bot.get_user(self.bot.owner_id) if self.bot.owner_id is not None else None
+        await self._send(
+            content=owner.mention if owner is not None else None,
+            embed=await EmbedFactory(
+                title=f"[AdminExt.on_command_error] 새로운 오류 `{record.fingerprint}`",
+                description=f"```css\n{self._shorten(record.traceback, 1800)}\n```",
+                color=EmbedFactory.error_color,
+                fields=[
+                    {"name": "오류", "value": self._shorten(f"{record.error_type} : {record.message}", 1024)},
+                    {"name": "위치", "value": self._shorten(record.location, 1024)},
+                    {"name": "발생 상황", "value": self._shorten(record.samples[-1], 1024)}
+                ]
+            ).build()
+        )
+
+    async def report_window(self):
+        """
+        Report fingerprints which occurred again during last window, as one summary for each fingerprint.
+        """
+        for record in [record for record in self.records.values() if record.window_count > 0]:
+            window_count, record.window_count = record.window_count, 0
+            await self._send(
+                embed=await EmbedFactory(
+                    title=f"[AdminExt.on_command_error] 반복된 오류 `{record.fingerprint}`",
+                    description=f"최근 {int(self.window)}초 동안 {window_count}회 발생했습니다. (누적 {record.count}회)",
+                    color=EmbedFactory.warning_color,
+                    fields=[
+                        {"name": "오류", "value": self._shorten(f"{record.error_type} : {record.message}", 1024)},
+                        {"name": "위치", "value": self._shorten(record.location, 1024)},
+                        {"name": "발생 상황 (최근)", "value": self._shorten('\n\n'.join(record.samples), 1024)}
+                    ]
+                ).build()
+            )
+
+    async def _send(self, embed: discord.Embed, content: Optional[str] = None):
+        channel: Optional[discord.TextChannel] = self.bot.get_channel(self.channel_id)
+        if channel is None:
+            return
+        try:
+            await channel.send(content=content, embed=embed)
+        except discord.HTTPException as e:
+            self.logger.error(msg=f"[ErrorAggregator._send] Failed to send error report : {e}")
+
+    @staticmethod
+    def _shorten(text: str, limit: int) -> str:
+        if text == "":
+            return "-"
+        return text if len(text) <= limit else "..." + text[-(limit - 3):]
@@ -1,13 +1,36 @@
+import discord
 from discord.ext import commands
-from core import Latte, parse_doc
+from core import Latte, DocumentStore, MarkdownDocument, MarkdownEmbedRenderer
+from typing import List, Optional
 from utils import get_cog_name_in_ext, EmbedFactory
 
 
 class HelpCog(commands.Cog):
     def __init__(self, bot: Latte):
         self.bot = bot
-        self.doc_package = parse_doc(root=self.bot.config["documents_root"])
-        print(f"[HelpExt] parsed documents data :\n{self.doc_package}")
+        self.renderer = MarkdownEmbedRenderer()
+        self.docs = DocumentStore(
+            root=self.bot.config.get("documents_root"),
+            renderer=self.render_document,
+            logger=self.bot.get_logger(name="latte.docs")
+        )
+        self.docs.build()
+        self.docs.start_watching(interval=self.bot.config.get("documents_refresh_interval", 30.0), loop=self.bot.loop)
+
+    def cog_unload(self):
+        self.docs.stop_watching()
+
+    async def render_document(self, document: MarkdownDocument) -> List[discord.Embed]:
+        return await self.renderer.render(
+            lines=document.get_content().splitlines(), title=f"docs/{document.document['path']}"
+        )
+
+    async def send_document(self, ctx: commands.Context, path: str):
+        pages: Optional[List[discord.Embed]] = await self.docs.render(path)
+        if pages is None:
+            pages = [EmbedFactory.WARN_EMBED(title="문서를 찾을 수 없습니다!", description=f"`docs/{path}` 문서가 존재하지 않습니다.")]
+        for embed in pages:
+            await ctx.send(embed=embed)
 
     @commands.command(
         name="help",
@@ -30,14 +53,7 @@ class HelpCog(commands.Cog):
         help=""
     )
     async def sample(self, ctx: commands.Context):
-        await ctx.send(
-            embed=EmbedFactory.LOG_EMBED(
-                title="Opened `docs/sample.md`",
-                description="```md\n"
-                            f"{self.doc_package.get_doc('sample.md').get_content()}\n"
-                            "```"
-            )
-        )
+        await self.send_document(ctx=ctx, path="sample.md")
 
     @commands.command(
         name="intro",
@@ -46,16 +62,9 @@ class HelpCog(commands.Cog):
         help=""
     )
     async def test_intro(self, ctx: commands.Context):
-        await ctx.send(
-            embed=EmbedFactory.LOG_EMBED(
-                title="Opened `docs/ko-kr/intro.md`",
-                description="```md\n"
-                            f"{self.doc_package.get_doc('ko-kr/intro.md').get_content()}\n"
-                            "```"
-            )
-        )
+        await self.send_document(ctx=ctx, path="ko-kr/intro.md")
+
 
-    
 def setup(bot: Latte):
     cog = HelpCog(bot)
     bot.get_logger().info(
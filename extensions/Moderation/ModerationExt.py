@@ -1,15 +1,31 @@
-from typing import List
+from datetime import datetime, timedelta
+from typing import List, Optional
 
 from discord.ext import commands
 import discord
-from core import Latte
+from core import Latte, WarnRecord, MuteRecord
 from utils import get_cog_name_in_ext, EmbedFactory
 
 
 class ModerationCog(commands.Cog):
+    mute_role_name: str = "Muted"
+
     def __init__(self, bot: Latte):
         self.bot = bot
 
+    @commands.Cog.listener()
+    async def on_mute_expire(self, guild_id: int, user_id: int):
+        """
+        Event listener for mute_expire event, which is dispatched by `Latte.mute_scheduler` when a mute ends.
+        """
+        guild: Optional[discord.Guild] = self.bot.get_guild(guild_id)
+        if guild is None:
+            return
+        member: Optional[discord.Member] = guild.get_member(user_id)
+        mute_role: Optional[discord.Role] = discord.utils.get(guild.roles, name=self.mute_role_name)
+        if member is not None and mute_role is not None and mute_role in member.roles:
+            await member.remove_roles(mute_role, reason="Mute expired.")
+
     @commands.has_guild_permissions(administrator=True)
     @commands.group(
         name="moderation",
@@ -113,6 +129,141 @@ class ModerationCog(commands.Cog):
             ).build()
         )
 
+    @moderation.command(
+        name="warn",
+        aliases=["경고"],
+        description="Give a warning to a member.",
+        help="`l; moderation warn @member (reason)` to use."
+    )
+    async def warn(self, ctx: commands.Context, target_member: discord.Member, *, reason: str = ""):
+        self.bot.record_buffer.put(
+            WarnRecord(
+                guild_id=ctx.guild.id,
+                guild_name=ctx.guild.name,
+                user_id=target_member.id,
+                user_name=EmbedFactory.get_user_info(target_member, contain_id=False),
+                when=datetime.utcnow(),
+                reason=reason
+            )
+        )
+        return await ctx.send(
+            embed=await EmbedFactory(
+                title="[ 관리 ] 멤버에게 경고를 부여했습니다!",
+                footer=EmbedFactory.get_command_caller(ctx.author),
+                color=EmbedFactory.default_color,
+                fields=[
+                    {
+                        "name": "경고를 받은 멤버",
+                        "value": EmbedFactory.get_user_info(target_member),
+                        "inline": False
+                    },
+                    {
+                        "name": "경고 사유",
+                        "value": reason if reason != "" else "사유 없음",
+                        "inline": False
+                    }
+                ]
+            ).build()
+        )
+
+    @moderation.command(
+        name="mute",
+        aliases=["뮤트"],
+        description="Mute a member for given minutes. `Muted` role is required in the server.",
+        help="`l; moderation mute @member (minutes) (reason)` to use."
+    )
+    async def mute(self, ctx: commands.Context, target_member: discord.Member, minutes: int, *, reason: str = ""):
+        mute_role: Optional[discord.Role] = discord.utils.get(ctx.guild.roles, name=self.mute_role_name)
+        if mute_role is None:
+            return await ctx.send(f"서버에 `{self.mute_role_name}` 역할이 필요합니다!")
+        if minutes < 1:
+            return await ctx.send(f"{minutes} 분은 너무 짧습니다!")
+
+        start: datetime = datetime.utcnow()
+        end: datetime = start + timedelta(minutes=minutes)
+        await target_member.add_roles(mute_role, reason=reason)
+        self.bot.record_buffer.put(
+            MuteRecord(
+                guild_id=ctx.guild.id,
+                guild_name=ctx.guild.name,
+                user_id=target_member.id,
+                user_name=EmbedFactory.get_user_info(target_member, contain_id=False),
+                start=start,
+                end=end,
+                reason=reason
+            )
+        )
+        self.bot.mute_scheduler.schedule(guild_id=ctx.guild.id, user_id=target_member.id, end=end)
+        return await ctx.send(
+            embed=await EmbedFactory(
+                title="[ 관리 ] 멤버를 뮤트했습니다!",
+                footer=EmbedFactory.get_command_caller(ctx.author),
+                color=EmbedFactory.default_color,
+                fields=[
+                    {
+                        "name": "뮤트한 멤버",
+                        "value": EmbedFactory.get_user_info(target_member),
+                        "inline": False
+                    },
+                    {
+                        "name": "뮤트 기간",
+                        "value": f"{minutes}분 ({end} UTC 까지)",
+                        "inline": False
+                    },
+                    {
+                        "name": "뮤트 사유",
+                        "value": reason if reason != "" else "사유 없음",
+                        "inline": False
+                    }
+                ]
+            ).build()
+        )
+
+    @moderation.command(
+        name="warns",
+        aliases=["경고목록"],
+        description="Show warn history of a member. Use the last warn id shown to see older warns.",
+        help="`l; moderation warns @member (before_id)` to use."
+    )
+    async def warns(self, ctx: commands.Context, target_member: discord.Member, before_id: int = None):
+        records: List[WarnRecord] = await self.bot.db.get_warns(
+            guild_id=ctx.guild.id, user_id=target_member.id, before_id=before_id, limit=10
+        )
+        total: int = await self.bot.db.count_warns(guild_id=ctx.guild.id, user_id=target_member.id)
+        return await ctx.send(
+            embed=await EmbedFactory(
+                title=f"[ 관리 ] {EmbedFactory.get_user_info(target_member, contain_id=False)} 님의 경고 기록입니다.",
+                description=f"총 {total}회의 경고를 받았습니다.",
+                footer=EmbedFactory.get_command_caller(ctx.author),
+                color=EmbedFactory.default_color,
+                fields=[
+                    {
+                        "name": f"#{record.id} ({record.when})",
+                        "value": record.reason if record.reason else "사유 없음",
+                        "inline": False
+                    } for record in records
+                ]
+            ).build()
+        )
+
+    @moderation.command(
+        name="prefix",
+        aliases=["접두사"],
+        description="Change command prefix of the server. Reset into default prefix if new prefix is not given.",
+        help="`l; moderation prefix (prefix)` to use."
+    )
+    async def prefix(self, ctx: commands.Context, prefix: str = None):
+        if prefix is not None and len(prefix) > 32:
+            return await ctx.send("접두사는 32자 이하로 설정해주세요!")
+        await self.bot.set_guild_prefix(guild=ctx.guild, prefix=prefix)
+        return await ctx.send(
+            embed=EmbedFactory.COMMAND_LOG_EMBED(
+                title="[ 관리 ] 서버의 명령어 접두사를 변경했습니다!",
+                description=f"새 접두사 : `{prefix if prefix is not None else self.bot.get_default_prefix()}`",
+                user=ctx.author
+            )
+        )
+
     @moderation.command(
         name="clearchat",
         aliases=["chatclear", "채팅청소", "메세지청소"],
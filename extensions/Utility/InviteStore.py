@@ -0,0 +1,198 @@
+"""
+extensions/Utility/InviteStore.py
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+Compact storage of invite usages tracked by InvitesExt.
+
+GuildInvites : invite codes (interned) and their use counts (array-backed) of single guild.
+InviteStore : GuildInvites of every guilds keyed by integer guild id, which can be snapshotted into sqlite file,
+              so tracking data survives restarts.
+"""
+import os, sqlite3, sys
+from array import array
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+
+class GuildInvites:
+    __slots__ = ("codes", "index", "uses")
+
+    def __init__(self, invites: Iterable[Tuple[str, int]] = ()):
+        self.codes: List[str] = []
+        self.index: Dict[str, int] = {}
+        self.uses: array = array('L')
+        for code, uses in invites:
+            self.set(code, uses)
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def __contains__(self, code: str) -> bool:
+        return code in self.index
+
+    def get(self, code: str, default: int = 0) -> int:
+        slot: Optional[int] = self.index.get(code)
+        return self.uses[slot] if slot is not None else default
+
+    def set(self, code: str, uses: int):
+        slot: Optional[int] = self.index.get(code)
+        if slot is None:
+            code = sys.intern(code)
+            self.index[code] = len(self.codes)
+            self.codes.append(code)
+            self.uses.append(uses)
+        else:
+            self.uses[slot] = uses
+
+    def remove(self, code: str):
+        slot: Optional[int] = self.index.pop(code, None)
+        if slot is None:
+            return
+        # Move the last invite into removed slot to keep arrays compact.
+        last_code: str = self.codes.pop()
+        last_uses: int = self.uses.pop()
+        if slot < len(self.codes):
+            self.codes[slot] = last_code
+            self.uses[slot] = last_uses
+            self.index[last_code] = slot
+
+    def items(self) -> Iterator[Tuple[str, int]]:
+        return zip(self.codes, self.uses)
+
+
+class InviteStore:
+    def __init__(self, snapshot_path: str):
+        self.snapshot_path = snapshot_path
+        self.guilds: Dict[int, GuildInvites] = {}
+        self._dirty: Set[int] = set()       # Guilds changed after last snapshot.
+        self._removed: Set[int] = set()     # Guilds removed after last snapshot.
+        # Guilds loaded from snapshot and not fetched since. Invites could be used while latte was offline,
+        # so their counts can`t be used to attribute joins until they are fetched again.
+        self._unverified: Set[int] = set()
+
+    def __contains__(self, guild_id: int) -> bool:
+        return guild_id in self.guilds
+
+    def __len__(self) -> int:
+        return len(self.guilds)
+
+    def get_guild(self, guild_id: int) -> Optional[GuildInvites]:
+        return self.guilds.get(guild_id)
+
+    def set_guild(self, guild_id: int, invites: Iterable[Tuple[str, int]]):
+        """
+        Replace tracking data of the guild with freshly fetched invites. Guild becomes verified.
+        """
+        self.guilds[guild_id] = GuildInvites(invites)
+        self._unverified.discard(guild_id)
+        self._mark(guild_id)
+
+    def is_verified(self, guild_id: int) -> bool:
+        return guild_id in self.guilds and guild_id not in self._unverified
+
+    def get_unverified(self) -> Set[int]:
+        return set(self._unverified)
+
+    def remove_guild(self, guild_id: int):
+        self._unverified.discard(guild_id)
+        if self.guilds.pop(guild_id, None) is not None:
+            self._dirty.discard(guild_id)
+            self._removed.add(guild_id)
+
+    def set(self, guild_id: int, code: str, uses: int):
+        if guild_id not in self.guilds:
+            self.guilds[guild_id] = GuildInvites()
+        self.guilds[guild_id].set(code, uses)
+        self._mark(guild_id)
+
+    def remove(self, guild_id: int, code: str):
+        guild_invites: Optional[GuildInvites] = self.guilds.get(guild_id)
+        if guild_invites is not None and code in guild_invites:
+            guild_invites.remove(code)
+            self._mark(guild_id)
+
+    def _mark(self, guild_id: int):
+        self._dirty.add(guild_id)
+        self._removed.discard(guild_id)
+
+    def is_dirty(self) -> bool:
+        return len(self._dirty) > 0 or len(self._removed) > 0
+
+    """
+    Snapshot
+    `write_snapshot` and `read_snapshot` do blocking file io, so call them in executor while event loop is running.
+    Changes are taken in event loop thread using `take_changes`, so the executor never reads mutating arrays.
+    """
+
+    def _connect(self) -> sqlite3.Connection:
+        snapshot_dir: str = os.path.dirname(self.snapshot_path)
+        if snapshot_dir != '':
+            os.makedirs(snapshot_dir, exist_ok=True)
+        connection = sqlite3.connect(self.snapshot_path)
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS invites ("
+            "guild_id INTEGER NOT NULL, code TEXT NOT NULL, uses INTEGER NOT NULL, "
+            "PRIMARY KEY (guild_id, code)) WITHOUT ROWID"
+        )
+        return connection
+
+    def take_changes(self) -> Tuple[Set[int], List[Tuple[int, str, int]]]:
+        """
+        Take guilds changed after last snapshot.
+        :return: ids of changed guilds, and rows of changed guilds to write.
+        """
+        changed: Set[int] = self._dirty | self._removed
+        rows: List[Tuple[int, str, int]] = [
+            (guild_id, code, uses)
+            for guild_id in self._dirty
+            for code, uses in self.guilds[guild_id].items()
+        ]
+        self._dirty, self._removed = set(), set()
+        return changed, rows
+
+    def restore_changes(self, changed: Set[int]):
+        """
+        Mark guilds as changed again when writing snapshot failed.
+        """
+        for guild_id in changed:
+            if guild_id in self.guilds:
+                self._dirty.add(guild_id)
+            else:
+                self._removed.add(guild_id)
+
+    def write_snapshot(self, changed: Set[int], rows: List[Tuple[int, str, int]]):
+        """
+        Replace rows of changed guilds in snapshot file in single transaction.
+        """
+        connection = self._connect()
+        try:
+            with connection:
+                connection.executemany("DELETE FROM invites WHERE guild_id = ?", [(guild_id,) for guild_id in changed])
+                connection.executemany("INSERT INTO invites (guild_id, code, uses) VALUES (?, ?, ?)", rows)
+        finally:
+            connection.close()
+
+    def read_snapshot(self) -> Dict[int, GuildInvites]:
+        """
+        Read guilds stored in snapshot file. Use `merge` in event loop thread to apply them.
+        """
+        if not os.path.isfile(self.snapshot_path):
+            return {}
+        loaded: Dict[int, GuildInvites] = {}
+        connection = self._connect()
+        try:
+            for guild_id, code, uses in connection.execute("SELECT guild_id, code, uses FROM invites ORDER BY guild_id"):
+                if guild_id not in loaded:
+                    loaded[guild_id] = GuildInvites()
+                loaded[guild_id].set(code, uses)
+        finally:
+            connection.close()
+        return loaded
+
+    def merge(self, loaded: Dict[int, GuildInvites]):
+        """
+        Apply guilds read from snapshot file. Guilds already tracked are not overwritten.
+        Applied guilds are unverified until they are fetched again.
+        """
+        for guild_id, guild_invites in loaded.items():
+            if guild_id not in self.guilds:
+                self.guilds[guild_id] = guild_invites
+                self._unverified.add(guild_id)
@@ -1,33 +1,82 @@
-from typing import Type, Dict, List, Tuple
-import discord, json, asyncio
-from discord.ext import commands
+from typing import Type, Dict, List, Tuple, Optional, Set
+import discord, asyncio
+from discord.ext import commands, tasks
 from core import Latte
 from utils import EmbedFactory, get_cog_name_in_ext
+from .InviteStore import InviteStore, GuildInvites
+
+ATTRIBUTION = Tuple[Optional[str], int]    # (invite code, uses)
 
 
 class InviteCog(commands.Cog):
+    # Maximum number of guilds fetching invites at once during whole-fleet refresh.
+    max_concurrent_fetch: int = 5
+
+    # Seconds to wait for other joins in the guild before fetching invites, to attribute burst joins together.
+    join_coalesce_delay: float = 1.0
+
     def __init__(self, bot: Latte):
         self.bot = bot
-        self.invite_tracks: Dict[str, Dict[str, int]] = {}
+        self.pending_joins: Dict[int, List[Tuple[discord.Member, asyncio.Future]]] = {}
+        self.attribution_tasks: Dict[int, asyncio.Task] = {}
+        self.invite_store = InviteStore(
+            snapshot_path=bot.config.get("invites_snapshot", "./data/invites.db")
+        )
+        self.fetch_semaphore = asyncio.Semaphore(self.max_concurrent_fetch)
+        self.reconcile.start()
+        self.snapshot.start()
 
     def cog_unload(self):
         # TODO
         # Announce to servers using invites-detecting feature about Cog unloading to prepare their announcements.
-        pass
+        self.reconcile.cancel()
+        self.snapshot.cancel()
+        for task in self.attribution_tasks.values():
+            task.cancel()
+        if self.invite_store.is_dirty():
+            self.invite_store.write_snapshot(*self.invite_store.take_changes())
 
-    @commands.Cog.listener()
-    async def on_ready(self):
+    @tasks.loop(hours=6)
+    async def reconcile(self):
         """
-        Called when the client is done preparing the data received from Discord. Usually after login is successful and the Client.guilds and co. are filled up.
-        :return:
+        Refresh tracking invites data of every guilds. Runs rarely in background to fix data which is out of sync.
+        (ex: invite events missed during reconnecting)
+        On the first run, tracking data is warm-started from snapshot, and then every guild missing in snapshot
+        or loaded from snapshot is fetched. Snapshotted counts are never used to attribute joins until then,
+        since invites could be used while latte was offline.
+        """
+        if self.reconcile.current_loop == 0:
+            loaded = await self.bot.loop.run_in_executor(None, self.invite_store.read_snapshot)
+            self.invite_store.merge(loaded)
+            self.bot.get_logger().info(
+                msg=f"[InvitesExt.reconcile] Loaded tracking invites data of {len(loaded)} guilds from snapshot."
+            )
+            await self.update(only_unverified=True)
+        else:
+            await self.update()
+
+    @reconcile.before_loop
+    async def before_reconcile(self):
+        await self.bot.wait_until_ready()
+
+    @tasks.loop(minutes=1)
+    async def snapshot(self):
+        """
+        Write guilds changed after last snapshot into snapshot file.
         """
-        await self.update()
-        print("[InvitesExt.update] Updated result (Checking assigned value in class instance.) :\n", json.dumps(self.invite_tracks, ensure_ascii=False, indent=4))
+        if not self.invite_store.is_dirty():
+            return
+        changed, rows = self.invite_store.take_changes()
+        try:
+            await self.bot.loop.run_in_executor(None, self.invite_store.write_snapshot, changed, rows)
+        except Exception as e:
+            self.invite_store.restore_changes(changed)
+            self.bot.get_logger().error(msg="[InvitesExt.snapshot] Failed to write invites snapshot!", exc_info=e)
 
     @commands.Cog.listener()
     async def on_guild_join(self, guild: discord.Guild):
         """
-        Event listener for invite_create event, which is dispatched when a new invite instance is created.
+        Event listener for guild_join event, which is dispatched when latte joins a new guild.
 
         :param guild:
         :return:
@@ -35,7 +84,7 @@ class InviteCog(commands.Cog):
         self.bot.get_logger().info(
             msg=f"[InvitesExt.on_guild_join] Latte joined new discord guild : {guild.name}#{guild.id}, updating tracking invites data."
         )
-        await self.update()
+        await self.update_guild(guild)
         self.bot.get_logger().info(
             msg=f"[InvitesExt.on_guild_join] Start tracking invites data of the guild : {guild.name}#{guild.id}"
         )
@@ -43,7 +92,7 @@ class InviteCog(commands.Cog):
     @commands.Cog.listener()
     async def on_guild_remove(self, guild: discord.Guild):
         """
-        Event listener for invite_create event, which is dispatched when a new invite instance is created.
+        Event listener for guild_remove event, which is dispatched when latte leaves the guild.
 
         :param guild:
         :return:
@@ -51,7 +100,7 @@ class InviteCog(commands.Cog):
         self.bot.get_logger().info(
             msg=f"[InvitesExt.on_guild_remove] Latte left the discord guild : {guild.name}#{guild.id}, removing information of the guild..."
         )
-        self.invite_tracks.pop(str(guild.id))
+        self.invite_store.remove_guild(guild.id)
         self.bot.get_logger().info(
             msg=f"[InvitesExt.on_guild_remove] Removed all tracking invites data of the guild : {guild.name}#{guild.id}"
         )
@@ -65,7 +114,7 @@ class InviteCog(commands.Cog):
         self.bot.get_logger().info(
             msg=f"[InvitesExt.on_invite_create] New invite with code {invite.code} created in guild : {invite.guild.name}#{invite.guild.id}"
         )
-        self.invite_tracks[str(invite.guild.id)].update({invite.code: invite.uses})
+        self.invite_store.set(invite.guild.id, invite.code, invite.uses if invite.uses is not None else 0)
 
     @commands.Cog.listener()
     async def on_invite_delete(self, invite: discord.Invite):
@@ -76,7 +125,7 @@ class InviteCog(commands.Cog):
         self.bot.get_logger().info(
             msg=f"[InvitesExt.on_invite_delete] An invite  with code {invite.code} deleted in guild : {invite.guild.name}#{invite.guild.id}"
         )
-        self.invite_tracks[str(invite.guild.id)].pop(invite.code)
+        self.invite_store.remove(invite.guild.id, invite.code)
 
     @commands.Cog.listener()
     async def on_member_join(self, member: discord.Member):
@@ -84,21 +133,27 @@ class InviteCog(commands.Cog):
         Event listener for member_join event, which is dispatched when new member joins the server.
         :param member:  a member who joined in the server.
         """
+        if not member.guild.me.guild_permissions.manage_guild:
+            return
 
-        used_invite_code, used_count = await self.compare_invites(member.guild)
+        used_invite_code, used_count = await self.attribute_join(member)
         msg = f"{member.display_name} 님은 {used_invite_code} 초대코드를 사용해 서버에 참여했습니다."
         log_embed: discord.Embed = EmbedFactory.LOG_EMBED(
             title="새로운 멤버 참가!",
             description=f"{member.display_name} 님은 {used_invite_code} 초대코드를 사용해 서버에 참여했습니다."
         )
         log_embed.add_field(name=f"초대코드 `{used_invite_code}`의 현재 사용 횟수", value=f"{used_count}회")
-        await member.guild.system_channel.send(embed=log_embed)
+        if member.guild.system_channel is not None:
+            await member.guild.system_channel.send(embed=log_embed)
         self.bot.get_logger().info(
             msg=msg
         )
-        await self.update()
 
-    async def update(self):
+    async def update(self, only_unverified: bool = False):
+        """
+        Refresh tracking invites data of every guilds. Guilds are fetched concurrently, bounded by `fetch_semaphore`.
+        :param only_unverified: refresh only guilds which are not tracked yet, or loaded from snapshot.
+        """
         self.bot.get_logger().info(
             msg="[InvitesExt.update] Updating tracking invites data..."
         )
@@ -106,64 +161,164 @@ class InviteCog(commands.Cog):
             self.bot.get_logger().info(
                 msg="[InvitesExt.update] Bot`s internal cache is ready. Try to update tracking invites data ..."
             )
-            invite_tracks: Dict[str, Dict[str, int]] = {}
-            for guild in self.bot.guilds:
-                invite_tracks[str(guild.id)] = {}
-                guild_invites = []
-                if guild.me.guild_permissions.manage_guild:
-                    try:
-                        guild_invites: List[discord.Invite] = await guild.invites()
-                        for invite in guild_invites:
-                            invite_tracks[str(guild.id)].update({invite.code: invite.uses})
-                    except discord.HTTPException as e:
-                        await self.bot.get_channel(self.bot.config["admin_log"]).send(
-                            embed=await EmbedFactory(
-                                title="[InvitesExt.update] 서버의 초대 정보를 가져오는 도중 HTTP 오류가 발생했습니다!",
-                                color=EmbedFactory.error_color,
-                                author={
-                                    "name": EmbedFactory.get_user_info(self.bot.user, contain_id=False),
-                                    "icon_url": self.bot.user.avatar_url
-                                },
-                                footer={
-                                    "text": f"서버 주인 : {EmbedFactory.get_user_info(guild.owner if guild.owner is not None else self.bot.user, contain_id=True)}",
-                                    "icon_url": guild.owner.avatar_url if guild.owner is not None else self.bot.user.avatar_url
-                                },
-                                fields=[
-                                    {
-                                        "name": "오류가 발생한 서버 정보",
-                                        "value": f"이름 : {guild.name}\nid : {guild.id}\n "
-                                    }
-                                ]
-                            ).build()
-                        )
-
-            import json
-            print("[InvitesExt.update] Updated result (on update method, not assigned to class instance.) :\n", json.dumps(obj=invite_tracks, indent=4, ensure_ascii=False))
-            self.invite_tracks = invite_tracks
+            guilds: List[discord.Guild] = [
+                guild for guild in self.bot.guilds if not only_unverified or not self.invite_store.is_verified(guild.id)
+            ]
+            await asyncio.gather(*[self.update_guild(guild) for guild in guilds])
+            self.bot.get_logger().info(
+                msg=f"[InvitesExt.update] Updated tracking invites data of {len(guilds)} guilds."
+            )
         else:
             self.bot.get_logger().error(
                 msg="[InvitesExt.update] Bot`s internal cache is not ready! Cannot load invites..."
             )
-            if type(self.invite_tracks) == dict and self.invite_tracks != {}:
+            if len(self.invite_store) > 0:
                 self.bot.get_logger().info(
-                    msg="[InvitesExt.update] Keep previously updated invite_tracks for safety."
+                    msg="[InvitesExt.update] Keep previously updated invite_store for safety."
                 )
-            elif type(self.invite_tracks) != dict:
+
+    async def update_guild(self, guild: discord.Guild):
+        """
+        Refresh tracking invites data of the guild.
+        :param guild: guild to refresh.
+        """
+        if not guild.me.guild_permissions.manage_guild:
+            self.invite_store.remove_guild(guild.id)
+            return
+        guild_invites: Optional[List[discord.Invite]] = await self.fetch_invites(guild)
+        if guild_invites is not None:
+            self.invite_store.set_guild(guild.id, [(invite.code, invite.uses) for invite in guild_invites])
+
+    async def fetch_invites(self, guild: discord.Guild) -> Optional[List[discord.Invite]]:
+        """
+        Fetch invites of the guild. Report to admin log channel if failed.
+        :return: list of invites in the guild, or None if failed to fetch.
+        """
+        try:
+            async with self.fetch_semaphore:
+                return await guild.invites()
+        except discord.HTTPException as e:
+            admin_log: Optional[discord.TextChannel] = self.bot.get_channel(self.bot.config.get("admin_log"))
+            if admin_log is None:
                 self.bot.get_logger().error(
-                    msg="[InvitesExt.update] Find invalid data is assigned in invite_tracks. "
-                        "Assigning blank dictionary data ( {} )"
+                    msg=f"[InvitesExt.fetch_invites] Failed to fetch invites of guild {guild.id}.", exc_info=e
                 )
-                self.invite_tracks = {}
+                return None
+            await admin_log.send(
+                embed=await EmbedFactory(
+                    title="[InvitesExt.update] 서버의 초대 정보를 가져오는 도중 HTTP 오류가 발생했습니다!",
+                    color=EmbedFactory.error_color,
+                    author={
+                        "name": EmbedFactory.get_user_info(self.bot.user, contain_id=False),
+                        "icon_url": self.bot.user.avatar_url
+                    },
+                    footer={
+                        "text": f"서버 주인 : {EmbedFactory.get_user_info(guild.owner if guild.owner is not None else self.bot.user, contain_id=True)}",
+                        "icon_url": guild.owner.avatar_url if guild.owner is not None else self.bot.user.avatar_url
+                    },
+                    fields=[
+                        {
+                            "name": "오류가 발생한 서버 정보",
+                            "value": f"이름 : {guild.name}\nid : {guild.id}\n "
+                        }
+                    ]
+                ).build()
+            )
+            return None
 
-    async def compare_invites(self, guild: discord.Guild) -> Tuple[str, int]:
+    async def compare_invites(self, guild: discord.Guild) -> Optional[List[ATTRIBUTION]]:
         """
-        Return changed invite instance`s code.
+        Fetch invites of the guild, diff them against tracking invites data in one pass,
+        and update tracking invites data of the guild.
+        Guilds which are not tracked or not verified since snapshot are only reseeded, and nothing is attributed.
         :param guild:
-        :return:
+        :return: list of (code, current uses) for every increment of invite uses, or None if nothing can be attributed.
+        """
+        guild_invites: Optional[List[discord.Invite]] = await self.fetch_invites(guild)
+        if guild_invites is None:
+            return None
+
+        current: List[Tuple[str, int]] = [(invite.code, invite.uses) for invite in guild_invites]
+        tracked: Optional[GuildInvites] = self.invite_store.get_guild(guild.id)
+        verified: bool = self.invite_store.is_verified(guild.id)
+        self.invite_store.set_guild(guild.id, current)
+        if tracked is None or not verified:
+            # Every past use would be counted as new : reseed only.
+            return None
+        return self.diff_invites(tracked, current)
+
+    @staticmethod
+    def diff_invites(tracked: GuildInvites, current: List[Tuple[str, int]]) -> List[ATTRIBUTION]:
+        """
+        Diff current invites against tracked invites.
+        Invite used N times since last snapshot appears N times in the result, with its current use count.
+        Invites disappeared since last snapshot (ex: reached max uses) are appended once after them,
+        because they might have been used by the last joined members.
+        """
+        attributions: List[ATTRIBUTION] = []
+        current_codes: Set[str] = set()
+        for code, uses in current:
+            current_codes.add(code)
+            increments: int = uses - tracked.get(code, 0)
+            if increments > 0:
+                attributions.extend([(code, uses)] * increments)
+        for code, uses in tracked.items():
+            if code not in current_codes:
+                attributions.append((code, uses + 1))
+        return attributions
+
+    async def attribute_join(self, member: discord.Member) -> ATTRIBUTION:
+        """
+        Find the invite used by the member. Concurrent joins in one guild are coalesced,
+        so they share single invite fetch and are attributed together.
+        :return: (code, uses) of the invite used by the member. (None, 0) if not found.
+        """
+        future: asyncio.Future = self.bot.loop.create_future()
+        self.pending_joins.setdefault(member.guild.id, []).append((member, future))
+        task: Optional[asyncio.Task] = self.attribution_tasks.get(member.guild.id)
+        if task is None or task.done():
+            self.attribution_tasks[member.guild.id] = self.bot.loop.create_task(self._attribute_joins(member.guild))
+        return await future
+
+    async def _attribute_joins(self, guild: discord.Guild):
+        """
+        Attribute every pending joins of the guild. Only one task runs for each guild,
+        so pending joins and tracking data of the guild need no locks.
+        """
+        joins: List[Tuple[discord.Member, asyncio.Future]] = []
+        try:
+            await asyncio.sleep(self.join_coalesce_delay)
+            while len(self.pending_joins.get(guild.id, [])) > 0:
+                joins = self.pending_joins.pop(guild.id)
+                attributions: Optional[List[ATTRIBUTION]] = await self.compare_invites(guild)
+                # Members joined while invites were being fetched are likely counted in them too.
+                joins += self.pending_joins.pop(guild.id, [])
+                matched: bool = attributions is not None and self.is_attributable(len(joins), attributions)
+                for index, (member, future) in enumerate(joins):
+                    if not future.done():
+                        future.set_result(attributions[index] if matched else (None, 0))
+                joins = []
+        except Exception as e:
+            # Fail the batch being attributed too, so no `on_member_join` waits forever.
+            for member, future in joins + self.pending_joins.pop(guild.id, []):
+                if not future.done():
+                    future.set_exception(e)
+            self.bot.get_logger().error(msg=f"[InvitesExt._attribute_joins] Failed to attribute joins of guild {guild.id}.",
+                                        exc_info=e)
+        finally:
+            for member, future in joins:
+                if not future.done():
+                    future.cancel()
+            self.attribution_tasks.pop(guild.id, None)
+
+    @staticmethod
+    def is_attributable(joins: int, attributions: List[ATTRIBUTION]) -> bool:
+        """
+        Joins can be matched with invite use increments only if there is exactly one increment for each join,
+        and every increment belongs to the same invite. Otherwise which member used which invite is unknown,
+        (or tracking data was stale) so the batch is left unattributed instead of guessing.
         """
-        for invite in await guild.invites():
-            if self.invite_tracks[str(guild.id)][invite.code] < invite.uses:
-                return invite.code, invite.uses
+        return joins > 0 and len(attributions) == joins and len({code for code, uses in attributions}) == 1
 
 
 def setup(bot: Latte):
@@ -95,7 +95,7 @@ class UtilsCog(commands.Cog):
         # Because discord.py does not provide region "south-korea" but discord api does,
         # we need to request to discord api directly to get proper region info.
 
-        response = await self.bot.api_get(api_url=f"/guilds/{ctx.guild.id}", response_type="json")
+        response = await self.bot.get_guild_data(guild_id=ctx.guild.id)
 
         embed_factory = EmbedFactory(
             title=f"{ctx.guild.name} 서버 정보입니다!",
@@ -0,0 +1,103 @@
+import asyncio, logging, types
+from typing import Dict, List
+from extensions.Utility.InvitesExt import InviteCog
+from extensions.Utility.InviteStore import InviteStore
+
+
+class FakeGuild:
+    id = 1
+
+
+class FakeMember:
+    def __init__(self, number: int):
+        self.guild = FakeGuild()
+        self.number = number
+
+
+def make_cog(tmp_path, state: Dict[str, int], tracked: bool = True) -> InviteCog:
+    """
+    Build InviteCog without a bot : invites of the guild are served from `state`.
+    """
+    cog: InviteCog = InviteCog.__new__(InviteCog)
+    cog.bot = types.SimpleNamespace(loop=asyncio.get_event_loop(), get_logger=lambda: logging.getLogger("latte.test"))
+    cog.pending_joins = {}
+    cog.attribution_tasks = {}
+    cog.join_coalesce_delay = 0.05
+    cog.invite_store = InviteStore(str(tmp_path / "invites.db"))
+    if tracked:
+        cog.invite_store.set_guild(FakeGuild.id, list(state.items()))
+    cog.fetches = 0
+
+    async def fetch_invites(guild):
+        cog.fetches += 1
+        await asyncio.sleep(0.01)
+        return [types.SimpleNamespace(code=code, uses=uses) for code, uses in state.items()]
+
+    cog.fetch_invites = fetch_invites
+    return cog
+
+
+def simulate(tmp_path, codes: List[str], initial: Dict[str, int], tracked: bool = True, setup=None):
+    """
+    Simulate a burst of members joining with the given invite codes.
+    :return: attributions of each member, and number of invite fetches.
+    """
+    async def main():
+        state: Dict[str, int] = dict(initial)
+        cog: InviteCog = make_cog(tmp_path, state, tracked)
+        if setup is not None:
+            setup(cog)
+
+        async def join(number: int, code: str):
+            state[code] += 1
+            return await cog.attribute_join(FakeMember(number))
+
+        results = await asyncio.gather(*[join(number, code) for number, code in enumerate(codes)])
+        return results, cog.fetches
+
+    return asyncio.run(main())
+
+
+def test_burst_with_single_invite_is_attributed(tmp_path):
+    results, fetches = simulate(tmp_path, ["a", "a", "a"], {"a": 4, "b": 0})
+    assert results == [("a", 7)] * 3
+    assert fetches == 1
+
+
+def test_burst_with_several_invites_is_not_attributed(tmp_path):
+    results, fetches = simulate(tmp_path, ["a", "b", "a"], {"a": 0, "b": 0})
+    assert results == [(None, 0)] * 3
+    assert fetches == 1
+
+
+def test_untracked_guild_is_reseeded_without_attribution(tmp_path):
+    results, fetches = simulate(tmp_path, ["a"], {"a": 10}, tracked=False)
+    assert results == [(None, 0)]
+
+
+def test_snapshot_guild_is_reseeded_without_attribution(tmp_path):
+    def warm_start(cog: InviteCog):
+        loaded = {FakeGuild.id: cog.invite_store.get_guild(FakeGuild.id)}
+        cog.invite_store.remove_guild(FakeGuild.id)
+        cog.invite_store.merge(loaded)
+
+    # Uses while offline must not be credited to the member joined now.
+    results, fetches = simulate(tmp_path, ["a"], {"a": 0}, setup=warm_start)
+    assert results == [(None, 0)]
+
+
+def test_failed_fetch_fails_every_join(tmp_path):
+    def broken(cog: InviteCog):
+        async def fetch_invites(guild):
+            raise RuntimeError("fetch failed")
+        cog.fetch_invites = fetch_invites
+
+    async def main():
+        state = {"a": 0}
+        cog = make_cog(tmp_path, state)
+        broken(cog)
+        return await asyncio.gather(*[cog.attribute_join(FakeMember(number)) for number in range(2)],
+                                    return_exceptions=True)
+
+    results = asyncio.run(main())
+    assert all(isinstance(result, RuntimeError) for result in results)
@@ -1,3 +1,4 @@
 from .embeds import *
 from .design_patterns import *
-from .tools import *
\ No newline at end of file
+from .tools import *
+from .cache import *
\ No newline at end of file
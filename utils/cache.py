@@ -0,0 +1,77 @@
+"""
+utils.cache
+
+"""
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple, Union
+
+
+class TTLCache:
+    """
+    Mapping cache which expires items after `ttl` seconds, and evicts least recently used item
+    when it stores more than `maxsize` items.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 300.0, timer: Callable[[], float] = time.monotonic):
+        if maxsize <= 0:
+            raise ValueError("maxsize of TTLCache must be a positive integer!")
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.timer = timer
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+
+        # Statistics
+        self.hits: int = 0
+        self.misses: int = 0
+        self.evictions: int = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        item: Optional[Tuple[float, Any]] = self._data.get(key)
+        if item is None:
+            self.misses += 1
+            return default
+        expire_at, value = item
+        if expire_at <= self.timer():
+            del self._data[key]
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any):
+        self._data[key] = (self.timer() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key: Hashable) -> bool:
+        """
+        Remove item from cache.
+        :return: whether the key was stored in cache or not.
+        """
+        return self._data.pop(key, None) is not None
+
+    def clear(self):
+        self._data.clear()
+
+    def __contains__(self, key: Hashable) -> bool:
+        item: Optional[Tuple[float, Any]] = self._data.get(key)
+        return item is not None and item[0] > self.timer()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get_stats(self) -> Dict[str, Union[int, float]]:
+        lookups: int = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 3) if lookups > 0 else 0.0
+        }